@@ -24,6 +24,11 @@ from modules.vendedor.routes import vendedor_bp
 from modules.general.routes import general_bp
 from modules.vendors import vendors_bp
 from modules.admin.routes import admin_bp
+from modules.services import metrics as firestore_metrics
+from modules.services.cli import firestore_cli
+from modules.services.product_detail import product_detail_cache
+from modules.services.repositories import usuarios_repo
+from modules.services.sales_analytics import sales_analytics
 
 # Inicializar Flask-Mail
 mail = Mail()
@@ -55,6 +60,25 @@ def create_app(config_name='development'):
     # Configuración
     app.config.from_object(config[config_name])
     
+    # Caché de documentos de usuarios (Stripe Connect)
+    usuarios_repo.cache.configure(
+        maxsize=app.config['USUARIOS_CACHE_MAXSIZE'],
+        ttl=app.config['USUARIOS_CACHE_TTL'],
+    )
+    # Caché del detalle agregado de producto (vendedor y comentarios)
+    product_detail_cache.configure(
+        maxsize=app.config['PRODUCT_DETAIL_CACHE_MAXSIZE'],
+        ttl=app.config['PRODUCT_DETAIL_CACHE_TTL'],
+    )
+    # Caché de las series de ventas del vendedor
+    sales_analytics.cache.configure(
+        maxsize=app.config['SALES_ANALYTICS_CACHE_MAXSIZE'],
+        ttl=app.config['SALES_ANALYTICS_CACHE_TTL'],
+    )
+    
+    # Contadores de operaciones de Firestore por petición y por endpoint
+    firestore_metrics.init_app(app)
+    
     # Configurar sesiones permanentes
     @app.before_request
     def make_session_permanent():
@@ -98,6 +122,9 @@ def create_app(config_name='development'):
     app.register_blueprint(vendors_bp, url_prefix="/vendors")
     app.register_blueprint(admin_bp, url_prefix="/admin")
     
+    # Comandos de mantenimiento: flask firestore ...
+    app.cli.add_command(firestore_cli)
+    
     # Ruta adicional para registro sin prefijo
     @app.route("/register", methods=["GET", "POST"])
     def register():
@@ -39,6 +39,40 @@ class Config:
     FIREBASE_CREDENTIALS_PATH = os.environ.get('FIREBASE_CREDENTIALS_PATH')
     FIREBASE_SERVICE_ACCOUNT_JSON = os.environ.get('FIREBASE_SERVICE_ACCOUNT_JSON')
     FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID') or 'agromarket-625b2'
+
+    # Backend de Firestore: 'firebase' (real) o 'memory' (pruebas de carga y benchmarks)
+    FIRESTORE_BACKEND = os.environ.get('FIRESTORE_BACKEND') or 'firebase'
+    FIRESTORE_FAKE_LATENCY_MS = float(os.environ.get('FIRESTORE_FAKE_LATENCY_MS') or 0)
+    FIRESTORE_FAKE_FIXTURES = os.environ.get('FIRESTORE_FAKE_FIXTURES')  # ruta a JSON {colección: {id: datos}}
+    # Contabilidad de lecturas/escrituras por petición (ver modules/services/metrics.py)
+    FIRESTORE_METRICS_ENABLED = (os.environ.get('FIRESTORE_METRICS_ENABLED') or 'true').lower() != 'false'
+    FIRESTORE_READ_BUDGET = int(os.environ.get('FIRESTORE_READ_BUDGET') or 0)  # 0 = sin aviso
+    # Escrituras masivas: operaciones/s iniciales (crecen un 50 % cada 5 min) y tope
+    FIRESTORE_BULK_INITIAL_RATE = int(os.environ.get('FIRESTORE_BULK_INITIAL_RATE') or 500)
+    FIRESTORE_BULK_MAX_RATE = int(os.environ.get('FIRESTORE_BULK_MAX_RATE') or 10000)
+    FIRESTORE_FANOUT_TIMEOUT = float(os.environ.get('FIRESTORE_FANOUT_TIMEOUT') or 5)  # segundos, lecturas concurrentes
+    # Espera máxima del snapshot inicial del listener de productos (búsqueda y catálogo)
+    PRODUCTOS_FEED_TIMEOUT = float(os.environ.get('PRODUCTOS_FEED_TIMEOUT') or 10)
+    # Espera máxima del snapshot inicial del listener de compras (estadísticas del vendedor)
+    VENTAS_FEED_TIMEOUT = float(os.environ.get('VENTAS_FEED_TIMEOUT') or 10)
+    # Días de pedidos (por fecha_compra) que escucha el feed de compras; 0 = todo el historial.
+    # Cada worker guarda en memoria las líneas de los pedidos escuchados y su snapshot inicial
+    # lee un documento por pedido (N_workers × pedidos por despliegue). Con ventana, el listener
+    # se reabre una vez al día y vuelve a leer los pedidos de la ventana.
+    VENTAS_FEED_WINDOW_DAYS = float(os.environ.get('VENTAS_FEED_WINDOW_DAYS') or 0)
+    # Vida media (días) de una venta en el ranking de productos populares
+    POPULARITY_HALF_LIFE_DAYS = float(os.environ.get('POPULARITY_HALF_LIFE_DAYS') or 7)
+
+    # Caché de documentos de 'usuarios' usada por el flujo de Stripe Connect
+    # (es por proceso: con varios workers cada uno mantiene la suya)
+    USUARIOS_CACHE_TTL = int(os.environ.get('USUARIOS_CACHE_TTL') or 30)  # segundos
+    USUARIOS_CACHE_MAXSIZE = int(os.environ.get('USUARIOS_CACHE_MAXSIZE') or 1024)
+    # Caché por producto de vendedor y comentarios en el detalle agregado
+    PRODUCT_DETAIL_CACHE_TTL = int(os.environ.get('PRODUCT_DETAIL_CACHE_TTL') or 15)  # segundos
+    PRODUCT_DETAIL_CACHE_MAXSIZE = int(os.environ.get('PRODUCT_DETAIL_CACHE_MAXSIZE') or 512)
+    # Caché de arrays y series de ventas por (vendedor, versión) en /vendedor/api/estadisticas/series
+    SALES_ANALYTICS_CACHE_TTL = int(os.environ.get('SALES_ANALYTICS_CACHE_TTL') or 300)  # segundos
+    SALES_ANALYTICS_CACHE_MAXSIZE = int(os.environ.get('SALES_ANALYTICS_CACHE_MAXSIZE') or 256)
     
 
 class DevelopmentConfig(Config):
@@ -1,6 +1,17 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app
 from flask_mail import Message
+from google.cloud.firestore_v1 import DELETE_FIELD, SERVER_TIMESTAMP, ArrayRemove, ArrayUnion
 from modules.auth.decorators import login_required, role_required
+from modules.services import metrics as firestore_metrics
+from modules.services import productos_repo, solicitudes_vendedores_repo, usuarios_repo
+from modules.services.pagination import clamp_page_size
+from modules.services.repositories import write_together
+
+ADMIN_USUARIO_FIELDS = ("nombre", "email", "roles", "activo", "fecha_registro", "foto_perfil")
+ROLES_VALIDOS = ("comprador", "vendedor", "administrador")
+MAX_BULK_IDS = 2000
+# Datos de la solicitud que se copian al perfil del vendedor aprobado
+SOLICITUD_TIENDA_FIELDS = ("nombre_tienda", "ubicacion", "ubicacion_formatted", "ubicacion_lat", "ubicacion_lng")
 
 admin_bp = Blueprint('admin', __name__, template_folder='templates')
 
@@ -64,20 +75,258 @@ def detalle_solicitud(user_id):
 @login_required
 @role_required("administrador")
 def api_obtener_usuarios():
-    """API para obtener la lista de todos los usuarios"""
+    """
+    API para obtener la lista de usuarios, paginada por cursor.
+    Parámetros: `limit` (tamaño de página) y `cursor` (valor `next_cursor` de la página anterior).
+    """
     try:
-        # Esta función se implementará en el frontend con Firebase
-        # Por ahora retornamos un JSON vacío
+        paginator = usuarios_repo.paginate(
+            page_size=clamp_page_size(request.args.get("limit")),
+            cursor=request.args.get("cursor") or None,
+            fields=ADMIN_USUARIO_FIELDS,
+        )
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "Cursor inválido"
+        }), 400
+
+    try:
+        page = paginator.first_page()
+        usuarios = []
+        for doc_id, data in page:
+            roles = data.get("roles")
+            usuarios.append({
+                "id": doc_id,
+                "nombre": data.get("nombre") or "Sin nombre",
+                "email": data.get("email") or "Sin email",
+                "roles": roles if isinstance(roles, list) else ([roles] if roles else []),
+                "activo": data.get("activo") is not False,
+                "fecha_registro": data.get("fecha_registro"),
+                "foto_perfil": data.get("foto_perfil"),
+            })
         return jsonify({
             "success": True,
-            "usuarios": []
+            "usuarios": usuarios,
+            "next_cursor": page.next_cursor
         })
     except Exception as e:
+        current_app.logger.error(f"Error listando usuarios: {e}")
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
+def _ids_de_peticion(data):
+    """Lista de IDs (sin duplicados) del cuerpo JSON; ValueError si no es válida."""
+    ids = (data or {}).get("ids")
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("Se requiere una lista 'ids'")
+    ids = list(dict.fromkeys(str(doc_id).strip() for doc_id in ids if str(doc_id).strip()))
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f"Máximo {MAX_BULK_IDS} IDs por petición")
+    return ids
+
+
+def _respuesta_masiva(cuerpo, resultado):
+    """
+    Respuesta de una escritura masiva: si Firestore dejó de responder a mitad (`resultado.error`),
+    success es False con 503 y el cuerpo sigue indicando qué se escribió y qué no.
+    """
+    if resultado.error:
+        return jsonify(dict(cuerpo, success=False, error=resultado.error)), 503
+    return jsonify(dict(cuerpo, success=True))
+
+
+# ===== API: Cambios masivos de usuarios =====
+@admin_bp.route("/api/usuarios/bulk", methods=["POST"])
+@login_required
+@role_required("administrador")
+def api_usuarios_bulk():
+    """
+    API para aplicar un mismo cambio a varios usuarios en lotes.
+    Cuerpo: {"ids": [...], "accion": "activar" | "desactivar" | "agregar_rol" | "quitar_rol" | "eliminar", "rol": "..."}
+    """
+    data = request.get_json(silent=True) or {}
+    accion = data.get("accion")
+    rol = (data.get("rol") or "").strip().lower()
+    try:
+        ids = _ids_de_peticion(data)
+        if accion in ("agregar_rol", "quitar_rol") and rol not in ROLES_VALIDOS:
+            raise ValueError(f"Rol inválido: {rol or '(vacío)'}")
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    # Ni eliminar ni desactivar ni cambiar los roles de la cuenta con la que se opera
+    if session.get("usuario_id") in ids:
+        return jsonify({"success": False, "error": "No puedes aplicar cambios masivos a tu propia cuenta"}), 400
+
+    if accion == "eliminar":
+        operaciones = [("delete", user_id, None) for user_id in ids]
+    else:
+        cambios = {
+            "activar": {"activo": True},
+            "desactivar": {"activo": False},
+            "agregar_rol": {"roles": ArrayUnion([rol])},
+            "quitar_rol": {"roles": ArrayRemove([rol])},
+        }.get(accion)
+        if cambios is None:
+            return jsonify({"success": False, "error": f"Acción no soportada: {accion}"}), 400
+        operaciones = [
+            ("update", user_id, dict(cambios, fecha_actualizacion=SERVER_TIMESTAMP))
+            for user_id in ids
+        ]
+
+    try:
+        resultado = usuarios_repo.write_many(operaciones)
+        if resultado is None:
+            return jsonify({"success": False, "error": "Firestore no está disponible"}), 503
+        current_app.logger.info(
+            f"Cambio masivo '{accion}' en {resultado.committed} usuarios "
+            f"({len(resultado.failed)} fallidos, {resultado.unprocessed} sin procesar)"
+        )
+        return _respuesta_masiva({"resultado": resultado.to_dict()}, resultado)
+    except Exception as e:
+        current_app.logger.error(f"Error en cambio masivo de usuarios: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ===== API: Aprobación masiva de solicitudes de vendedor =====
+@admin_bp.route("/api/solicitudes/aprobar", methods=["POST"])
+@login_required
+@role_required("administrador")
+def api_aprobar_solicitudes():
+    """
+    API para aprobar varias solicitudes de vendedor en lotes.
+    Cuerpo: {"ids": [...]} con IDs de solicitudes_vendedores.
+    Devuelve los datos de contacto de las aprobadas (solo las confirmadas) para enviar los
+    correos desde el frontend, y en `fallidas` las que no se pudieron escribir o no se
+    llegaron a procesar porque la escritura se detuvo (entonces `success` es False).
+    """
+    try:
+        ids = _ids_de_peticion(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        solicitudes = solicitudes_vendedores_repo.get_many(ids)
+        usuarios_ids = {solicitud_id: solicitud.get("user_id") or solicitud_id
+                        for solicitud_id, solicitud in solicitudes.items()}
+        # Solo interesa saber qué usuarios existen ya
+        existentes = usuarios_repo.get_many(usuarios_ids.values(), fields=("activo",))
+
+        grupos, candidatas = [], []
+        for solicitud_id, solicitud in solicitudes.items():
+            user_id = usuarios_ids[solicitud_id]
+            perfil = {field: solicitud[field] for field in SOLICITUD_TIENDA_FIELDS if field in solicitud}
+            perfil.update({
+                "roles": ArrayUnion(["vendedor"]),
+                "rol_activo": "vendedor",
+                "solicitud_vendedor_pendiente": DELETE_FIELD,
+            })
+            if user_id not in existentes:
+                perfil.update({
+                    "nombre": solicitud.get("nombre") or "",
+                    "email": solicitud.get("email") or "",
+                    "fecha_registro": SERVER_TIMESTAMP,
+                    "activo": True,
+                })
+            # Usuario y solicitud van en el mismo lote: no puede aprobarse uno sin el otro
+            grupos.append([
+                (usuarios_repo, "merge", user_id, perfil),
+                (solicitudes_vendedores_repo, "update", solicitud_id, {
+                    "estado": "aprobada",
+                    "fecha_revision": SERVER_TIMESTAMP,
+                    "revisado_por": session.get("usuario_id"),
+                    "motivo_rechazo": None,
+                }),
+            ])
+            candidatas.append({
+                "solicitud_id": solicitud_id,
+                "user_id": user_id,
+                "email": solicitud.get("email"),
+                "nombre": solicitud.get("nombre") or "Usuario",
+                "nombre_tienda": solicitud.get("nombre_tienda") or "",
+                "ubicacion": solicitud.get("ubicacion") or "",
+            })
+
+        resultado = write_together(grupos)
+        if resultado is None:
+            return jsonify({"success": False, "error": "Firestore no está disponible"}), 503
+
+        coleccion_solicitudes = solicitudes_vendedores_repo.collection_name
+        errores = {doc_id: error for coleccion, doc_id, error in resultado.failed if coleccion == coleccion_solicitudes}
+        errores.update((doc_id, f"No procesada: {resultado.error}")
+                       for coleccion, doc_id in resultado.skipped if coleccion == coleccion_solicitudes)
+        return _respuesta_masiva({
+            # Solo las confirmadas: el frontend envía el correo de aprobación a cada una
+            "aprobadas": [item for item in candidatas if item["solicitud_id"] not in errores],
+            "fallidas": [{"solicitud_id": solicitud_id, "error": error} for solicitud_id, error in errores.items()],
+            "no_encontradas": [solicitud_id for solicitud_id in ids if solicitud_id not in solicitudes],
+            "resultado": resultado.to_dict(),
+        }, resultado)
+    except Exception as e:
+        current_app.logger.error(f"Error en aprobación masiva de solicitudes: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ===== API: Eliminación masiva de productos =====
+@admin_bp.route("/api/productos/eliminar", methods=["POST"])
+@login_required
+@role_required("administrador")
+def api_eliminar_productos():
+    """API para eliminar varios productos en lotes. Cuerpo: {"ids": [...]}"""
+    try:
+        ids = _ids_de_peticion(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        resultado = productos_repo.write_many(("delete", producto_id, None) for producto_id in ids)
+        if resultado is None:
+            return jsonify({"success": False, "error": "Firestore no está disponible"}), 503
+        return _respuesta_masiva({"resultado": resultado.to_dict()}, resultado)
+    except Exception as e:
+        current_app.logger.error(f"Error eliminando productos: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# ===== API: Métricas de Firestore =====
+@admin_bp.route("/api/firestore/metricas", methods=["GET"])
+@login_required
+@role_required("administrador")
+def api_metricas_firestore():
+    """
+    API con las operaciones de Firestore acumuladas por este proceso: total y por
+    endpoint, ordenado por lecturas. Solo lectura: para reiniciar los contadores usa
+    POST /api/firestore/metricas/reset.
+    """
+    return _respuesta_metricas(firestore_metrics.snapshot())
+
+@admin_bp.route("/api/firestore/metricas/reset", methods=["POST"])
+@login_required
+@role_required("administrador")
+def api_reiniciar_metricas_firestore():
+    """Reinicia los contadores de Firestore de este proceso y devuelve los acumulados hasta ahora."""
+    datos = firestore_metrics.snapshot()
+    firestore_metrics.reset()
+    return _respuesta_metricas(datos)
+
+def _respuesta_metricas(datos):
+    endpoints = []
+    for endpoint, stats in datos["endpoints"].items():
+        requests_count = stats["requests"] or 1
+        endpoints.append(dict(
+            stats,
+            endpoint=endpoint,
+            reads_per_request=round(stats["reads"] / requests_count, 2),
+        ))
+    endpoints.sort(key=lambda item: item["reads"], reverse=True)
+
+    return jsonify({
+        "success": True,
+        "totals": datos["totals"],
+        "endpoints": endpoints,
+        "read_budget": current_app.config.get("FIRESTORE_READ_BUDGET") or None
+    })
+
 # ===== API: Actualizar usuario =====
 @admin_bp.route("/api/usuarios/<user_id>", methods=["PUT", "PATCH"])
 @login_required
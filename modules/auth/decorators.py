@@ -1,6 +1,33 @@
 from functools import wraps
 from flask import session, redirect, url_for, flash, make_response
 
+
+def revalidate(f):
+    """
+    Permite que el navegador guarde la respuesta pero la revalide en cada visita
+    (Cache-Control: private, no-cache) en lugar de no guardarla nunca.
+    Pensado para respuestas con ETag; se coloca justo encima de la función de la vista:
+        @login_required
+        @role_required("comprador")
+        @revalidate
+        def api_catalogo(): ...
+    """
+    f.cache_revalidate = True
+    return f
+
+
+def _cache_headers(response, f):
+    if getattr(f, "cache_revalidate", False):
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Cookie')
+        return response
+    # Agregar headers para prevenir cacheo del navegador
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
+    response.headers['Pragma'] = 'no-cache'
+    response.headers['Expires'] = '0'
+    return response
+
+
 def login_required(f):
     @wraps(f)
     def wrapped(*args, **kwargs):
@@ -13,12 +40,7 @@ def login_required(f):
             flash("Debes iniciar sesión para acceder a esta página.", "danger")
             return redirect(url_for("auth.login"))
         
-        # Agregar headers para prevenir cacheo del navegador
-        response = make_response(f(*args, **kwargs))
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        return response
+        return _cache_headers(make_response(f(*args, **kwargs)), f)
     return wrapped
 
 def role_required(rol):
@@ -72,11 +94,6 @@ def role_required(rol):
                 flash("No tienes permisos para acceder a esta página.", "danger")
                 return redirect(url_for("auth.login"))
 
-            # Agregar headers para prevenir cacheo del navegador
-            response = make_response(f(*args, **kwargs))
-            response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
-            return response
+            return _cache_headers(make_response(f(*args, **kwargs)), f)
         return wrapped
     return decorator
@@ -13,6 +13,11 @@ from utils.security import (
     sanitize_email, sanitize_string, sanitize_text_area,
     detect_xss_attempt, log_security_event
 )
+from modules.services.firestore_client import (
+    get_firestore_client as _get_shared_firestore_client,
+    initialize_firebase_app,
+)
+from modules.services.repositories import password_reset_codes_repo
 
 # Importar utilidades para Firebase Functions
 FIREBASE_FUNCTIONS_AVAILABLE = False
@@ -31,8 +36,7 @@ auth_bp = Blueprint("auth", __name__, template_folder="templates")
 
 # Intentar importar Firebase Admin SDK
 try:
-    import firebase_admin
-    from firebase_admin import credentials, auth as firebase_auth
+    from firebase_admin import auth as firebase_auth
     FIREBASE_ADMIN_AVAILABLE = True
 except ImportError:
     FIREBASE_ADMIN_AVAILABLE = False
@@ -280,165 +284,15 @@ def activar_rol_vendedor():
 # =========================
 
 def initialize_firebase_admin():
-    """Inicializa Firebase Admin SDK si está disponible"""
-    print(f"\n🔍 Inicializando Firebase Admin SDK...")
-    print(f"   FIREBASE_ADMIN_AVAILABLE: {FIREBASE_ADMIN_AVAILABLE}")
-    
+    """Inicializa Firebase Admin SDK si está disponible (una sola vez por proceso)"""
     if not FIREBASE_ADMIN_AVAILABLE:
-        print("❌ Firebase Admin SDK no está disponible (no instalado)")
         current_app.logger.warning("Firebase Admin SDK no está disponible")
         return None
-    
-    try:
-        # Verificar si ya está inicializado
-        if firebase_admin._apps:
-            print("✅ Firebase Admin SDK ya está inicializado")
-            return firebase_admin.get_app()
-        
-        # Obtener project ID - usar el mismo que en firebase-config.js (igual que en móvil)
-        # Primero intentar variables de entorno (opcional), luego usar el valor hardcodeado
-        project_id = os.environ.get('FIREBASE_PROJECT_ID') or \
-                    os.environ.get('GOOGLE_CLOUD_PROJECT') or \
-                    current_app.config.get('FIREBASE_PROJECT_ID') or \
-                    'agromarket-625b2'  # Mismo valor que en static/js/firebase-config.js
-        
-        print(f"🔧 Project ID configurado: {project_id}")
-        
-        # Calcular directorio base
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        current_dir = os.getcwd()
-        print(f"📁 Directorio base: {base_dir}")
-        print(f"📁 Directorio actual: {current_dir}")
-        
-        # Buscar archivo de credenciales en varios lugares (orden de prioridad)
-        possible_paths = [
-            # 1. Variable de entorno GOOGLE_APPLICATION_CREDENTIALS (ruta al archivo)
-            os.environ.get('GOOGLE_APPLICATION_CREDENTIALS'),
-            # 2. Variable de entorno FIREBASE_SERVICE_ACCOUNT_JSON (contenido JSON como string)
-            # Si existe, crear archivo temporal
-            None,  # Se manejará después
-            # 3. Para Docker/producción: buscar en /app (directorio común en contenedores)
-            '/app/config/serviceAccountKey.json',  # Primero config/ dentro de /app
-            '/app/serviceAccountKey.json',
-            # 4. Archivo en config/ del proyecto (donde está en el repositorio)
-            os.path.join(base_dir, 'config', 'serviceAccountKey.json'),
-            # 5. Archivo en el directorio raíz del proyecto
-            os.path.join(base_dir, 'serviceAccountKey.json'),
-            # 6. Para producción: buscar en directorio actual de trabajo
-            os.path.join(current_dir, 'config', 'serviceAccountKey.json'),
-            os.path.join(current_dir, 'serviceAccountKey.json'),
-            # 7. Archivo alternativo
-            os.path.join(base_dir, 'firebase-service-account.json'),
-        ]
-        
-        # Verificar si hay credenciales en variable de entorno FIREBASE_SERVICE_ACCOUNT_JSON
-        service_account_json = os.environ.get('FIREBASE_SERVICE_ACCOUNT_JSON')
-        temp_file_path = None
-        
-        # Debug: verificar si la variable existe (incluso si está vacía)
-        if 'FIREBASE_SERVICE_ACCOUNT_JSON' in os.environ:
-            print(f"🔍 Variable FIREBASE_SERVICE_ACCOUNT_JSON existe en os.environ")
-            if service_account_json:
-                print(f"   Longitud del valor: {len(service_account_json)} caracteres")
-                print(f"   Primeros 50 caracteres: {service_account_json[:50]}...")
-            else:
-                print(f"   ⚠️ Variable existe pero está vacía o es None")
-        else:
-            print(f"❌ Variable FIREBASE_SERVICE_ACCOUNT_JSON NO existe en os.environ")
-            print(f"   Variables de entorno disponibles que contienen 'FIREBASE':")
-            for key in os.environ.keys():
-                if 'FIREBASE' in key.upper() or 'GOOGLE' in key.upper():
-                    print(f"      - {key}")
-        
-        if service_account_json:
-            print(f"✅ Variable FIREBASE_SERVICE_ACCOUNT_JSON encontrada (longitud: {len(service_account_json)} caracteres)")
-            try:
-                import json
-                import tempfile
-                # Validar que sea JSON válido y extraer project_id si está disponible
-                service_account_data = json.loads(service_account_json)
-                if 'project_id' in service_account_data:
-                    project_id = service_account_data['project_id']
-                    print(f"📁 Project ID extraído del JSON: {project_id}")
-                
-                # Crear archivo temporal con las credenciales
-                temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False)
-                json.dump(service_account_data, temp_file, indent=2)  # Escribir JSON formateado
-                temp_file.close()
-                temp_file_path = temp_file.name
-                possible_paths.insert(1, temp_file_path)  # Insertar en posición 1
-                print(f"✅ Archivo temporal creado: {temp_file_path}")
-                print(f"📁 Usando credenciales desde variable de entorno FIREBASE_SERVICE_ACCOUNT_JSON")
-            except (json.JSONDecodeError, Exception) as e:
-                print(f"⚠️ Error procesando FIREBASE_SERVICE_ACCOUNT_JSON: {str(e)}")
-                import traceback
-                print(f"   Traceback: {traceback.format_exc()}")
-                # Continuar con otras opciones
-        
-        print(f"🔍 Buscando archivo de credenciales en {len(possible_paths)} ubicaciones...")
-        cred_path = None
-        for i, path in enumerate(possible_paths):
-            if path:
-                exists = os.path.exists(path)
-                status = "✅" if exists else "❌"
-                print(f"   {status} {i+1}. {path}")
-                if exists and not cred_path:
-                    cred_path = path
-        
-        if cred_path:
-            print(f"📁 Usando credenciales desde: {cred_path}")
-            current_app.logger.info(f"📁 Usando credenciales de Firebase desde: {cred_path}")
-            
-            # Cargar credenciales
-            cred = credentials.Certificate(cred_path)
-            
-            # Si las credenciales tienen project_id, usarlo (tiene prioridad)
-            if hasattr(cred, 'project_id') and cred.project_id:
-                project_id = cred.project_id
-                print(f"📁 Project ID desde credenciales: {project_id}")
-            
-            # Inicializar con credenciales y project ID explícito
-            init_options = {
-                'projectId': project_id
-            }
-            print(f"🔧 Inicializando Firebase Admin SDK con projectId: {project_id}")
-            app = firebase_admin.initialize_app(cred, init_options)
-            print(f"✅ Firebase Admin SDK inicializado correctamente (project: {project_id})")
-            current_app.logger.info(f"✅ Firebase Admin SDK inicializado correctamente (project: {project_id})")
-            return app
-        else:
-            print("⚠️ No se encontró archivo de credenciales en ninguna ubicación")
-            current_app.logger.warning("⚠️ No se encontró archivo de credenciales de Firebase Admin SDK")
-            current_app.logger.warning("⚠️ Firebase Admin SDK no podrá funcionar sin credenciales válidas")
-            current_app.logger.warning("⚠️ Para usar Firebase Admin SDK en producción, necesitas:")
-            current_app.logger.warning("   1. Subir el archivo serviceAccountKey.json a /app/config/serviceAccountKey.json")
-            current_app.logger.warning("   2. O configurar GOOGLE_APPLICATION_CREDENTIALS con la ruta al archivo")
-            current_app.logger.warning("   3. O configurar Application Default Credentials en el servidor")
-            
-            # NO inicializar sin credenciales - esto causará errores al usar los servicios
-            # Retornar None para indicar que Firebase Admin SDK no está disponible
-            print("❌ Firebase Admin SDK no puede inicializarse sin credenciales válidas")
-            print("   Los servicios de autenticación requieren credenciales del service account")
-            return None
-    except Exception as e:
-        print(f"❌ Error inicializando Firebase Admin: {str(e)}")
-        print(f"   Tipo: {type(e).__name__}")
-        import traceback
-        print(f"   Traceback: {traceback.format_exc()}")
-        current_app.logger.error(f"❌ Error inicializando Firebase Admin: {str(e)}")
-        return None
+    return initialize_firebase_app()
 
 def get_firestore_client():
-    """Obtiene el cliente de Firestore a través de Firebase Admin"""
-    try:
-        app = initialize_firebase_admin()
-        if app:
-            from firebase_admin import firestore
-            return firestore.client()
-        return None
-    except Exception as e:
-        current_app.logger.error(f"Error obteniendo Firestore client: {str(e)}")
-        return None
+    """Obtiene el cliente de Firestore compartido por toda la aplicación"""
+    return _get_shared_firestore_client()
 
 def generate_reset_code(email):
     """Genera un código numérico de 6 dígitos para recuperación de contraseña"""
@@ -464,13 +318,8 @@ def generate_reset_code(email):
 def save_reset_code_to_firestore(code_data):
     """Guarda el código de recuperación en Firestore"""
     try:
-        db = get_firestore_client()
-        if not db:
-            return False
-        
         # Guardar en colección 'password_reset_codes'
-        doc_ref = db.collection('password_reset_codes').document(code_data['code_hash'])
-        doc_ref.set({
+        return password_reset_codes_repo.set(code_data['code_hash'], {
             'email': code_data['email'],
             'code_hash': code_data['code_hash'],
             'expires_at': code_data['expires_at'],
@@ -478,7 +327,6 @@ def save_reset_code_to_firestore(code_data):
             'used': False,
             'verified': False
         })
-        return True
     except Exception as e:
         current_app.logger.error(f"Error guardando código en Firestore: {str(e)}")
         return False
@@ -536,8 +384,7 @@ def validate_reset_code(email, code):
     # Intentar desde Firestore
     print("🔍 Buscando código en Firestore...")
     try:
-        db = get_firestore_client()
-        if not db:
+        if not get_firestore_client():
             print("⚠️ Firestore no disponible, usando solo sesión")
             return None
         
@@ -545,14 +392,14 @@ def validate_reset_code(email, code):
         code_hash = hashlib.sha256(code.encode()).hexdigest()
         
         # Buscar el código en Firestore
-        doc_ref = db.collection('password_reset_codes').document(code_hash)
-        doc = doc_ref.get()
+        code_data = password_reset_codes_repo.get(
+            code_hash, fields=password_reset_codes_repo.VALIDATION_FIELDS
+        )
         
-        if not doc.exists:
+        if code_data is None:
             print(f"❌ Código no encontrado en Firestore (hash: {code_hash[:10]}...)")
             return None
         
-        code_data = doc.to_dict()
         print(f"✅ Código encontrado en Firestore")
         
         # Verificar que el email coincida
@@ -597,13 +444,7 @@ def validate_reset_code(email, code):
 def mark_code_as_verified(code_hash):
     """Marca un código como verificado (para permitir cambio de contraseña)"""
     try:
-        db = get_firestore_client()
-        if not db:
-            return False
-        
-        doc_ref = db.collection('password_reset_codes').document(code_hash)
-        doc_ref.update({'verified': True})
-        return True
+        return password_reset_codes_repo.update(code_hash, {'verified': True})
     except Exception as e:
         current_app.logger.error(f"Error marcando código como verificado: {str(e)}")
         return False
@@ -611,13 +452,7 @@ def mark_code_as_verified(code_hash):
 def mark_code_as_used(code_hash):
     """Marca un código como usado"""
     try:
-        db = get_firestore_client()
-        if not db:
-            return False
-        
-        doc_ref = db.collection('password_reset_codes').document(code_hash)
-        doc_ref.update({'used': True})
-        return True
+        return password_reset_codes_repo.update(code_hash, {'used': True})
     except Exception as e:
         current_app.logger.error(f"Error marcando código como usado: {str(e)}")
         return False
@@ -1,7 +1,17 @@
-from flask import Blueprint, render_template, session, redirect, url_for, request, flash, jsonify, current_app
+from flask import Blueprint, render_template, session, redirect, url_for, request, flash, jsonify, current_app, make_response
 from flask_mail import Message
-from modules.auth.decorators import login_required, role_required
+from modules.auth.decorators import login_required, role_required, revalidate
+from modules.services.autocomplete import autocomplete_index
+from modules.services.catalog import catalog_view
+from modules.services.facets import facet_counts
+from modules.services.popularity import popularity_ranking
+from modules.services.product_detail import product_detail, product_detail_cache
+from modules.services.ratings import add_comment, comments_page
+from modules.services.productos_feed import product_summary, productos_feed
+from modules.services.search import search_index
+from modules.services.vendor_products import vendor_products
 import stripe
+import math
 import os
 from datetime import datetime
 
@@ -178,13 +188,303 @@ def activar_rol_vendedor():
 @login_required
 @role_required("comprador")
 def buscar_productos():
+    """
+    Búsqueda de productos visibles (activos y con stock) ordenada por relevancia.
+    Parámetros: `q`, `limit` (máx. 50) y `categoria` (opcional). Se resuelve con el
+    índice en memoria.
+    """
     query = request.args.get('q', '').strip()
     
     if not query:
         return jsonify({"productos": []})
     
-    # Nota: La búsqueda ahora se hace en el frontend con Firebase
-    return jsonify({"productos": []})
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 50))
+    except ValueError:
+        limit = 20
+    
+    if not productos_feed.ensure_started():
+        current_app.logger.warning("Búsqueda sin índice: el feed de productos no está disponible")
+        return jsonify({"productos": [], "error": "El catálogo no está disponible"}), 503
+    
+    categoria = (request.args.get('categoria') or '').strip() or None
+    resultados = search_index.search(query, limit=limit, categoria=categoria)
+    return jsonify({
+        "productos": [dict(producto, score=score) for score, producto in resultados]
+    })
+
+
+# ===== Autocompletado de búsqueda (AJAX) =====
+@comprador.route("/api/autocompletar")
+@login_required
+@role_required("comprador")
+def api_autocompletar():
+    """
+    Sugerencias de nombres de producto y categorías para lo que se lleva escrito,
+    tolerando errores de escritura. Parámetros: `q` y `limit` (máx. 20).
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"success": True, "sugerencias": []})
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', 8)), 20))
+    except ValueError:
+        limit = 8
+
+    if not productos_feed.ensure_started():
+        current_app.logger.warning("Autocompletado sin índice: el feed de productos no está disponible")
+        return jsonify({"success": False, "sugerencias": [], "error": "El catálogo no está disponible"}), 503
+
+    return jsonify({"success": True, "sugerencias": autocomplete_index.suggest(query, limit=limit)})
+
+
+def _respuesta_condicional(etag, construir):
+    """
+    Responde 304 si el navegador ya tiene la versión `etag` (If-None-Match, con comparación
+    débil: un proxy que comprime la respuesta la devuelve como W/"..."); si no, construye la
+    respuesta con `construir()` y, si es correcta, le añade el ETag.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(construir())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    return response
+
+
+def _precio_param(nombre):
+    valor = request.args.get(nombre)
+    if valor in (None, ''):
+        return None
+    numero = float(valor)
+    if not math.isfinite(numero):
+        raise ValueError(f"{nombre} debe ser un número finito")
+    return numero
+
+
+# ===== API: Catálogo paginado =====
+@comprador.route("/api/catalogo")
+@login_required
+@role_required("comprador")
+@revalidate
+def api_catalogo():
+    """
+    Catálogo de productos visibles, filtrado y paginado por cursor (página de tamaño fijo).
+    Parámetros: categoria, origen, vendedor, precio_min, precio_max,
+    orden (recientes | precio_asc | precio_desc | descuento) y cursor.
+    La primera página (sin cursor) incluye también las facetas de la categoría.
+    Lleva el ETag de la versión del catálogo y responde 304 si no cambió.
+    """
+    try:
+        precio_min = _precio_param('precio_min')
+        precio_max = _precio_param('precio_max')
+    except ValueError:
+        return jsonify({"success": False, "error": "Rango de precio inválido"}), 400
+
+    if not productos_feed.ensure_started():
+        current_app.logger.warning("Catálogo no disponible: el feed de productos no arrancó")
+        return jsonify({"success": False, "error": "El catálogo no está disponible"}), 503
+
+    return _respuesta_condicional(productos_feed.etag(), lambda: _pagina_catalogo(precio_min, precio_max))
+
+
+def _pagina_catalogo(precio_min, precio_max):
+    categoria = request.args.get('categoria', '').strip() or None
+    cursor = request.args.get('cursor') or None
+    try:
+        productos, next_cursor = catalog_view.page(
+            categoria=categoria,
+            origen=request.args.get('origen', '').strip() or None,
+            vendedor_id=request.args.get('vendedor', '').strip() or None,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            orden=request.args.get('orden') or 'recientes',
+            cursor=cursor,
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    respuesta = {
+        "success": True,
+        "productos": productos,
+        "next_cursor": next_cursor
+    }
+    if cursor is None:
+        respuesta["facetas"] = facet_counts.counts(categoria)
+    return jsonify(respuesta)
+
+
+# ===== API: Facetas del catálogo =====
+@comprador.route("/api/catalogo/facetas")
+@login_required
+@role_required("comprador")
+@revalidate
+def api_catalogo_facetas():
+    """
+    Conteos de productos visibles por categoría, origen y rango de precio.
+    Parámetro opcional: categoria (limita los conteos de origen y precio).
+    Lleva el ETag de la versión del catálogo.
+    """
+    if not productos_feed.ensure_started():
+        current_app.logger.warning("Facetas no disponibles: el feed de productos no arrancó")
+        return jsonify({"success": False, "error": "El catálogo no está disponible"}), 503
+
+    categoria = request.args.get('categoria', '').strip() or None
+    return _respuesta_condicional(
+        productos_feed.etag(),
+        lambda: jsonify({"success": True, "facetas": facet_counts.counts(categoria)})
+    )
+
+
+# ===== API: Producto =====
+@comprador.route("/api/productos/<string:producto_id>")
+@login_required
+@role_required("comprador")
+@revalidate
+def api_producto(producto_id):
+    """
+    Datos públicos de un producto (también si está inactivo o agotado, con `activo` y `stock`).
+    Lleva el ETag de la versión del producto y responde 304 si no cambió.
+    """
+    if not productos_feed.ensure_started():
+        current_app.logger.warning("Producto no disponible: el feed de productos no arrancó")
+        return jsonify({"success": False, "error": "El catálogo no está disponible"}), 503
+
+    data, version = productos_feed.get(producto_id)
+    if data is None:
+        return jsonify({"success": False, "error": "Producto no encontrado"}), 404
+
+    return _respuesta_condicional(
+        productos_feed.etag(producto_id),
+        lambda: jsonify({"success": True, "producto": product_summary(producto_id, data), "version": version})
+    )
+
+
+# ===== API: Detalle agregado de producto =====
+@comprador.route("/api/productos/<string:producto_id>/detalle")
+@login_required
+@role_required("comprador")
+def api_detalle_producto(producto_id):
+    """
+    Todo lo que necesita la página de detalle en una sola petición: producto, vendedor,
+    otros productos del vendedor, primera página de comentarios y resumen de calificaciones.
+    """
+    productos_feed.ensure_started()
+    try:
+        detalle = product_detail(producto_id)
+    except TimeoutError as e:
+        current_app.logger.warning(f"Detalle de producto {producto_id} sin respuesta de Firestore: {e}")
+        return jsonify({"success": False, "error": "El detalle no está disponible"}), 503
+
+    if detalle is None:
+        return jsonify({"success": False, "error": "Producto no encontrado"}), 404
+    return jsonify(dict(detalle, success=True))
+
+
+# ===== API: Comentarios de un producto =====
+@comprador.route("/api/productos/<string:producto_id>/comentarios")
+@login_required
+@role_required("comprador")
+def api_comentarios_producto(producto_id):
+    """
+    Comentarios activos del producto, del más reciente al más antiguo, por páginas.
+    Parámetros: cursor (next_cursor de la página anterior) y limit (máx. 50).
+    """
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        limit = 10
+
+    try:
+        comentarios, next_cursor = comments_page(producto_id, cursor=request.args.get('cursor') or None, limit=limit)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "comentarios": comentarios, "next_cursor": next_cursor})
+
+
+@comprador.route("/api/productos/<string:producto_id>/comentarios", methods=["POST"])
+@login_required
+@role_required("comprador")
+def api_publicar_comentario(producto_id):
+    """Publica un comentario ({texto, calificacion}) y actualiza el resumen de calificaciones."""
+    data = request.get_json(silent=True) or {}
+    try:
+        resultado = add_comment(
+            producto_id,
+            session.get("usuario_id"),
+            session.get("nombre"),
+            data.get("texto"),
+            data.get("calificacion"),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    if resultado is None:
+        return jsonify({"success": False, "error": "Producto no encontrado"}), 404
+
+    comentario_id, calificaciones = resultado
+    product_detail_cache.pop(producto_id)
+    current_app.logger.info(f"Comentario {comentario_id} publicado en el producto {producto_id}")
+    return jsonify({"success": True, "comentario_id": comentario_id, "calificaciones": calificaciones}), 201
+
+
+# ===== API: Más productos del vendedor =====
+@comprador.route("/api/vendedores/<string:vendedor_id>/productos")
+@login_required
+@role_required("comprador")
+@revalidate
+def api_productos_vendedor(vendedor_id):
+    """
+    Total de productos visibles del vendedor y los primeros `limit` (máx. 24) en formato tarjeta.
+    Parámetros: orden (como en el catálogo), limit y excluir (id del producto que se está viendo).
+    """
+    try:
+        limit = int(request.args.get('limit', 6))
+    except ValueError:
+        limit = 6
+
+    if not productos_feed.ensure_started():
+        current_app.logger.warning("Productos del vendedor no disponibles: el feed de productos no arrancó")
+        return jsonify({"success": False, "error": "El catálogo no está disponible"}), 503
+
+    def construir():
+        try:
+            total, productos = vendor_products.top(
+                vendedor_id,
+                orden=request.args.get('orden') or 'recientes',
+                limit=limit,
+                exclude=request.args.get('excluir') or None,
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        return jsonify({"success": True, "total": total, "productos": productos})
+
+    return _respuesta_condicional(productos_feed.etag(), construir)
+
+
+# ===== API: Productos populares =====
+@comprador.route("/api/populares")
+@login_required
+@role_required("comprador")
+def api_populares():
+    """
+    Productos visibles más vendidos recientemente (las ventas pierden peso con el tiempo).
+    Parámetros: categoria (opcional) y limit (máx. 24).
+    """
+    try:
+        limit = int(request.args.get('limit', 8))
+    except ValueError:
+        limit = 8
+
+    if not (productos_feed.ensure_started() and popularity_ranking.ensure_started()):
+        current_app.logger.warning("Populares no disponibles: Firestore no está listo")
+        return jsonify({"success": False, "error": "El catálogo no está disponible"}), 503
+
+    categoria = request.args.get('categoria', '').strip() or None
+    return jsonify({"success": True, "productos": popularity_ranking.top(categoria, limit=limit)})
 
 
 # ===== Agregar producto al carrito (AJAX) =====
@@ -1,7 +1,8 @@
 # Rutas generales de AgroMarket
 
-from flask import Blueprint, render_template, jsonify, request, current_app, send_from_directory, abort
+from flask import Blueprint, render_template, jsonify, request, current_app, send_from_directory, abort, session
 from flask_mail import Message
+from datetime import datetime
 import sys
 import os
 
@@ -12,9 +13,15 @@ from utils.security import (
     sanitize_form_data, detect_xss_attempt, log_security_event
 )
 
+from modules.auth.decorators import login_required
+from modules.services import chats_repo
+from modules.services.async_firestore import AsyncRepository, run_concurrently
+
 # Blueprint para rutas generales
 general_bp = Blueprint("general", __name__)
 
+CHAT_TIMESTAMP_FIELDS = ("last_message_at", "updated_at", "updatedAt", "created_at", "createdAt")
+
 @general_bp.route("/")
 def home():
     """Página principal"""
@@ -86,6 +93,76 @@ def api_noticias():
     # Nota: Las noticias ahora se obtienen de Firebase en el frontend
     return jsonify({"noticias": []})
 
+def _chat_timestamp(data):
+    for field in CHAT_TIMESTAMP_FIELDS:
+        value = data.get(field)
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if value:
+            break
+    return 0
+
+
+def _chat_incluye_usuario(data, user_id):
+    if not user_id:
+        return False
+    participants = data.get("participants")
+    if isinstance(participants, list) and user_id in participants:
+        return True
+    if isinstance(data.get("participantsData"), dict) and user_id in data["participantsData"]:
+        return True
+    return data.get("comprador_id") == user_id or data.get("vendedor_id") == user_id
+
+
+def _buscar_chat_existente(pedido_id, user_id, vendedor_id=None):
+    """
+    Busca el chat de un pedido. Los chats antiguos guardan el pedido en `pedido_id`
+    y los nuevos en `metadata.orderId`: ambas consultas se lanzan a la vez y se usa
+    la primera (en ese orden de prioridad) que tenga chats en los que participe
+    `user_id`; los chats de otros usuarios nunca se devuelven.
+    Devuelve (chat_id, datos) o None.
+    """
+    chats = AsyncRepository(chats_repo)
+    filtros_vendedor = [("vendedor_id", "==", vendedor_id)] if vendedor_id else []
+    limite = 5 if vendedor_id else 10
+    resultados = run_concurrently([
+        chats.query([("metadata.orderId", "==", pedido_id)] + filtros_vendedor, limit=limite),
+        chats.query([("pedido_id", "==", pedido_id)] + filtros_vendedor, limit=limite),
+    ])
+
+    for resultado in resultados:
+        con_usuario = [item for item in resultado or () if _chat_incluye_usuario(item[1], user_id)]
+        if con_usuario:
+            return max(con_usuario, key=lambda item: _chat_timestamp(item[1]))
+    return None
+
+
+@general_bp.route("/api/chats/existente")
+@login_required
+def api_chat_existente():
+    """
+    API para localizar el chat existente de un pedido.
+    Parámetros: `pedido_id` y, opcionalmente, `vendedor_id`.
+    """
+    pedido_id = (request.args.get("pedido_id") or "").strip()
+    if not pedido_id:
+        return jsonify({"success": False, "error": "pedido_id es requerido"}), 400
+
+    try:
+        chat = _buscar_chat_existente(
+            pedido_id,
+            session.get("usuario_id"),
+            (request.args.get("vendedor_id") or "").strip() or None,
+        )
+    except TimeoutError as e:
+        current_app.logger.warning(f"Búsqueda de chat sin respuesta a tiempo: {e}")
+        return jsonify({"success": False, "error": "Tiempo de espera agotado"}), 504
+    except Exception as e:
+        current_app.logger.error(f"Error buscando chat del pedido {pedido_id}: {e}", exc_info=True)
+        return jsonify({"success": False, "error": "No se pudo buscar el chat del pedido"}), 500
+
+    return jsonify({"success": True, "chat_id": chat[0] if chat else None})
+
 @general_bp.route("/api/enviar-soporte", methods=["POST"])
 def enviar_soporte():
     """Endpoint para enviar mensajes de soporte por correo"""
@@ -1,4 +1,26 @@
-from .firestore_client import get_firestore_client
-
-__all__ = ["get_firestore_client"]
+from .firestore_client import get_firestore_client, initialize_firebase_app
+from .repositories import (
+    calificaciones_repo,
+    carrito_repo,
+    chats_repo,
+    comentarios_repo,
+    compras_repo,
+    password_reset_codes_repo,
+    productos_repo,
+    solicitudes_vendedores_repo,
+    usuarios_repo,
+)
 
+__all__ = [
+    "get_firestore_client",
+    "initialize_firebase_app",
+    "usuarios_repo",
+    "productos_repo",
+    "compras_repo",
+    "carrito_repo",
+    "chats_repo",
+    "comentarios_repo",
+    "calificaciones_repo",
+    "solicitudes_vendedores_repo",
+    "password_reset_codes_repo",
+]
@@ -0,0 +1,180 @@
+"""
+Lecturas concurrentes de Firestore para handlers que necesitan varias consultas
+independientes (búsqueda de chats, vendedores de un pedido, ...).
+  - Con Firebase se usa el cliente asíncrono (firebase_admin.firestore_async).
+  - Con el Firestore en memoria (o si el cliente asíncrono no está disponible) cada
+    lectura síncrona se ejecuta en un hilo con asyncio.to_thread.
+Las corrutinas corren en un event loop propio del proceso, en segundo plano, así que
+los handlers de Flask (síncronos) solo llaman a run_concurrently(...).
+Las corrutinas se ejecutan con una copia del contexto de la petición, así que sus
+lecturas se contabilizan en ella (ver metrics). No pasan por la unidad de trabajo.
+"""
+
+import asyncio
+import contextvars
+import threading
+
+from .firestore_client import _get_config, _get_logger, _use_memory_backend, initialize_firebase_app
+from .metrics import record, record_read
+from .repositories import READ_BATCH_SIZE, build_query, chunked
+
+DEFAULT_TIMEOUT = 5.0  # segundos
+
+_loop = None
+_loop_lock = threading.Lock()
+_async_client = None
+_async_client_failed = False
+
+
+def _get_loop():
+    """Event loop del proceso, en un hilo daemon creado la primera vez."""
+    global _loop
+
+    if _loop is not None:
+        return _loop
+
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="firestore-async", daemon=True)
+            thread.start()
+            _loop = loop
+    return _loop
+
+
+def get_async_client():
+    """
+    Devuelve el cliente asíncrono de Firestore o None (Firestore en memoria,
+    Firebase no inicializado o SDK sin soporte asíncrono).
+    """
+    global _async_client, _async_client_failed
+
+    if _use_memory_backend(_get_config()) or _async_client_failed:
+        return None
+    if _async_client is not None:
+        return _async_client
+
+    app = initialize_firebase_app()
+    if app is None:
+        return None
+
+    with _loop_lock:
+        if _async_client is None and not _async_client_failed:
+            try:
+                from firebase_admin import firestore_async
+                # El canal gRPC se crea en la primera lectura, ya dentro del loop del proceso
+                _async_client = firestore_async.client(app)
+            except Exception as exc:
+                _get_logger().warning("Cliente asíncrono de Firestore no disponible, se usarán hilos: %s", exc)
+                _async_client_failed = True
+    return _async_client
+
+
+class AsyncRepository:
+    """
+    Variante asíncrona de un repositorio (get, get_many, query) con la misma
+    semántica de resultados que FirestoreRepository.
+    Se crea en el hilo de la petición, que es donde se resuelve la configuración.
+    """
+
+    def __init__(self, repo):
+        self.collection_name = repo.collection_name
+        self._client = get_async_client()
+        # Sin cliente asíncrono se delega en una copia del repositorio síncrono (ya instrumentado)
+        self._sync = None if self._client is not None else type(repo)(client=repo.client)
+        # El cliente asíncrono no pasa por el proxy de metrics: sus lecturas se cuentan aquí
+        self._count = self._client is not None and _get_config().get("FIRESTORE_METRICS_ENABLED", True)
+
+    async def get(self, doc_id, fields=None):
+        if not doc_id:
+            return None
+        if self._sync is not None:
+            return await asyncio.to_thread(self._sync._fetch, doc_id, fields)
+        doc_ref = self._client.collection(self.collection_name).document(doc_id)
+        snapshot = await (doc_ref.get(field_paths=list(fields)) if fields else doc_ref.get())
+        if self._count:
+            record_read(snapshot)
+        if not snapshot.exists:
+            return None
+        return snapshot.to_dict() or {}
+
+    async def get_many(self, doc_ids, fields=None, batch_size=READ_BATCH_SIZE):
+        if self._sync is not None:
+            return await asyncio.to_thread(self._sync.get_many, doc_ids, fields, batch_size)
+
+        unique_ids = list(dict.fromkeys(doc_id for doc_id in doc_ids if doc_id))
+        collection = self._client.collection(self.collection_name)
+        result = {}
+        for chunk in chunked(unique_ids, batch_size):
+            refs = [collection.document(doc_id) for doc_id in chunk]
+            snapshots = self._client.get_all(refs, field_paths=list(fields)) if fields else self._client.get_all(refs)
+            async for snapshot in snapshots:
+                if self._count:
+                    record_read(snapshot)
+                if snapshot.exists:
+                    result[snapshot.id] = snapshot.to_dict() or {}
+        return result
+
+    async def query(self, filters=(), order_by=None, limit=None, fields=None):
+        """Devuelve la lista de resultados como tuplas (doc_id, dict)."""
+        if self._sync is not None:
+            return await asyncio.to_thread(
+                lambda: list(self._sync.stream(filters, order_by=order_by, limit=limit, fields=fields))
+            )
+        query = build_query(
+            self._client.collection(self.collection_name), filters, order_by=order_by, limit=limit, fields=fields
+        )
+        items = []
+        async for snapshot in query.stream():
+            if self._count:
+                record_read(snapshot, query=True)
+            items.append((snapshot.id, snapshot.to_dict() or {}))
+        if self._count and not items:
+            record(reads=1)  # una consulta sin resultados se cobra como una lectura
+        return items
+
+
+async def _gather(reads, mode, timeout, context):
+    loop = asyncio.get_running_loop()
+    tasks = [loop.create_task(read, context=context.copy()) for read in reads]
+    if not tasks:
+        return None if mode == "first" else []
+    try:
+        if mode == "first":
+            for next_done in asyncio.as_completed(tasks, timeout=timeout):
+                result = await next_done
+                if result:
+                    return result
+            return None
+
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            raise asyncio.TimeoutError()
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def run_concurrently(reads, timeout=None, mode="all"):
+    """
+    Ejecuta en paralelo las lecturas (corrutinas, p. ej. de AsyncRepository) con un
+    plazo total de `timeout` segundos (FIRESTORE_FANOUT_TIMEOUT por defecto).
+      - mode="all": lista de resultados en el mismo orden que `reads`.
+      - mode="first": primer resultado no vacío en completarse (o None); el resto se cancela.
+    Lanza TimeoutError si vence el plazo y propaga el primer error de Firestore.
+    Debe llamarse desde código síncrono (no desde el propio event loop).
+    """
+    if mode not in ("all", "first"):
+        raise ValueError(f"Modo no soportado: {mode}")
+    if timeout is None:
+        timeout = float(_get_config().get("FIRESTORE_FANOUT_TIMEOUT") or DEFAULT_TIMEOUT)
+
+    # Las lecturas ven la petición en curso (flask.g) aunque corran en el hilo del event loop
+    context = contextvars.copy_context()
+    future = asyncio.run_coroutine_threadsafe(_gather(list(reads), mode, timeout, context), _get_loop())
+    try:
+        return future.result()
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Las lecturas concurrentes de Firestore superaron {timeout} s") from None
@@ -0,0 +1,237 @@
+"""
+Autocompletado de búsquedas del comprador con tolerancia a errores de escritura.
+  - Las sugerencias son los nombres de productos y las categorías visibles, sin
+    acentos y en minúsculas, guardados en un trie. Cada nombre se indexa también a
+    partir de cada una de sus palabras ("saladet" sugiere "Jitomate saladet").
+  - Lo escrito se compara como prefijo con distancia de edición acotada (0 errores
+    hasta 2 letras, 1 hasta 5 y 2 a partir de 6): "aguacte" sugiere "Aguacate".
+    La primera letra debe coincidir, lo que limita la búsqueda a una rama del trie.
+    El recorrido calcula una fila de Levenshtein por nodo y poda las ramas que ya
+    superan la distancia máxima.
+  - El orden es por número de errores y después por popularidad (cuántos productos
+    visibles comparten la sugerencia). Cada nodo guarda las sugerencias más populares
+    de su subárbol, así que completar un prefijo corto no recorre todo el catálogo;
+    un cambio solo invalida esas listas en los nodos de su camino.
+El trie se mantiene al día con el feed de productos (ver productos_feed).
+"""
+
+import heapq
+import threading
+from collections import Counter
+
+from .productos_feed import ProductosListener, is_visible, productos_feed
+from .search import _TOKEN_RE, fold
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20  # sugerencias que guarda cada nodo
+MAX_QUERY_LENGTH = 60
+KIND_PRODUCT = "producto"
+KIND_CATEGORY = "categoria"
+
+
+def normalize(text):
+    """Texto comparable: minúsculas, sin acentos y con las palabras separadas por un espacio."""
+    return " ".join(_TOKEN_RE.findall(fold(text or "")))
+
+
+def max_distance(query):
+    """Errores tolerados según la longitud de lo escrito."""
+    if len(query) <= 2:
+        return 0
+    return 1 if len(query) <= 5 else 2
+
+
+class _Node:
+    __slots__ = ("children", "terminals", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.terminals = set()  # sugerencias (tipo, clave) que terminan en este nodo
+        self.top = None         # más populares del subárbol (None = hay que recalcularlas)
+
+
+class Autocomplete(ProductosListener):
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._root = _Node()
+        self._products = {}     # doc_id -> [(tipo, clave, texto)] que aporta
+        self._labels = {}       # (tipo, clave) -> Counter de textos originales
+
+    # ----- Mantenimiento (ProductosListener) -----
+
+    def reset(self, documents):
+        with self._lock:
+            self._clear()
+            for doc_id, data in documents.items():
+                self._add(doc_id, data)
+            self._top(self._root)
+
+    def apply(self, changes):
+        with self._lock:
+            for doc_id, _, data in changes:
+                self._remove(doc_id)
+                if data is not None:
+                    self._add(doc_id, data)
+
+    def _add(self, doc_id, data):
+        if not is_visible(data):
+            return
+        entries = []
+        for kind, text in ((KIND_PRODUCT, data.get("nombre")), (KIND_CATEGORY, data.get("categoria") or "otros")):
+            text = " ".join(str(text or "").replace("-", " ").split())
+            key = normalize(text)
+            if not key:
+                continue
+            suggestion = (kind, key)
+            labels = self._labels.get(suggestion)
+            if labels is None:
+                labels = self._labels[suggestion] = Counter()
+                for entry in self._entry_points(key):
+                    self._insert(entry, suggestion)
+            else:
+                self._invalidate(key)
+            labels[text] += 1
+            entries.append((kind, key, text))
+        self._products[doc_id] = entries
+
+    def _remove(self, doc_id):
+        for kind, key, text in self._products.pop(doc_id, ()):
+            suggestion = (kind, key)
+            labels = self._labels[suggestion]
+            labels[text] -= 1
+            if labels[text] <= 0:
+                del labels[text]
+            if not labels:
+                del self._labels[suggestion]
+                for entry in self._entry_points(key):
+                    self._delete(entry, suggestion)
+            else:
+                self._invalidate(key)
+
+    @staticmethod
+    def _entry_points(key):
+        """La clave completa y cada sufijo que empieza en una palabra."""
+        words = key.split(" ")
+        return {" ".join(words[index:])[:MAX_QUERY_LENGTH] for index in range(len(words))}
+
+    def _insert(self, entry, suggestion):
+        node = self._root
+        node.top = None
+        for char in entry:
+            node = node.children.setdefault(char, _Node())
+            node.top = None
+        node.terminals.add(suggestion)
+
+    def _invalidate(self, key):
+        """Marca para recalcular las listas de popularidad en los caminos de `key`."""
+        for entry in self._entry_points(key):
+            node = self._root
+            node.top = None
+            for char in entry:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                node.top = None
+
+    def _delete(self, entry, suggestion):
+        path = [self._root]
+        for char in entry:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        for node in path:
+            node.top = None
+        path[-1].terminals.discard(suggestion)
+        # Poda los nodos que se quedaron vacíos
+        for index in range(len(entry) - 1, -1, -1):
+            node = path[index + 1]
+            if node.children or node.terminals:
+                break
+            del path[index].children[entry[index]]
+
+    # ----- Consultas -----
+
+    def __len__(self):
+        return len(self._labels)
+
+    def _popularity(self, suggestion):
+        return sum(self._labels[suggestion].values())
+
+    def _rank_key(self, suggestion):
+        return -self._popularity(suggestion), len(suggestion[1]), suggestion
+
+    def _top(self, node):
+        """Sugerencias más populares del subárbol de `node` (calculadas bajo demanda)."""
+        if node.top is None:
+            candidates = set(node.terminals)
+            for child in node.children.values():
+                candidates.update(self._top(child))
+            node.top = heapq.nsmallest(MAX_LIMIT, candidates, key=self._rank_key)
+        return node.top
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        """
+        Devuelve [{"texto", "tipo", "productos", "errores"}] para lo escrito en `query`,
+        primero las coincidencias exactas y, entre iguales, las más populares.
+        """
+        query = normalize(query)[:MAX_QUERY_LENGTH]
+        if not query:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        allowed = max_distance(query)
+
+        with self._lock:
+            matches = {}  # (tipo, clave) -> menor número de errores
+            branch = self._root.children.get(query[0])
+            if branch is None:
+                return []
+            first_row = self._next_row(query, list(range(len(query) + 1)), query[0])
+            stack = [(branch, first_row, first_row[-1])]
+            while stack:
+                node, row, best = stack.pop()
+                best = min(best, row[-1])
+                if min(row) > allowed:
+                    # Ninguna continuación mejora: si ya coincidía, todo el subárbol completa el prefijo
+                    if best <= allowed:
+                        for suggestion in self._top(node):
+                            if best < matches.get(suggestion, allowed + 1):
+                                matches[suggestion] = best
+                    continue
+                if best <= allowed:
+                    for suggestion in node.terminals:
+                        if best < matches.get(suggestion, allowed + 1):
+                            matches[suggestion] = best
+                for char, child in node.children.items():
+                    stack.append((child, self._next_row(query, row, char), best))
+
+            ranked = heapq.nsmallest(
+                limit, matches.items(),
+                key=lambda item: (item[1],) + self._rank_key(item[0]),
+            )
+            return [
+                {
+                    "texto": self._labels[suggestion].most_common(1)[0][0],
+                    "tipo": suggestion[0],
+                    "productos": self._popularity(suggestion),
+                    "errores": distance,
+                }
+                for suggestion, distance in ranked
+            ]
+
+    @staticmethod
+    def _next_row(query, row, char):
+        next_row = [row[0] + 1]
+        for index, query_char in enumerate(query, start=1):
+            next_row.append(min(
+                next_row[index - 1] + 1,                   # inserción
+                row[index] + 1,                            # borrado
+                row[index - 1] + (query_char != char),     # sustitución
+            ))
+        return next_row
+
+
+autocomplete_index = productos_feed.subscribe(Autocomplete())
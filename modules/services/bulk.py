@@ -0,0 +1,271 @@
+"""
+Escrituras masivas en Firestore (cambios de rol, aprobaciones, borrados, migraciones).
+Las operaciones se agrupan en lotes atómicos de hasta 500 y se confirman:
+  - con un ritmo que arranca en 500 operaciones/s y crece un 50 % cada 5 minutos
+    (la regla 500/50/5 que recomienda Firestore para no provocar contención);
+  - con reintentos y espera exponencial ante errores transitorios (Aborted, ...); si
+    un lote los agota, sus operaciones quedan en `failed`, la ejecución se detiene y
+    `error` explica por qué; las operaciones que no llegaron a enviarse quedan en
+    `skipped`, así que committed + failed + conflicts + unprocessed suma el total;
+  - aislando los documentos que fallan: si un lote falla por un error no transitorio,
+    sus operaciones se repiten una a una y solo las erróneas quedan en `failed`;
+  - con run_groups, las operaciones de un grupo (p. ej. un usuario y su solicitud) van
+    siempre en el mismo lote: se confirman todas o ninguna;
+  - un "update" o "delete" puede llevar como quinto elemento el update_time con el que
+    se leyó el documento: si cambió desde entonces, la operación no se aplica y queda
+    en `conflicts` para que quien la generó vuelva a leerlo.
+El progreso se informa con un callback (o en el log) después de cada lote.
+"""
+
+import random
+import time
+
+from .firestore_client import _get_config, _get_logger, get_firestore_client
+
+try:
+    from google.api_core.exceptions import (
+        Aborted,
+        DeadlineExceeded,
+        FailedPrecondition,
+        InternalServerError,
+        ResourceExhausted,
+        ServiceUnavailable,
+    )
+    RETRYABLE_ERRORS = (Aborted, DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable)
+except ImportError:  # pragma: no cover - google-api-core viene con firebase-admin
+    RETRYABLE_ERRORS = ()
+
+    class FailedPrecondition(Exception):
+        pass
+
+WRITE_BATCH_SIZE = 500
+ACTIONS = ("set", "merge", "create", "update", "delete")
+DEFAULT_INITIAL_RATE = 500  # operaciones por segundo
+DEFAULT_MAX_RATE = 10000
+RAMP_UP_INTERVAL = 300  # segundos
+RAMP_UP_FACTOR = 1.5
+
+
+class BulkResult:
+    """
+    Resumen de una ejecución: confirmadas, fallidas [(colección, doc_id, error)],
+    en conflicto [(colección, doc_id)] por una precondición, lotes, reintentos y, si
+    la ejecución se detuvo antes de terminar, el error que la detuvo y las operaciones
+    que no se enviaron [(colección, doc_id)].
+    """
+
+    def __init__(self):
+        self.committed = 0
+        self.failed = []
+        self.conflicts = []
+        self.skipped = []
+        self.batches = 0
+        self.retries = 0
+        self.error = None
+        self._started = time.monotonic()
+
+    @property
+    def processed(self):
+        return self.committed + len(self.failed) + len(self.conflicts)
+
+    @property
+    def unprocessed(self):
+        return len(self.skipped)
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started
+
+    def to_dict(self):
+        return {
+            "committed": self.committed,
+            "failed": [
+                {"coleccion": collection, "id": doc_id, "error": error}
+                for collection, doc_id, error in self.failed
+            ],
+            "conflicts": [{"coleccion": collection, "id": doc_id} for collection, doc_id in self.conflicts],
+            "unprocessed": self.unprocessed,
+            "skipped": [{"coleccion": collection, "id": doc_id} for collection, doc_id in self.skipped],
+            "batches": self.batches,
+            "retries": self.retries,
+            "error": self.error,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+
+class RampUpLimiter:
+    """Limita las operaciones por segundo y sube el límite de forma gradual."""
+
+    def __init__(self, initial_rate=DEFAULT_INITIAL_RATE, max_rate=DEFAULT_MAX_RATE,
+                 interval=RAMP_UP_INTERVAL, factor=RAMP_UP_FACTOR):
+        self.initial_rate = initial_rate
+        self.max_rate = max(max_rate, initial_rate)
+        self.interval = interval
+        self.factor = factor
+        self._started = time.monotonic()
+        self._available = float(initial_rate)
+        self._updated = self._started
+
+    def rate(self, now=None):
+        now = time.monotonic() if now is None else now
+        steps = int((now - self._started) // self.interval)
+        return min(self.max_rate, self.initial_rate * self.factor ** steps)
+
+    def acquire(self, amount):
+        """Espera hasta poder enviar `amount` operaciones."""
+        now = time.monotonic()
+        rate = self.rate(now)
+        self._available = min(rate, self._available + (now - self._updated) * rate)
+        self._updated = now
+        if amount > self._available:
+            wait = (amount - self._available) / rate
+            time.sleep(wait)
+            self._updated += wait
+            self._available = amount
+        self._available -= amount
+
+
+class BulkMutator:
+    """
+    Aplica operaciones (colección, acción, doc_id, datos[, update_time]) en lotes.
+    Acciones: "set", "merge" (set con merge), "create", "update" y "delete"; las dos
+    últimas admiten el update_time leído como precondición.
+    `progress(result, total)` se llama tras cada lote; `total` puede ser None.
+    """
+
+    def __init__(self, client=None, batch_size=WRITE_BATCH_SIZE, initial_rate=None, max_rate=None,
+                 max_retries=5, progress=None):
+        config = _get_config()
+        self._client = client
+        self.batch_size = max(1, min(int(batch_size), WRITE_BATCH_SIZE))
+        self.limiter = RampUpLimiter(
+            initial_rate=initial_rate or config.get("FIRESTORE_BULK_INITIAL_RATE") or DEFAULT_INITIAL_RATE,
+            max_rate=max_rate or config.get("FIRESTORE_BULK_MAX_RATE") or DEFAULT_MAX_RATE,
+        )
+        self.max_retries = max_retries
+        self.progress = progress or self._log_progress
+
+    @property
+    def client(self):
+        return self._client or get_firestore_client()
+
+    @staticmethod
+    def _log_progress(result, total):
+        _get_logger().info(
+            "💾 Escritura masiva: %s/%s operaciones (%s fallidas, %s lotes, %.1f s)",
+            result.processed, total if total is not None else "?", len(result.failed), result.batches, result.elapsed,
+        )
+
+    def run(self, operations, total=None):
+        """Consume `operations` (cualquier iterable, también un generador) y devuelve un BulkResult."""
+        return self.run_groups(([operation] for operation in operations), total=total)
+
+    def run_groups(self, groups, total=None):
+        """
+        Como run, pero recibe grupos de operaciones que se confirman en el mismo lote:
+        un grupo nunca se reparte entre lotes y, si falla, todas sus operaciones quedan
+        en `failed`. `total` cuenta operaciones, no grupos. Si la ejecución se detiene,
+        los grupos restantes se recorren sin escribirlos para anotarlos en `skipped`.
+        """
+        client = self.client
+        result = BulkResult()
+        if client is None:
+            raise RuntimeError("Firestore no está disponible")
+
+        for chunk in self._chunks(groups):
+            operations = [operation for group in chunk for operation in group]
+            if result.error:
+                result.skipped.extend((operation[0], operation[2]) for operation in operations)
+                continue
+            self.limiter.acquire(len(operations))
+            try:
+                self._commit(client, operations, result)
+                result.committed += len(operations)
+            except RETRYABLE_ERRORS as exc:
+                # Firestore sigue sin responder tras los reintentos: se para aquí sin perder el resumen
+                result.failed.extend((operation[0], operation[2], str(exc)) for operation in operations)
+                result.error = f"Escritura detenida tras {self.max_retries} reintentos: {exc}"
+                _get_logger().error("💾 %s", result.error)
+                self.progress(result, total)
+                continue
+            except Exception:
+                # Un documento inválido no debe tumbar el lote completo
+                self._commit_individually(client, chunk, result)
+            self.progress(result, total)
+        return result
+
+    def _chunks(self, groups):
+        """Agrupa los grupos en lotes de hasta batch_size operaciones sin partir ninguno."""
+        chunk, size = [], 0
+        for group in groups:
+            group = list(group)
+            if not group:
+                continue
+            if len(group) > self.batch_size:
+                raise ValueError(f"Un grupo no puede superar {self.batch_size} operaciones")
+            for operation in group:
+                if operation[1] not in ACTIONS:
+                    raise ValueError(f"Operación de lote desconocida: {operation[1]}")
+                if _precondition(operation) is not None and operation[1] not in ("update", "delete"):
+                    raise ValueError(f"La acción {operation[1]} no admite precondición")
+            if size + len(group) > self.batch_size:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(group)
+            size += len(group)
+        if chunk:
+            yield chunk
+
+    def _commit(self, client, chunk, result):
+        """Confirma un lote reintentando los errores transitorios con espera exponencial."""
+        for attempt in range(self.max_retries + 1):
+            batch = client.batch()
+            for operation in chunk:
+                collection, action, doc_id, data = operation[:4]
+                doc_ref = client.collection(collection).document(doc_id)
+                last_update_time = _precondition(operation)
+                option = None if last_update_time is None else client.write_option(last_update_time=last_update_time)
+                if action == "set":
+                    batch.set(doc_ref, data)
+                elif action == "merge":
+                    batch.set(doc_ref, data, merge=True)
+                elif action == "create":
+                    batch.create(doc_ref, data)
+                elif action == "update":
+                    batch.update(doc_ref, data, option=option)
+                else:
+                    batch.delete(doc_ref, option=option)
+            try:
+                batch.commit()
+                result.batches += 1
+                return
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                result.retries += 1
+                time.sleep(min(0.1 * 2 ** attempt, 5) * (1 + random.random()))
+
+    def _commit_individually(self, client, chunk, result):
+        for group in chunk:
+            try:
+                self._commit(client, group, result)
+                result.committed += len(group)
+            except Exception as exc:
+                paths = ", ".join(f"{operation[0]}/{operation[2]}" for operation in group)
+                if isinstance(exc, FailedPrecondition) and any(_precondition(operation) for operation in group):
+                    # Otro proceso cambió el documento después de leerlo: lo decide quien lo leyó
+                    result.conflicts.extend((operation[0], operation[2]) for operation in group)
+                    _get_logger().info("Conflicto al escribir %s: %s", paths, exc)
+                    continue
+                result.failed.extend((operation[0], operation[2], str(exc)) for operation in group)
+                _get_logger().warning("No se pudo escribir %s: %s", paths, exc)
+
+
+def _precondition(operation):
+    """update_time exigido por la operación (quinto elemento) o None."""
+    return operation[4] if len(operation) > 4 else None
+
+
+def bulk_write(operations, client=None, total=None, **options):
+    """Atajo: BulkMutator(client, **options).run(operations, total)."""
+    return BulkMutator(client=client, **options).run(operations, total=total)
@@ -0,0 +1,235 @@
+"""
+Vista precalculada del catálogo del comprador.
+Solo contiene productos visibles (activo y stock > 0), guardados por columnas en
+arrays de NumPy (precio, descuento, stock, precio final, fecha de publicación y
+códigos de categoría, origen y vendedor). Los filtros, el precio con descuento y el
+orden de una página se calculan con operaciones vectorizadas, así que el coste de
+una consulta crece muy despacio con el tamaño del catálogo.
+Las consultas leen una instantánea inmutable; cada lote de cambios del feed de
+productos (ver productos_feed) construye una copia y la sustituye de una vez
+(copy-on-write), sin bloquear a los lectores.
+"""
+
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from .pagination import decode_cursor, encode_cursor
+from .productos_feed import ProductosListener, is_visible, normalize_category, normalize_origin, product_summary, productos_feed
+
+PAGE_SIZE = 24
+ALL_CATEGORIES = ""
+
+# orden -> (columna, descendente)
+ORDERS = {
+    "recientes": ("fecha", True),
+    "precio_asc": ("precio_final", False),
+    "precio_desc": ("precio_final", True),
+    "descuento": ("descuento", True),
+}
+DEFAULT_ORDER = "recientes"
+
+NUMERIC_COLUMNS = ("precio", "descuento", "stock", "fecha")
+CODE_COLUMNS = ("categoria", "origen", "vendedor")
+
+
+def effective_price(summary):
+    return summary["precio_con_descuento"] or summary["precio"] or 0.0
+
+
+def final_prices(precio, descuento):
+    """Versión vectorizada de discounted_price: precio * (1 - descuento/100) si hay descuento."""
+    with_discount = (descuento > 0) & (precio > 0)
+    return np.where(with_discount, np.round(precio * (1 - descuento / 100), 2), precio)
+
+
+def published_at(data):
+    value = data.get("fecha_publicacion") or data.get("fecha_creacion")
+    return value.timestamp() if isinstance(value, datetime) else 0.0
+
+
+class CatalogSnapshot:
+    """Columnas de una versión del catálogo. No se modifica una vez publicada."""
+
+    def __init__(self, ids, columns, summaries, rows, alive):
+        self.ids = ids                # array de str con el id de cada fila
+        self.columns = columns        # nombre -> array (float64 o int32 para los códigos)
+        self.summaries = summaries    # fila -> product_summary (None si está borrada)
+        self.rows = rows              # doc_id -> fila
+        self.alive = alive            # False en las filas borradas
+
+    @classmethod
+    def empty(cls):
+        columns = {name: np.empty(0, dtype=np.float64) for name in NUMERIC_COLUMNS + ("precio_final",)}
+        columns.update({name: np.empty(0, dtype=np.int32) for name in CODE_COLUMNS})
+        return cls(np.empty(0, dtype=str), columns, [], {}, np.empty(0, dtype=bool))
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class CatalogView(ProductosListener):
+    def __init__(self):
+        self._lock = threading.RLock()  # solo para escritores
+        self._codes = {name: {} for name in CODE_COLUMNS}  # valor -> código (solo crecen)
+        self._snapshot = CatalogSnapshot.empty()
+
+    # ----- Mantenimiento (ProductosListener) -----
+
+    def reset(self, documents):
+        with self._lock:
+            rows = [self._row(doc_id, data) for doc_id, data in documents.items() if is_visible(data)]
+            self._snapshot = self._build(CatalogSnapshot.empty(), {}, rows)
+
+    def apply(self, changes):
+        with self._lock:
+            current = self._snapshot
+            updates, appended = {}, []
+            for doc_id, _, data in changes:
+                row = self._row(doc_id, data) if data is not None and is_visible(data) else None
+                if doc_id in current.rows:
+                    updates[doc_id] = row
+                elif row is not None:
+                    appended = [item for item in appended if item[0] != doc_id] + [row]
+                else:
+                    appended = [item for item in appended if item[0] != doc_id]
+            self._snapshot = self._build(current, updates, appended)
+
+    def _code(self, column, value):
+        codes = self._codes[column]
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def _row(self, doc_id, data):
+        summary = product_summary(doc_id, data)
+        numbers = (summary["precio"], summary["descuento"], summary["stock"], published_at(data))
+        codes = (
+            self._code("categoria", normalize_category(summary["categoria"])),
+            self._code("origen", normalize_origin(summary["origen"])),
+            self._code("vendedor", summary["vendedor_id"]),
+        )
+        return doc_id, numbers, codes, summary
+
+    def _build(self, current, updates, appended):
+        """Copia de `current` con las filas de `updates` cambiadas (None = borrar) y `appended` al final."""
+        columns = {name: column.copy() for name, column in current.columns.items()}
+        alive = current.alive.copy()
+        summaries = list(current.summaries)
+        rows = dict(current.rows)
+
+        for doc_id, row in updates.items():
+            index = rows[doc_id]
+            if row is None:
+                alive[index] = False
+                summaries[index] = None
+                del rows[doc_id]
+                continue
+            _, numbers, codes, summary = row
+            for name, value in zip(NUMERIC_COLUMNS + CODE_COLUMNS, numbers + codes):
+                columns[name][index] = value
+            summaries[index] = summary
+
+        ids = current.ids
+        if appended:
+            start = len(summaries)
+            ids = np.concatenate([ids, np.array([row[0] for row in appended], dtype=str)])
+            for position, name in enumerate(NUMERIC_COLUMNS):
+                values = np.array([row[1][position] for row in appended], dtype=np.float64)
+                columns[name] = np.concatenate([columns[name], values])
+            for position, name in enumerate(CODE_COLUMNS):
+                values = np.array([row[2][position] for row in appended], dtype=np.int32)
+                columns[name] = np.concatenate([columns[name], values])
+            alive = np.concatenate([alive, np.ones(len(appended), dtype=bool)])
+            for offset, row in enumerate(appended):
+                rows[row[0]] = start + offset
+                summaries.append(row[3])
+
+        columns["precio_final"] = final_prices(columns["precio"], columns["descuento"])
+        snapshot = CatalogSnapshot(ids, columns, summaries, rows, alive)
+        if len(summaries) > 64 and len(rows) * 2 < len(summaries):
+            snapshot = self._compact(snapshot)
+        return snapshot
+
+    @staticmethod
+    def _compact(snapshot):
+        """Elimina las filas borradas."""
+        keep = np.flatnonzero(snapshot.alive)
+        ids = snapshot.ids[keep]
+        summaries = [snapshot.summaries[index] for index in keep]
+        return CatalogSnapshot(
+            ids,
+            {name: column[keep] for name, column in snapshot.columns.items()},
+            summaries,
+            {doc_id: index for index, doc_id in enumerate(ids.tolist())},
+            np.ones(len(keep), dtype=bool),
+        )
+
+    # ----- Consultas -----
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def _match_code(self, mask, snapshot, column, value):
+        code = self._codes[column].get(value)
+        if code is None:
+            return np.zeros_like(mask)
+        return mask & (snapshot.columns[column] == code)
+
+    def page(self, categoria=None, origen=None, precio_min=None, precio_max=None,
+             orden=DEFAULT_ORDER, cursor=None, page_size=PAGE_SIZE, vendedor_id=None):
+        """
+        Devuelve (productos, next_cursor) de una página del catálogo filtrado.
+        ValueError si el orden o el cursor no son válidos.
+        """
+        if orden not in ORDERS:
+            raise ValueError(f"Orden no soportado: {orden}")
+        key, descending = ORDERS[orden]
+        position = decode_cursor(cursor) if cursor else None
+        if position and not isinstance(position[0], (int, float)):
+            raise ValueError("Cursor inválido")
+
+        snapshot = self._snapshot
+        values = snapshot.columns[key]
+        mask = snapshot.alive
+        if categoria:
+            mask = self._match_code(mask, snapshot, "categoria", normalize_category(categoria))
+        if origen:
+            mask = self._match_code(mask, snapshot, "origen", normalize_origin(origen))
+        if vendedor_id:
+            mask = self._match_code(mask, snapshot, "vendedor", vendedor_id)
+        if precio_min is not None:
+            mask = mask & (snapshot.columns["precio_final"] >= precio_min)
+        if precio_max is not None:
+            mask = mask & (snapshot.columns["precio_final"] <= precio_max)
+        if position:
+            # Orden total por (valor, id): la página empieza justo después del cursor
+            value, last_id = position
+            if descending:
+                mask = mask & ((values < value) | ((values == value) & (snapshot.ids < last_id)))
+            else:
+                mask = mask & ((values > value) | ((values == value) & (snapshot.ids > last_id)))
+
+        candidates = np.flatnonzero(mask)
+        limit = page_size + 1  # uno más para saber si hay página siguiente
+        selected = values[candidates]
+        if len(candidates) > limit:
+            # Descarta lo que no puede entrar en la página antes de ordenar (conservando empates)
+            kth = len(selected) - limit if descending else limit - 1
+            threshold = np.partition(selected, kth)[kth]
+            keep = selected >= threshold if descending else selected <= threshold
+            candidates, selected = candidates[keep], selected[keep]
+        order = np.lexsort((snapshot.ids[candidates], selected))
+        if descending:
+            order = order[::-1]
+        rows = candidates[order[:limit]]
+
+        productos = [snapshot.summaries[index] for index in rows[:page_size]]
+        if len(rows) > page_size:
+            last = rows[page_size - 1]
+            return productos, encode_cursor(float(values[last]), str(snapshot.ids[last]))
+        return productos, None
+
+
+catalog_view = productos_feed.subscribe(CatalogView())
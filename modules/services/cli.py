@@ -0,0 +1,163 @@
+"""
+Comandos de mantenimiento de Firestore: `flask firestore <comando>`.
+Se registran en create_app (app.cli.add_command) y corren con el contexto de la app,
+así que usan la misma configuración y el mismo cliente que las rutas.
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import click
+from flask.cli import AppGroup
+
+from .bulk import ACTIONS, WRITE_BATCH_SIZE, BulkMutator
+from .order_vendors import DEFAULT_CHECKPOINT, DEFAULT_WORKERS, VendorBackfill, load_checkpoint
+from .popularity import SCORES_COLLECTION, compute_scores
+from .ratings import RATINGS_COLLECTION, aggregate_comments
+from .repositories import comentarios_repo, compras_repo
+
+firestore_cli = AppGroup("firestore", help="Tareas de mantenimiento de Firestore.")
+
+
+def _echo_progress(result, total):
+    click.echo(
+        f"  {result.processed}/{total if total is not None else '?'} operaciones "
+        f"({len(result.failed)} fallidas, {result.batches} lotes, {result.elapsed:.1f} s)"
+    )
+
+
+def _read_operations(path):
+    """Lee un JSONL con una operación por línea: {"coleccion", "accion", "id", "datos"}."""
+    with open(path, encoding="utf-8") as handle:
+        for number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                operation = (item["coleccion"], item["accion"], item["id"], item.get("datos"))
+            except (ValueError, KeyError) as exc:
+                raise click.ClickException(f"Línea {number} inválida: {exc}")
+            if operation[1] not in ACTIONS:
+                raise click.ClickException(f"Línea {number}: acción desconocida '{operation[1]}'")
+            if operation[1] != "delete" and not isinstance(operation[3], dict):
+                raise click.ClickException(f"Línea {number}: 'datos' debe ser un objeto")
+            yield operation
+
+
+@firestore_cli.command("bulk")
+@click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=WRITE_BATCH_SIZE, show_default=True, help="Operaciones por lote (máx. 500).")
+@click.option("--dry-run", is_flag=True, help="Valida el archivo sin escribir nada.")
+def bulk_command(archivo, batch_size, dry_run):
+    """Aplica en lotes las operaciones de ARCHIVO (JSONL)."""
+    # Primera pasada: valida todo el archivo antes de escribir y obtiene el total
+    total = sum(1 for _ in _read_operations(archivo))
+    if dry_run:
+        click.echo(f"✅ {total} operaciones válidas (no se escribió nada)")
+        return
+
+    result = BulkMutator(batch_size=batch_size, progress=_echo_progress).run(_read_operations(archivo), total=total)
+    for collection, doc_id, error in result.failed:
+        click.echo(f"❌ {collection}/{doc_id}: {error}", err=True)
+    click.echo(f"💾 {result.committed} operaciones confirmadas en {result.elapsed:.1f} s ({result.retries} reintentos)")
+    if result.error:
+        click.echo(f"⛔ {result.error}; {result.unprocessed} operaciones sin procesar", err=True)
+    if result.failed:
+        raise SystemExit(1)
+
+
+@firestore_cli.command("popularidad")
+@click.option("--dry-run", is_flag=True, help="Calcula el ranking sin guardarlo.")
+def popularidad_command(dry_run):
+    """Recalcula la popularidad de los productos con todo el historial de compras."""
+    now = time.time()
+    compras = compras_repo.paginate(
+        page_size=500, fields=["estado", "productos", "fecha_compra", "fecha_creacion"]
+    )
+    scores = compute_scores(compras, now=now)
+    click.echo(f"📈 {len(scores)} productos con ventas")
+    if dry_run:
+        for product_id, (score, sales) in sorted(scores.items(), key=lambda item: -item[1][0])[:10]:
+            click.echo(f"  {product_id}: {score:.3f} ({sales} ventas)")
+        return
+
+    computed_at = datetime.fromtimestamp(now, tz=timezone.utc)
+    operations = (
+        (SCORES_COLLECTION, "set", product_id, {"puntuacion": score, "ventas": sales, "calculado_en": computed_at})
+        for product_id, (score, sales) in scores.items()
+    )
+    result = BulkMutator(progress=_echo_progress).run(operations, total=len(scores))
+    click.echo(f"💾 {result.committed} puntuaciones guardadas en {SCORES_COLLECTION}")
+    if result.failed:
+        raise SystemExit(1)
+
+
+@firestore_cli.command("calificaciones")
+@click.option("--dry-run", is_flag=True, help="Calcula los agregados sin guardarlos.")
+def calificaciones_command(dry_run):
+    """Reconstruye el agregado de calificaciones de cada producto a partir de sus comentarios."""
+    comentarios = comentarios_repo.paginate(page_size=500, fields=["producto_id", "activo", "calificacion"])
+    aggregates = aggregate_comments(comentarios)
+    click.echo(f"⭐ {len(aggregates)} productos con comentarios")
+    if dry_run:
+        for product_id, aggregate in sorted(aggregates.items(), key=lambda item: -item[1]["total"])[:10]:
+            click.echo(f"  {product_id}: {aggregate['total']} calificaciones, suma {aggregate['suma']}")
+        return
+
+    actualizado = datetime.now(timezone.utc)
+    operations = (
+        (RATINGS_COLLECTION, "set", product_id, dict(aggregate, actualizado=actualizado))
+        for product_id, aggregate in aggregates.items()
+    )
+    result = BulkMutator(progress=_echo_progress).run(operations, total=len(aggregates))
+    click.echo(f"💾 {result.committed} agregados guardados en {RATINGS_COLLECTION}")
+    if result.failed:
+        raise SystemExit(1)
+
+
+def _echo_backfill(report):
+    click.echo(
+        f"  {report.scanned} compras leídas ({report.rate:.0f}/s), {report.updated} por actualizar, "
+        f"{report.committed} escritas, {report.lookups} búsquedas de productos"
+    )
+
+
+@firestore_cli.command("vendedores-compras")
+@click.option("--page-size", default=WRITE_BATCH_SIZE, show_default=True, help="Compras por página (máx. 500).")
+@click.option("--workers", default=DEFAULT_WORKERS, show_default=True, help="Hilos de escritura en paralelo.")
+@click.option("--checkpoint", default=DEFAULT_CHECKPOINT, show_default=True, type=click.Path(dir_okay=False),
+              help="Archivo con el cursor para reanudar.")
+@click.option("--reiniciar", is_flag=True, help="Ignora el checkpoint y empieza desde la primera compra.")
+@click.option("--dry-run", is_flag=True, help="Recorre y cuenta sin escribir nada.")
+def vendedores_compras_command(page_size, workers, checkpoint, reiniciar, dry_run):
+    """Rellena vendedor_id en las líneas de las compras y vendedores_ids en cada compra."""
+    if reiniciar and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    try:
+        backfill = VendorBackfill(page_size=page_size, workers=workers, checkpoint=checkpoint, dry_run=dry_run,
+                                  progress=_echo_backfill)
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc))
+    cursor = None if dry_run else load_checkpoint(checkpoint)
+    if cursor:
+        click.echo(f"⏩ Reanudando desde el checkpoint {checkpoint}")
+    report = backfill.run(cursor)
+
+    click.echo(
+        f"📊 {report.scanned} compras en {report.elapsed:.1f} s ({report.rate:.0f} compras/s, {report.pages} páginas); "
+        f"{report.products_looked_up} productos buscados en {report.lookups} lotes"
+    )
+    click.echo(f"🔧 {report.updated if dry_run else report.committed} compras "
+               f"{'por actualizar' if dry_run else 'actualizadas'} "
+               f"({report.lines_fixed} líneas con vendedor_id); {report.unresolved} líneas sin producto conocido")
+    if dry_run:
+        return
+    for collection, doc_id, error in report.failed:
+        click.echo(f"❌ {collection}/{doc_id}: {error}", err=True)
+    if report.failed:
+        click.echo(f"⏸️ El checkpoint {checkpoint} quedó antes de la primera página con fallos; "
+                   f"vuelve a ejecutar el comando para reintentarlas", err=True)
+        raise SystemExit(1)
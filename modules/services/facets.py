@@ -0,0 +1,115 @@
+"""
+Conteos de facetas del catálogo del comprador: productos visibles por categoría,
+por origen y por rango de precio (precio final, con descuento si lo hay).
+Se calculan con las mismas reglas de visibilidad que el catálogo (activo y stock > 0)
+y se mantienen de forma incremental con el feed de productos: cada alta, edición,
+desactivación o producto agotado solo resta su aportación anterior y suma la nueva.
+Los conteos de origen y precio existen para el catálogo completo y para cada categoría.
+"""
+
+import threading
+from bisect import bisect_right
+from collections import Counter
+
+from .catalog import ALL_CATEGORIES, effective_price
+from .productos_feed import ProductosListener, is_visible, normalize_category, normalize_origin, product_summary, productos_feed
+
+# Límites de los rangos de precio: [0, 50), [50, 100), ..., [500, ∞)
+PRICE_BOUNDS = (50, 100, 200, 500)
+
+
+def price_bucket(price):
+    """Índice del rango de precio al que pertenece `price`."""
+    return bisect_right(PRICE_BOUNDS, price)
+
+
+def _bucket_range(index):
+    lower = PRICE_BOUNDS[index - 1] if index > 0 else 0
+    upper = PRICE_BOUNDS[index] if index < len(PRICE_BOUNDS) else None
+    return lower, upper
+
+
+class FacetCounts(ProductosListener):
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._items = {}       # doc_id -> (categoría, origen, rango de precio)
+        self._categories = Counter()
+        self._partitions = {}  # categoría ("" = todas) -> (Counter origen, Counter rango)
+
+    # ----- Mantenimiento (ProductosListener) -----
+
+    def reset(self, documents):
+        with self._lock:
+            self._clear()
+            for doc_id, data in documents.items():
+                self._add(doc_id, data)
+
+    def apply(self, changes):
+        with self._lock:
+            for doc_id, _, data in changes:
+                self._remove(doc_id)
+                if data is not None:
+                    self._add(doc_id, data)
+
+    def _add(self, doc_id, data):
+        if not is_visible(data):
+            return
+        summary = product_summary(doc_id, data)
+        item = (
+            normalize_category(summary["categoria"]),
+            normalize_origin(summary["origen"]),
+            price_bucket(effective_price(summary)),
+        )
+        self._items[doc_id] = item
+        self._update(item, 1)
+
+    def _remove(self, doc_id):
+        item = self._items.pop(doc_id, None)
+        if item is not None:
+            self._update(item, -1)
+
+    def _update(self, item, delta):
+        category, origin, bucket = item
+        self._categories[category] += delta
+        if not self._categories[category]:
+            del self._categories[category]
+        for partition in (ALL_CATEGORIES, category):
+            origins, buckets = self._partitions.setdefault(partition, (Counter(), Counter()))
+            origins[origin] += delta
+            buckets[bucket] += delta
+            if not origins[origin]:
+                del origins[origin]
+            if not buckets[bucket]:
+                del buckets[bucket]
+            if not origins:
+                del self._partitions[partition]
+
+    # ----- Consultas -----
+
+    def __len__(self):
+        return len(self._items)
+
+    def counts(self, categoria=None):
+        """
+        Conteos para los filtros del catálogo. Las categorías son siempre las del
+        catálogo completo; origen y precio se limitan a `categoria` si se indica.
+        """
+        partition = normalize_category(categoria) if categoria else ALL_CATEGORIES
+        with self._lock:
+            origins, buckets = self._partitions.get(partition, (Counter(), Counter()))
+            precios = []
+            for index in range(len(PRICE_BOUNDS) + 1):
+                lower, upper = _bucket_range(index)
+                precios.append({"min": lower, "max": upper, "productos": buckets.get(index, 0)})
+            return {
+                "total": sum(origins.values()),
+                "categorias": dict(self._categories.most_common()),
+                "origenes": dict(origins.most_common()),
+                "precios": precios,
+            }
+
+
+facet_counts = productos_feed.subscribe(FacetCounts())
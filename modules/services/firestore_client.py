@@ -1,65 +1,221 @@
 import json
+import logging
 import os
-from functools import lru_cache
+import threading
+import time
 
-from flask import current_app
+from flask import current_app, has_app_context
 
+# Estado del proceso: Firebase Admin se inicializa una sola vez. Un fallo por falta del
+# SDK es definitivo; cualquier otro (credenciales, red) se reintenta tras INIT_RETRY_SECONDS.
+_init_lock = threading.Lock()
+_init_done = False
+_init_retry_at = 0.0
+_firebase_app = None
+_client = None
+_fake_client = None
 
-@lru_cache(maxsize=1)
-def _load_firestore_client():
-    """
-    Inicializa Firebase Admin y devuelve un cliente de Firestore.
-    Si Firebase Admin no está disponible o la inicialización falla, devuelve None.
-    Se usa memoización para evitar inicializaciones repetidas en el ciclo de vida de la app.
-    """
-    try:
-        import firebase_admin
-        from firebase_admin import credentials, firestore
-    except ImportError:
-        return None
+DEFAULT_PROJECT_ID = "agromarket-625b2"  # Mismo valor que en static/js/firebase-config.js
+INIT_RETRY_SECONDS = 30.0
 
-    if firebase_admin._apps:
-        return firestore.client()
 
-    cred = _build_credentials(firebase_admin)
-    if not cred:
-        return None
+def _get_config():
+    if has_app_context():
+        return current_app.config
+    return {}
+
 
-    firebase_admin.initialize_app(cred)
-    return firestore.client()
+def _get_logger():
+    if has_app_context():
+        return current_app.logger
+    return logging.getLogger(__name__)
 
 
-def _build_credentials(firebase_admin):
+def _candidate_credential_paths(config):
     """
-    Construye las credenciales de Firebase Admin según la configuración disponible.
-    Se soporta:
-      - Ruta a archivo de servicio (FIREBASE_CREDENTIALS_PATH)
+    Rutas donde se busca el archivo del service account, en orden de prioridad
+    (GOOGLE_APPLICATION_CREDENTIALS va aparte: se prueba antes que el JSON en variable de entorno).
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    current_dir = os.getcwd()
+    return [
+        config.get("FIREBASE_CREDENTIALS_PATH") or os.environ.get("FIREBASE_CREDENTIALS_PATH"),
+        # Docker/producción: /app es el directorio de trabajo del contenedor
+        "/app/config/serviceAccountKey.json",
+        "/app/serviceAccountKey.json",
+        os.path.join(base_dir, "config", "serviceAccountKey.json"),
+        os.path.join(base_dir, "serviceAccountKey.json"),
+        os.path.join(current_dir, "config", "serviceAccountKey.json"),
+        os.path.join(current_dir, "serviceAccountKey.json"),
+        os.path.join(base_dir, "firebase-service-account.json"),
+    ]
+
+
+def _build_credentials(config):
+    """
+    Construye las credenciales de Firebase Admin según la configuración disponible,
+    en este orden (el mismo que usaba modules/auth):
+      - Archivo de GOOGLE_APPLICATION_CREDENTIALS
       - JSON de servicio en variable de entorno (FIREBASE_SERVICE_ACCOUNT_JSON)
-      - Credenciales por defecto (GOOGLE_APPLICATION_CREDENTIALS / ADC)
+      - Archivo de FIREBASE_CREDENTIALS_PATH o las ubicaciones conocidas de serviceAccountKey.json
+      - Credenciales por defecto (ADC)
+    Devuelve (credenciales, project_id) o (None, None).
     """
     from firebase_admin import credentials
 
-    config = getattr(current_app, "config", {}) or {}
-    credentials_path = config.get("FIREBASE_CREDENTIALS_PATH") or os.environ.get("FIREBASE_CREDENTIALS_PATH")
-    credentials_json = config.get("FIREBASE_SERVICE_ACCOUNT_JSON") or os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON")
+    logger = _get_logger()
+    project_id = (
+        os.environ.get("FIREBASE_PROJECT_ID")
+        or os.environ.get("GOOGLE_CLOUD_PROJECT")
+        or config.get("FIREBASE_PROJECT_ID")
+        or DEFAULT_PROJECT_ID
+    )
+
+    google_credentials = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if google_credentials and os.path.exists(google_credentials):
+        logger.info("📁 Usando credenciales de Firebase desde: %s", google_credentials)
+        cred = credentials.Certificate(google_credentials)
+        return cred, getattr(cred, "project_id", None) or project_id
 
+    credentials_json = config.get("FIREBASE_SERVICE_ACCOUNT_JSON") or os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON")
     if credentials_json:
         try:
             service_dict = json.loads(credentials_json)
-            return credentials.Certificate(service_dict)
-        except json.JSONDecodeError:
-            current_app.logger.error("No se pudo parsear FIREBASE_SERVICE_ACCOUNT_JSON; revisa el formato.")
-            return None
+            return credentials.Certificate(service_dict), service_dict.get("project_id") or project_id
+        except (json.JSONDecodeError, ValueError) as exc:
+            logger.error("No se pudo parsear FIREBASE_SERVICE_ACCOUNT_JSON; revisa el formato: %s", exc)
 
-    if credentials_path and os.path.exists(credentials_path):
-        return credentials.Certificate(credentials_path)
+    for path in _candidate_credential_paths(config):
+        if path and os.path.exists(path):
+            logger.info("📁 Usando credenciales de Firebase desde: %s", path)
+            cred = credentials.Certificate(path)
+            return cred, getattr(cred, "project_id", None) or project_id
 
     try:
-        return credentials.ApplicationDefault()
+        return credentials.ApplicationDefault(), project_id
     except Exception as exc:
-        current_app.logger.warning("No se pudieron cargar credenciales de Firebase Admin: %s", exc)
+        logger.warning("No se pudieron cargar credenciales de Firebase Admin: %s", exc)
+        return None, None
+
+
+def initialize_firebase_app():
+    """
+    Inicializa Firebase Admin una sola vez por proceso y devuelve la app (o None).
+    Tras un éxito las llamadas posteriores no repiten la búsqueda de credenciales; tras
+    un fallo transitorio se vuelve a intentar pasados INIT_RETRY_SECONDS.
+    """
+    global _init_done, _init_retry_at, _firebase_app
+
+    if _init_done or time.monotonic() < _init_retry_at:
+        return _firebase_app
+
+    with _init_lock:
+        if _init_done or time.monotonic() < _init_retry_at:
+            return _firebase_app
+
+        logger = _get_logger()
+        try:
+            import firebase_admin
+        except ImportError:
+            logger.warning("Firebase Admin SDK no está disponible (no instalado).")
+            _init_done = True
+            return None
+
+        try:
+            if firebase_admin._apps:
+                _firebase_app = firebase_admin.get_app()
+            else:
+                cred, project_id = _build_credentials(_get_config())
+                if cred:
+                    _firebase_app = firebase_admin.initialize_app(cred, {"projectId": project_id})
+                    logger.info("✅ Firebase Admin SDK inicializado (project: %s)", project_id)
+                else:
+                    logger.warning("⚠️ No se encontraron credenciales de Firebase Admin SDK.")
+        except Exception as exc:
+            logger.error("❌ Error inicializando Firebase Admin: %s", exc)
+            _firebase_app = None
+
+        if _firebase_app is not None:
+            _init_done = True
+        else:
+            logger.warning("Se reintentará inicializar Firebase Admin en %.0f s", INIT_RETRY_SECONDS)
+            _init_retry_at = time.monotonic() + INIT_RETRY_SECONDS
+        return _firebase_app
+
+
+def _load_firestore_client():
+    """
+    Devuelve el cliente de Firestore del proceso, creándolo la primera vez.
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    app = initialize_firebase_app()
+    if app is None:
         return None
 
+    with _init_lock:
+        if _client is None:
+            from firebase_admin import firestore
+            _client = firestore.client(app)
+    return _client
+
+
+def _use_memory_backend(config):
+    backend = config.get("FIRESTORE_BACKEND") or os.environ.get("FIRESTORE_BACKEND") or "firebase"
+    return backend.lower() == "memory"
+
+
+def get_fake_client():
+    """
+    Devuelve el Firestore en memoria del proceso (FIRESTORE_BACKEND=memory),
+    creándolo con la latencia y los datos iniciales configurados.
+    """
+    global _fake_client
+
+    if _fake_client is not None:
+        return _fake_client
+
+    with _init_lock:
+        if _fake_client is None:
+            from .firestore_fake import FakeFirestoreClient
+
+            config = _get_config()
+            latency_ms = config.get("FIRESTORE_FAKE_LATENCY_MS") or os.environ.get("FIRESTORE_FAKE_LATENCY_MS") or 0
+            fixtures = config.get("FIRESTORE_FAKE_FIXTURES") or os.environ.get("FIRESTORE_FAKE_FIXTURES")
+            _fake_client = FakeFirestoreClient(latency_ms=float(latency_ms), fixtures=fixtures or None)
+            _get_logger().info("🧪 Usando Firestore en memoria (latencia simulada: %s ms)", latency_ms)
+    return _fake_client
+
+
+def reset_firestore_client():
+    """
+    Olvida el cliente y el resultado de la inicialización (útil en pruebas).
+    No elimina la app de Firebase Admin ya registrada.
+    """
+    global _init_done, _init_retry_at, _firebase_app, _client, _fake_client
+    with _init_lock:
+        _init_done = False
+        _init_retry_at = 0.0
+        _firebase_app = None
+        _client = None
+        _fake_client = None
+
+
+def run_transaction(client, func, *args, **kwargs):
+    """
+    Ejecuta func(transaction, *args, **kwargs) dentro de una transacción de Firestore
+    (con los reintentos de firestore.transactional) o del Firestore en memoria.
+    """
+    if hasattr(client, "run_transaction"):
+        return client.run_transaction(func, *args, **kwargs)
+
+    from firebase_admin import firestore
+
+    return firestore.transactional(func)(client.transaction(), *args, **kwargs)
+
 
 def get_firestore_client():
     """
@@ -67,11 +223,17 @@ def get_firestore_client():
     No lanza excepciones para facilitar el manejo en rutas/servicios.
     """
     try:
-        client = _load_firestore_client()
-        if client is None:
-            current_app.logger.warning("Firestore no está disponible: Firebase Admin no inicializado.")
+        config = _get_config()
+        if _use_memory_backend(config):
+            client = get_fake_client()
+        else:
+            client = _load_firestore_client()
+            if client is None:
+                _get_logger().warning("Firestore no está disponible: Firebase Admin no inicializado.")
+        if client is not None and config.get("FIRESTORE_METRICS_ENABLED", True):
+            from .metrics import instrument
+            client = instrument(client)
         return client
     except Exception as exc:
-        current_app.logger.error("Error inicializando Firestore: %s", exc)
+        _get_logger().error("Error inicializando Firestore: %s", exc)
         return None
-
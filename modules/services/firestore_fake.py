@@ -0,0 +1,786 @@
+"""
+Firestore en memoria para pruebas de carga, benchmarks y tests.
+Imita la parte del cliente de google-cloud-firestore que usa la aplicación:
+  - collection()/document() con get/set/update/delete y subcolecciones
+  - where / order_by / limit / select / start_after / offset y stream()/get()
+  - get_all, lotes (batch) y transacciones (run_transaction)
+  - precondiciones de escritura (write_option con last_update_time o exists)
+  - transformaciones SERVER_TIMESTAMP, DELETE_FIELD, Increment, ArrayUnion, ArrayRemove
+  - on_snapshot sobre consultas (los cambios se entregan al confirmar cada escritura,
+    ya sin el lock del almacén, así que un listener puede leer o escribir el fake)
+Se activa con FIRESTORE_BACKEND=memory; FIRESTORE_FAKE_LATENCY_MS simula el tiempo
+de ida y vuelta de cada operación y FIRESTORE_FAKE_FIXTURES carga datos iniciales (JSON).
+"""
+
+import copy
+import datetime
+import json
+import random
+import string
+import threading
+import time
+
+try:
+    from google.cloud.firestore_v1 import transforms as _transforms
+except ImportError:  # pragma: no cover - google-cloud-firestore viene con firebase-admin
+    _transforms = None
+
+try:
+    from google.cloud.firestore_v1.watch import ChangeType, DocumentChange
+except ImportError:  # pragma: no cover
+    import enum
+    from collections import namedtuple
+
+    ChangeType = enum.Enum("ChangeType", "ADDED REMOVED MODIFIED")
+    DocumentChange = namedtuple("DocumentChange", "type document old_index new_index")
+
+try:
+    from google.api_core.exceptions import AlreadyExists, FailedPrecondition, NotFound
+except ImportError:  # pragma: no cover
+    class NotFound(Exception):
+        pass
+
+    class AlreadyExists(Exception):
+        pass
+
+    class FailedPrecondition(Exception):
+        pass
+
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+
+def _auto_id():
+    return "".join(random.choice(_AUTO_ID_CHARS) for _ in range(20))
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+# ----- Rutas de campos -----
+
+def _split_path(field_path):
+    return field_path.split(".")
+
+
+def _get_field(data, field_path, default=None):
+    current = data
+    for part in _split_path(field_path):
+        if not isinstance(current, dict) or part not in current:
+            return default
+        current = current[part]
+    return current
+
+
+_ABSENT = object()
+
+
+def _set_field(data, field_path, value):
+    parts = _split_path(field_path)
+    current = data
+    for part in parts[:-1]:
+        nested = current.get(part)
+        if not isinstance(nested, dict):
+            nested = current[part] = {}
+        current = nested
+    current[parts[-1]] = value
+
+
+def _delete_field(data, field_path):
+    parts = _split_path(field_path)
+    current = data
+    for part in parts[:-1]:
+        current = current.get(part)
+        if not isinstance(current, dict):
+            return
+    current.pop(parts[-1], None)
+
+
+DOCUMENT_ID = "__name__"
+
+
+def _order_value(doc_id, data, field_path):
+    """Valor por el que se ordena un documento; `__name__` es el ID del documento."""
+    if field_path == DOCUMENT_ID:
+        return doc_id
+    return _get_field(data, field_path, _ABSENT)
+
+
+def _project(data, field_paths):
+    result = {}
+    for field_path in field_paths:
+        value = _get_field(data, field_path, _ABSENT)
+        if value is not _ABSENT:
+            _set_field(result, field_path, copy.deepcopy(value))
+    return result
+
+
+# ----- Transformaciones -----
+
+def _is_sentinel(value, name):
+    return _transforms is not None and value is getattr(_transforms, name, None)
+
+
+def _resolve_value(value, current):
+    """Resuelve centinelas/transformaciones contra el valor actual del campo."""
+    if _transforms is None:
+        return value
+    if _is_sentinel(value, "SERVER_TIMESTAMP"):
+        return _now()
+    if isinstance(value, _transforms.Increment):
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + value.value
+    if isinstance(value, _transforms.ArrayUnion):
+        base = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if item not in base:
+                base.append(item)
+        return base
+    if isinstance(value, _transforms.ArrayRemove):
+        base = list(current) if isinstance(current, list) else []
+        return [item for item in base if item not in value.values]
+    return copy.deepcopy(value)
+
+
+def _apply_set(existing, data, merge):
+    if not merge:
+        result = {}
+        _merge_values(result, data)
+        return result
+    result = copy.deepcopy(existing) if existing is not None else {}
+    _merge_values(result, data)
+    return result
+
+
+def _merge_values(target, changes):
+    for key, value in changes.items():
+        if _is_sentinel(value, "DELETE_FIELD"):
+            target.pop(key, None)
+        elif isinstance(value, dict):
+            nested = target.get(key)
+            if not isinstance(nested, dict):
+                nested = target[key] = {}
+            _merge_values(nested, value)
+        else:
+            target[key] = _resolve_value(value, target.get(key))
+
+
+def _apply_update(existing, changes):
+    result = copy.deepcopy(existing)
+    for field_path, value in changes.items():
+        if _is_sentinel(value, "DELETE_FIELD"):
+            _delete_field(result, field_path)
+        else:
+            _set_field(result, field_path, _resolve_value(value, _get_field(result, field_path)))
+    return result
+
+
+# ----- Orden de valores (aproximación del orden de tipos de Firestore) -----
+
+def _type_rank(value):
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime.datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, list):
+        return 8
+    if isinstance(value, dict):
+        return 9
+    return 6
+
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if rank == 3 and value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    if rank == 8:
+        return (rank, tuple(_sort_key(item) for item in value))
+    if rank == 9:
+        return (rank, tuple(sorted((k, _sort_key(v)) for k, v in value.items())))
+    if rank in (0, 6):
+        return (rank, str(value))
+    return (rank, value)
+
+
+def _compare(left, op, right):
+    if op == "==":
+        return left is not _ABSENT and _sort_key(left) == _sort_key(right)
+    if op == "!=":
+        return left is not _ABSENT and left is not None and _sort_key(left) != _sort_key(right)
+    if op == "in":
+        return left is not _ABSENT and any(_sort_key(left) == _sort_key(item) for item in right)
+    if op == "not-in":
+        return left is not _ABSENT and left is not None and all(_sort_key(left) != _sort_key(item) for item in right)
+    if op == "array-contains":
+        return isinstance(left, list) and any(_sort_key(item) == _sort_key(right) for item in left)
+    if op == "array-contains-any":
+        return isinstance(left, list) and any(_sort_key(item) == _sort_key(value) for item in left for value in right)
+    if left is _ABSENT or _type_rank(left) != _type_rank(right):
+        # Las desigualdades solo comparan valores del mismo tipo
+        return False
+    left_key, right_key = _sort_key(left), _sort_key(right)
+    if op == "<":
+        return left_key < right_key
+    if op == "<=":
+        return left_key <= right_key
+    if op == ">":
+        return left_key > right_key
+    if op == ">=":
+        return left_key >= right_key
+    raise ValueError(f"Operador no soportado: {op}")
+
+
+# ----- Snapshots y referencias -----
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None, read_time=None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = read_time or _now()
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        if self._data is None:
+            return None
+        return copy.deepcopy(_get_field(self._data, field_path))
+
+
+class FakeDocumentReference:
+    def __init__(self, client, collection_path, doc_id):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self._collection_path}/{self.id}"
+
+    @property
+    def parent(self):
+        return FakeCollectionReference(self._client, self._collection_path)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def collection(self, name):
+        return FakeCollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None):
+        self._client._round_trip()
+        return self._client._snapshot(self, field_paths)
+
+    def create(self, data):
+        self._client._round_trip()
+        self._client._write(self, "create", data)
+
+    def set(self, data, merge=False):
+        self._client._round_trip()
+        self._client._write(self, "merge" if merge else "set", data)
+
+    def update(self, data, option=None):
+        self._client._round_trip()
+        self._client._write(self, "update", data, option)
+
+    def delete(self, option=None):
+        self._client._round_trip()
+        self._client._write(self, "delete", None, option)
+
+
+class FieldFilter:
+    """Equivalente a google.cloud.firestore_v1.base_query.FieldFilter."""
+
+    def __init__(self, field_path, op_string, value=None):
+        self.field_path = field_path
+        self.op_string = op_string
+        self.value = value
+
+
+class FakeQuery:
+    def __init__(self, client, collection_path, filters=(), orders=(), limit=None,
+                 offset=0, projection=None, cursor=None):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._projection = projection
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        params = dict(
+            filters=self._filters, orders=self._orders, limit=self._limit,
+            offset=self._offset, projection=self._projection, cursor=self._cursor,
+        )
+        params.update(changes)
+        return FakeQuery(self._client, self._collection_path, **params)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def offset(self, count):
+        return self._copy(offset=count)
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def _with_cursor(self, document_fields_or_snapshot, inclusive, before):
+        return self._copy(cursor=(document_fields_or_snapshot, inclusive, before))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._with_cursor(document_fields_or_snapshot, inclusive=False, before=True)
+
+    def start_at(self, document_fields_or_snapshot):
+        return self._with_cursor(document_fields_or_snapshot, inclusive=True, before=True)
+
+    def end_before(self, document_fields_or_snapshot):
+        return self._with_cursor(document_fields_or_snapshot, inclusive=False, before=False)
+
+    def end_at(self, document_fields_or_snapshot):
+        return self._with_cursor(document_fields_or_snapshot, inclusive=True, before=False)
+
+    def _cursor_key(self, cursor):
+        if isinstance(cursor, FakeDocumentSnapshot):
+            data = cursor._data or {}
+            values = [_order_value(cursor.id, data, field_path) for field_path, _ in self._orders]
+            return values, cursor.id
+        if isinstance(cursor, dict):
+            values = []
+            for field_path, _ in self._orders[:len(cursor)]:
+                value = cursor.get(field_path, _get_field(cursor, field_path))
+                values.append(value.id if isinstance(value, FakeDocumentReference) else value)
+            return values, None
+        return list(cursor), None
+
+    def _run(self):
+        documents = self._client._collection_items(self._collection_path)
+        matches = []
+        for doc_id, (data, create_time, update_time) in documents:
+            if all(_compare(_get_field(data, f, _ABSENT), op, v) for f, op, v in self._filters):
+                if all(_order_value(doc_id, data, f) is not _ABSENT for f, _ in self._orders):
+                    matches.append((doc_id, data, create_time, update_time))
+
+        # Orden estable por cada campo, del último al primero. Como en Firestore, el
+        # desempate final es el ID del documento en la dirección del último orden.
+        matches.sort(key=lambda item: item[0], reverse=self._descending_tiebreak())
+        for index in range(len(self._orders) - 1, -1, -1):
+            field_path, direction = self._orders[index]
+            matches.sort(
+                key=lambda item: _sort_key(_order_value(item[0], item[1], field_path)),
+                reverse=(direction == DESCENDING),
+            )
+
+        if self._cursor is not None:
+            matches = self._apply_cursor(matches)
+
+        matches = matches[self._offset:]
+        if self._limit is not None:
+            matches = matches[:self._limit]
+        return matches
+
+    def _descending_tiebreak(self):
+        return bool(self._orders) and self._orders[-1][1] == DESCENDING
+
+    def _apply_cursor(self, matches):
+        cursor, inclusive, before = self._cursor
+        values, cursor_id = self._cursor_key(cursor)
+
+        def position(item):
+            # -1 si el documento va antes del cursor, 0 si coincide, 1 si va después
+            for (field_path, direction), value in zip(self._orders, values):
+                left, right = _sort_key(_order_value(item[0], item[1], field_path)), _sort_key(value)
+                if left != right:
+                    result = -1 if left < right else 1
+                    return -result if direction == DESCENDING else result
+            if cursor_id is not None and len(values) >= len(self._orders):
+                if item[0] != cursor_id:
+                    result = -1 if item[0] < cursor_id else 1
+                    return -result if self._descending_tiebreak() else result
+            return 0
+
+        if before:
+            return [item for item in matches if position(item) > 0 or (inclusive and position(item) == 0)]
+        return [item for item in matches if position(item) < 0 or (inclusive and position(item) == 0)]
+
+    def stream(self, transaction=None):
+        self._client._round_trip()
+        for doc_id, data, create_time, update_time in self._run():
+            reference = FakeDocumentReference(self._client, self._collection_path, doc_id)
+            if self._projection is not None:
+                data = _project(data, self._projection)
+            self._client._count("documents_streamed")
+            yield FakeDocumentSnapshot(reference, copy.deepcopy(data), create_time, update_time)
+
+    def get(self, transaction=None):
+        return list(self.stream(transaction=transaction))
+
+    def on_snapshot(self, callback):
+        """
+        Igual que Query.on_snapshot: llama a callback(docs, changes, read_time) con el
+        resultado inicial y después con cada cambio. Devuelve un objeto con unsubscribe().
+        """
+        return self._client._watch(self, callback)
+
+    def _snapshots(self):
+        snapshots = []
+        for doc_id, data, create_time, update_time in self._run():
+            reference = FakeDocumentReference(self._client, self._collection_path, doc_id)
+            if self._projection is not None:
+                data = _project(data, self._projection)
+            snapshots.append(FakeDocumentSnapshot(reference, copy.deepcopy(data), create_time, update_time))
+        return snapshots
+
+
+class FakeWatch:
+    """
+    Escucha activa de una consulta: compara el resultado tras cada escritura.
+    Las entregas de una misma escucha no se solapan (como el hilo de Watch del cliente
+    real): un aviso que llega durante una entrega lo atiende el hilo que ya entrega.
+    """
+
+    def __init__(self, client, query, callback):
+        self._client = client
+        self._query = query
+        self._callback = callback
+        self._known = None  # {doc_id: (índice, snapshot)}
+        self._state = threading.Lock()
+        self._delivering = False
+        self._dirty = False
+
+    def unsubscribe(self):
+        with self._client._lock:
+            if self in self._client._watches:
+                self._client._watches.remove(self)
+
+    def _notify(self):
+        with self._state:
+            self._dirty = True
+            if self._delivering:
+                return
+            self._delivering = True
+        try:
+            while True:
+                with self._state:
+                    if not self._dirty:
+                        self._delivering = False
+                        return
+                    self._dirty = False
+                self._deliver()
+        except BaseException:
+            with self._state:
+                self._delivering = False
+            raise
+
+    def _deliver(self):
+        with self._client._lock:
+            snapshots = self._query._snapshots()
+        first = self._known is None
+        known = self._known or {}
+        current = {snapshot.id: (index, snapshot) for index, snapshot in enumerate(snapshots)}
+
+        changes = []
+        for doc_id, (old_index, snapshot) in known.items():
+            if doc_id not in current:
+                changes.append(DocumentChange(ChangeType.REMOVED, snapshot, old_index, -1))
+        for doc_id, (new_index, snapshot) in current.items():
+            previous = known.get(doc_id)
+            if previous is None:
+                changes.append(DocumentChange(ChangeType.ADDED, snapshot, -1, new_index))
+            elif previous[1].update_time != snapshot.update_time:
+                changes.append(DocumentChange(ChangeType.MODIFIED, snapshot, previous[0], new_index))
+
+        self._known = current
+        if first or changes:
+            self._callback(snapshots, changes, _now())
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        return FakeDocumentReference(self._client, self._collection_path, document_id or _auto_id())
+
+    def add(self, document_data, document_id=None):
+        reference = self.document(document_id)
+        reference.create(document_data)
+        return _now(), reference
+
+    def list_documents(self):
+        return [
+            FakeDocumentReference(self._client, self._collection_path, doc_id)
+            for doc_id, _ in self._client._collection_items(self._collection_path)
+        ]
+
+
+class FakeWriteOption:
+    """Precondición de una escritura (Client.write_option)."""
+
+    def __init__(self, last_update_time=None, exists=None):
+        self.last_update_time = last_update_time
+        self.exists = exists
+
+    def check(self, reference, current):
+        if self.last_update_time is not None:
+            if current is None or current[2] != self.last_update_time:
+                raise FailedPrecondition(f"Document was updated after {self.last_update_time}: {reference.path}")
+        elif self.exists and current is None:
+            raise NotFound(f"No document to update: {reference.path}")
+        elif self.exists is False and current is not None:
+            raise AlreadyExists(f"Document already exists: {reference.path}")
+
+
+class FakeWriteBatch:
+    """Acumula escrituras y las aplica de forma atómica en commit()."""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def create(self, reference, document_data):
+        self._writes.append((reference, "create", document_data, None))
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append((reference, "merge" if merge else "set", document_data, None))
+
+    def update(self, reference, field_updates, option=None):
+        self._writes.append((reference, "update", field_updates, option))
+
+    def delete(self, reference, option=None):
+        self._writes.append((reference, "delete", None, option))
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self):
+        self._client._round_trip()
+        self._client._commit(self._writes)
+        results = [_now() for _ in self._writes]
+        self._writes = []
+        return results
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Transacción serializada: el cliente bloquea el almacén mientras se ejecuta."""
+
+    def get(self, ref_or_query):
+        # Como Transaction.get: también para una referencia devuelve un generador de snapshots
+        if isinstance(ref_or_query, FakeDocumentReference):
+            return self._client.get_all([ref_or_query], transaction=self)
+        return ref_or_query.stream(transaction=self)
+
+
+class FakeFirestoreClient:
+    def __init__(self, latency_ms=0, fixtures=None):
+        self.latency = (latency_ms or 0) / 1000.0
+        self._collections = {}
+        self._lock = threading.RLock()
+        self._last_time = None
+        self._deferred = set()  # colecciones por avisar al terminar la transacción en curso
+        self._watches = []
+        self.stats = {"round_trips": 0, "reads": 0, "writes": 0, "documents_streamed": 0}
+        if fixtures:
+            self.seed(fixtures)
+
+    # ----- API pública tipo google-cloud-firestore -----
+
+    def collection(self, path):
+        return FakeCollectionReference(self, path)
+
+    def document(self, path):
+        collection_path, doc_id = path.rsplit("/", 1)
+        return FakeDocumentReference(self, collection_path, doc_id)
+
+    def collections(self):
+        return [FakeCollectionReference(self, path) for path in self._collections if "/" not in path]
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        self._round_trip()
+        for reference in references:
+            yield self._snapshot(reference, field_paths)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    @staticmethod
+    def write_option(**kwargs):
+        """Igual que Client.write_option: exactamente uno de last_update_time o exists."""
+        if len(kwargs) != 1 or not set(kwargs) <= {"last_update_time", "exists"}:
+            raise TypeError("Se esperaba exactamente uno de last_update_time o exists")
+        return FakeWriteOption(**kwargs)
+
+    def transaction(self, **kwargs):
+        return FakeTransaction(self)
+
+    def run_transaction(self, func, *args, **kwargs):
+        """
+        Ejecuta func(transaction, *args, **kwargs) de forma aislada y confirma sus escrituras.
+        Equivale a decorar la función con firestore.transactional.
+        """
+        with self._lock:
+            transaction = FakeTransaction(self)
+            result = func(transaction, *args, **kwargs)
+            transaction.commit()
+            paths, self._deferred = self._deferred, set()
+        self._notify_watches(paths)
+        return result
+
+    # ----- Datos de prueba -----
+
+    def seed(self, fixtures):
+        """Carga {colección: {doc_id: datos}}; admite un dict o la ruta a un JSON."""
+        if isinstance(fixtures, str):
+            with open(fixtures, encoding="utf-8") as handle:
+                fixtures = json.load(handle)
+        with self._lock:
+            now = self._next_time()
+            for collection_path, documents in fixtures.items():
+                store = self._collections.setdefault(collection_path, {})
+                for doc_id, data in documents.items():
+                    store[doc_id] = (copy.deepcopy(data), now, now)
+        self._notify_watches(set(fixtures))
+
+    def dump(self):
+        with self._lock:
+            return {
+                path: {doc_id: copy.deepcopy(entry[0]) for doc_id, entry in documents.items()}
+                for path, documents in self._collections.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            paths = set(self._collections)
+            self._collections.clear()
+            for key in self.stats:
+                self.stats[key] = 0
+        self._notify_watches(paths)
+
+    # ----- Internos -----
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _round_trip(self):
+        self._count("round_trips")
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _collection_items(self, collection_path):
+        with self._lock:
+            return list(self._collections.get(collection_path, {}).items())
+
+    def _snapshot(self, reference, field_paths=None):
+        with self._lock:
+            self.stats["reads"] += 1
+            entry = self._collections.get(reference._collection_path, {}).get(reference.id)
+        if entry is None:
+            return FakeDocumentSnapshot(reference, None)
+        data, create_time, update_time = entry
+        data = _project(data, field_paths) if field_paths else copy.deepcopy(data)
+        return FakeDocumentSnapshot(reference, data, create_time, update_time)
+
+    def _watch(self, query, callback):
+        watch = FakeWatch(self, query, callback)
+        with self._lock:
+            self._watches.append(watch)
+        watch._notify()
+        return watch
+
+    def _notify_watches(self, collection_paths):
+        if self._lock._is_owned():
+            # Escritura dentro de run_transaction: se avisa cuando suelte el lock
+            self._deferred.update(collection_paths)
+            return
+        for watch in list(self._watches):
+            if watch._query._collection_path in collection_paths:
+                watch._notify()
+
+    def _write(self, reference, action, data, option=None):
+        self._commit([(reference, action, data, option)])
+
+    def _next_time(self):
+        # Como en Firestore, cada escritura tiene un update_time mayor que la anterior
+        now = _now()
+        if self._last_time is not None and now <= self._last_time:
+            now = self._last_time + datetime.timedelta(microseconds=1)
+        self._last_time = now
+        return now
+
+    def _commit(self, writes):
+        with self._lock:
+            # Se calcula todo antes de aplicar para que el lote sea atómico
+            staged = {}
+            now = self._next_time()
+            for reference, action, data, option in writes:
+                key = (reference._collection_path, reference.id)
+                if key in staged:
+                    current = staged[key]
+                else:
+                    current = self._collections.get(reference._collection_path, {}).get(reference.id)
+                if option is not None:
+                    option.check(reference, current)
+                existing = current[0] if current is not None else None
+                create_time = current[1] if current is not None else now
+
+                if action == "create":
+                    if existing is not None:
+                        raise AlreadyExists(f"Document already exists: {reference.path}")
+                    staged[key] = (_apply_set(None, data, merge=False), now, now)
+                elif action == "set":
+                    staged[key] = (_apply_set(existing, data, merge=False), create_time, now)
+                elif action == "merge":
+                    staged[key] = (_apply_set(existing, data, merge=True), create_time, now)
+                elif action == "update":
+                    if existing is None:
+                        raise NotFound(f"No document to update: {reference.path}")
+                    staged[key] = (_apply_update(existing, data), create_time, now)
+                elif action == "delete":
+                    staged[key] = None
+                else:
+                    raise ValueError(f"Operación desconocida: {action}")
+
+            for (collection_path, doc_id), entry in staged.items():
+                store = self._collections.setdefault(collection_path, {})
+                if entry is None:
+                    store.pop(doc_id, None)
+                else:
+                    store[doc_id] = entry
+            self.stats["writes"] += len(writes)
+        self._notify_watches({collection_path for collection_path, _ in staged})
@@ -0,0 +1,272 @@
+"""
+Contabilidad de operaciones de Firestore (pagamos por documento leído).
+El cliente devuelto por get_firestore_client se envuelve en un proxy que cuenta,
+sin cambiar su API:
+  - reads: documentos leídos (una consulta sin resultados cuenta como una lectura)
+  - writes / deletes: escrituras y borrados (directos, en lotes o en transacciones)
+  - streamed: documentos devueltos por consultas
+  - bytes: tamaño estimado de los documentos leídos y escritos, solo en modo debug
+    (estimarlo obliga a copiar cada documento con to_dict())
+Los contadores se acumulan por petición (flask.g), por endpoint y en total para el
+proceso. Las lecturas concurrentes (async_firestore) se ejecutan con el contexto de
+la petición que las lanza: las del cliente asíncrono, que no pasa por el proxy, se
+cuentan con record_read. Las hechas fuera de una petición (comandos CLI) solo suman al total.
+"""
+
+import threading
+from datetime import date, datetime
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, request
+
+OPERATIONS = ("reads", "writes", "deletes", "streamed", "bytes")
+DOCUMENT_OVERHEAD_BYTES = 32  # Firestore suma 32 bytes por documento además del nombre
+
+_lock = threading.Lock()
+_totals = dict.fromkeys(OPERATIONS, 0)
+_endpoints = {}
+
+
+# ----- Tamaño estimado (reglas de almacenamiento de Firestore) -----
+
+def estimate_size(value):
+    """Tamaño aproximado en bytes de un valor de Firestore."""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime, date)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key).encode("utf-8")) + 1 + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    path = getattr(value, "path", None)
+    if isinstance(path, str):  # DocumentReference
+        return len(path.encode("utf-8")) + 1
+    return 16  # GeoPoint, centinelas, ...
+
+
+def _measure_bytes():
+    return has_app_context() and current_app.debug
+
+
+def _snapshot_size(snapshot):
+    if not getattr(snapshot, "exists", False) or not _measure_bytes():
+        return 0
+    return DOCUMENT_OVERHEAD_BYTES + len(snapshot.id) + 1 + estimate_size(snapshot.to_dict() or {})
+
+
+# ----- Registro -----
+
+def record(**amounts):
+    """Suma operaciones a la petición actual (si la hay) y al total del proceso."""
+    stats = g.get("_firestore_stats") if has_request_context() else None
+    with _lock:
+        for name, amount in amounts.items():
+            _totals[name] += amount
+            if stats is not None:
+                stats[name] += amount
+
+
+def record_read(snapshot, query=False):
+    """Cuenta un documento leído sin pasar por el proxy (cliente asíncrono de Firestore)."""
+    if query:
+        record(reads=1, streamed=1, bytes=_snapshot_size(snapshot))
+    else:
+        record(reads=1, bytes=_snapshot_size(snapshot))
+
+
+def request_stats():
+    """Contadores de la petición en curso (o None fuera de una petición)."""
+    if not has_request_context():
+        return None
+    return g.get("_firestore_stats")
+
+
+def snapshot():
+    """Copia de los contadores acumulados: total del proceso y por endpoint."""
+    with _lock:
+        return {
+            "totals": dict(_totals),
+            "endpoints": {endpoint: dict(stats) for endpoint, stats in _endpoints.items()},
+        }
+
+
+def reset():
+    with _lock:
+        for name in OPERATIONS:
+            _totals[name] = 0
+        _endpoints.clear()
+
+
+def _start_request():
+    g._firestore_stats = dict.fromkeys(OPERATIONS, 0)
+
+
+def _finish_request(response):
+    stats = g.pop("_firestore_stats", None)
+    if stats is None:
+        return response
+
+    endpoint = request.endpoint or "<sin endpoint>"
+    with _lock:
+        totals = _endpoints.get(endpoint)
+        if totals is None:
+            totals = _endpoints[endpoint] = dict.fromkeys(OPERATIONS + ("requests", "max_reads"), 0)
+        for name in OPERATIONS:
+            totals[name] += stats[name]
+        totals["requests"] += 1
+        totals["max_reads"] = max(totals["max_reads"], stats["reads"])
+
+    budget = current_app.config.get("FIRESTORE_READ_BUDGET") or 0
+    if budget and stats["reads"] > budget:
+        current_app.logger.warning(
+            "⚠️ %s %s leyó %s documentos de Firestore (presupuesto: %s)",
+            request.method, request.path, stats["reads"], budget,
+        )
+
+    if current_app.debug:
+        for name in OPERATIONS:
+            response.headers[f"X-Firestore-{name.capitalize()}"] = str(stats[name])
+    return response
+
+
+def init_app(app):
+    """Registra los hooks que abren y cierran los contadores de cada petición."""
+    if not app.config.get("FIRESTORE_METRICS_ENABLED", True):
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+# ----- Proxy del cliente -----
+
+def _kind(target):
+    name = type(target).__name__
+    if name.endswith("DocumentSnapshot"):
+        return "snapshot"
+    if name.endswith("DocumentReference"):
+        return "document"
+    if name.endswith(("Query", "CollectionReference", "CollectionGroup")):
+        return "query"
+    if name.endswith(("WriteBatch", "Transaction", "BulkWriter")):
+        return "writer"
+    if name.endswith("Client"):
+        return "client"
+    return None
+
+
+def _wrap(value):
+    if isinstance(value, InstrumentedProxy):
+        return value
+    kind = _kind(value)
+    return InstrumentedProxy(value, kind) if kind else value
+
+
+def _unwrap(value):
+    if isinstance(value, InstrumentedProxy):
+        return value._target
+    if isinstance(value, list):
+        return [_unwrap(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_unwrap(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _unwrap(item) for key, item in value.items()}
+    return value
+
+
+def _count_snapshots(snapshots, query=False):
+    """Cuenta los documentos a medida que se consumen (generadores o listas)."""
+    returned = 0
+    for snapshot in snapshots:
+        returned += 1
+        record_read(snapshot, query=query)
+        yield _wrap(snapshot)
+    if query and not returned:
+        record(reads=1)
+
+
+def _write_size(args, kwargs):
+    if not _measure_bytes():
+        return 0
+    data = args[1] if len(args) > 1 else kwargs.get("document_data", kwargs.get("field_updates"))
+    return estimate_size(data) if isinstance(data, dict) else 0
+
+
+class InstrumentedProxy:
+    """Envuelve un objeto de Firestore (cliente, referencia, consulta, lote...) y cuenta sus operaciones."""
+
+    __slots__ = ("_target", "_kind")
+
+    def __init__(self, target, kind):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_kind", kind)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith("_"):
+            return attr
+        if not callable(attr):
+            return _wrap(attr)
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            args = [_unwrap(arg) for arg in args]
+            kwargs = {key: _unwrap(value) for key, value in kwargs.items()}
+            if self._kind == "client" and name == "run_transaction" and args:
+                func = args[0]
+                args[0] = lambda transaction, *a, **kw: func(_wrap(transaction), *a, **kw)
+            result = attr(*args, **kwargs)
+            return self._account(name, args, kwargs, result)
+        return call
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __iter__(self):
+        return iter(self._target)
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"InstrumentedProxy({self._target!r})"
+
+    def _account(self, name, args, kwargs, result):
+        kind = self._kind
+        if kind == "document":
+            if name == "get":
+                record(reads=1, bytes=_snapshot_size(result))
+            elif name in ("set", "update", "create"):
+                record(writes=1, bytes=_write_size([None] + args, kwargs))
+            elif name == "delete":
+                record(deletes=1)
+        elif kind == "query":
+            if name == "stream":
+                return _count_snapshots(result, query=True)
+            if name == "get":
+                return list(_count_snapshots(result, query=True))
+        elif kind == "client" and name == "get_all":
+            return _count_snapshots(result)
+        elif kind == "writer":
+            if name in ("set", "update", "create"):
+                record(writes=1, bytes=_write_size(args, kwargs))
+            elif name == "delete":
+                record(deletes=1)
+            elif name == "get":
+                if _kind(result) == "snapshot":
+                    record(reads=1, bytes=_snapshot_size(result))
+                    return _wrap(result)
+                return _count_snapshots(result, query=bool(args) and _kind(args[0]) == "query")
+        return _wrap(result)
+
+
+def instrument(client):
+    """Devuelve el cliente envuelto en el proxy de contabilidad (o None)."""
+    return _wrap(client) if client is not None else None
@@ -0,0 +1,249 @@
+"""
+Relleno de `vendedor_id` en las líneas de `compras.productos` (y de `vendedores_ids`).
+Las compras antiguas tienen líneas sin vendedor, que obligan a buscar el producto de
+cada línea para saber a quién pertenece. `flask firestore vendedores-compras` las corrige:
+  - recorre `compras` por páginas con cursor (solo productos y vendedores_ids);
+  - por página junta los producto_id sin vendedor que aún no conoce y los busca de una
+    vez (productos_repo.lookup); lo resuelto se reutiliza en las páginas siguientes;
+  - reparte los lotes de escritura (hasta 500 updates) de cada página entre varios
+    hilos, cada uno con su BulkMutator y una parte del ritmo de escritura permitido;
+  - cada update exige el update_time con el que se leyó la compra: si cambió después
+    de leer la página (p. ej. el estado_pedido que ventas.js guarda reescribiendo
+    `productos`), no se pisa; solo esas compras se vuelven a leer y a corregir;
+  - guarda en un archivo el cursor hasta el que todo está escrito, así que un trabajo
+    interrumpido continúa desde ahí (las páginas se confirman en orden). El cursor no
+    pasa de la primera página con compras fallidas: al reanudar se reintentan;
+  - con dry_run no escribe nada ni toca el checkpoint, solo cuenta y mide.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .bulk import DEFAULT_INITIAL_RATE, DEFAULT_MAX_RATE, WRITE_BATCH_SIZE, BulkMutator, BulkResult
+from .firestore_client import _get_config, get_firestore_client
+from .repositories import ComprasRepository, ProductosRepository
+
+BACKFILL_FIELDS = ["productos", "vendedores_ids"]
+DEFAULT_WORKERS = 4
+CONFLICT_RETRIES = 3  # veces que se vuelve a leer una compra que cambió durante el relleno
+DEFAULT_CHECKPOINT = ".vendedores-compras.checkpoint.json"
+
+
+def line_vendor(item):
+    return item.get("vendedor_id") or item.get("vendedorId") or ""
+
+
+def missing_products(orders):
+    """producto_id de las líneas sin vendedor en `orders` [(compra_id, datos)]."""
+    return {
+        item["producto_id"]
+        for _, data in orders
+        for item in data.get("productos") or ()
+        if isinstance(item, dict) and not line_vendor(item) and item.get("producto_id")
+    }
+
+
+def order_fix(data, vendors):
+    """
+    (cambios, líneas corregidas, líneas sin resolver) para una compra. `cambios` es el
+    update de Firestore ({"productos", "vendedores_ids"}) o None si ya está al día.
+    `vendors` es {producto_id: vendedor_id} ("" si el producto no existe).
+    """
+    productos, fixed, unresolved = [], 0, 0
+    for item in data.get("productos") or ():
+        if isinstance(item, dict) and not item.get("vendedor_id"):
+            vendor_id = item.get("vendedorId") or vendors.get(item.get("producto_id") or "", "")
+            if vendor_id:
+                item = dict(item, vendedor_id=vendor_id)
+                fixed += 1
+            else:
+                unresolved += 1
+        productos.append(item)
+
+    vendedores_ids = sorted({line_vendor(item) for item in productos if isinstance(item, dict)} - {""})
+    if not fixed and sorted(data.get("vendedores_ids") or ()) == vendedores_ids:
+        return None, 0, unresolved
+    changes = {"vendedores_ids": vendedores_ids}
+    if fixed:
+        changes["productos"] = productos
+    return changes, fixed, unresolved
+
+
+class BackfillReport:
+    """Contadores del relleno; `rate` son compras leídas por segundo."""
+
+    def __init__(self):
+        self.scanned = 0
+        self.updated = 0
+        self.lines_fixed = 0
+        self.unresolved = 0
+        self.lookups = 0
+        self.products_looked_up = 0
+        self.committed = 0
+        self.failed = []
+        self.pages = 0
+        self.cursor = None
+        self._started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started
+
+    @property
+    def rate(self):
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+
+def load_checkpoint(path):
+    """Cursor guardado en el checkpoint o None si no existe."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle).get("cursor")
+
+
+def save_checkpoint(path, report):
+    # Se escribe en un temporal y se renombra: un corte a medias no deja un JSON roto
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump({"cursor": report.cursor}, handle)
+    os.replace(temporary, path)
+
+
+class VendorBackfill:
+    def __init__(self, client=None, page_size=WRITE_BATCH_SIZE, workers=DEFAULT_WORKERS,
+                 checkpoint=DEFAULT_CHECKPOINT, dry_run=False, progress=None):
+        self.client = client or get_firestore_client()
+        if self.client is None:
+            raise RuntimeError("Firestore no está disponible")
+        self.page_size = max(1, min(int(page_size), WRITE_BATCH_SIZE))
+        self.workers = max(1, int(workers))
+        self.checkpoint = checkpoint
+        self.dry_run = dry_run
+        self.progress = progress or (lambda report: None)
+        self._compras = ComprasRepository(client=self.client)
+        self._productos = ProductosRepository(client=self.client)
+        self._vendors = {}  # producto_id -> vendedor_id ("" si no existe)
+        self._local = threading.local()
+
+    def _mutator(self):
+        # Un BulkMutator por hilo; entre todos respetan el ritmo configurado (500/50/5)
+        mutator = getattr(self._local, "mutator", None)
+        if mutator is None:
+            config = _get_config()
+            initial = config.get("FIRESTORE_BULK_INITIAL_RATE") or DEFAULT_INITIAL_RATE
+            maximum = config.get("FIRESTORE_BULK_MAX_RATE") or DEFAULT_MAX_RATE
+            mutator = self._local.mutator = BulkMutator(
+                client=self.client, initial_rate=max(1, initial // self.workers),
+                max_rate=max(1, maximum // self.workers), progress=lambda result, total: None,
+            )
+        return mutator
+
+    def _reread(self, order_ids):
+        """Operaciones para las compras `order_ids` según su versión actual."""
+        references = [self._compras.document(order_id) for order_id in order_ids]
+        operations = []
+        for snapshot in self.client.get_all(references, field_paths=BACKFILL_FIELDS):
+            if not snapshot.exists:
+                continue
+            changes, _, _ = order_fix(snapshot.to_dict() or {}, self._vendors)
+            if changes is not None:
+                operations.append((self._compras.collection_name, "update", snapshot.id, changes,
+                                   snapshot.update_time))
+        return operations
+
+    def _write(self, operations):
+        result = BulkResult()
+        for attempt in range(CONFLICT_RETRIES + 1):
+            partial = self._mutator().run(operations, total=len(operations))
+            result.committed += partial.committed
+            result.failed.extend(partial.failed)
+            result.batches += partial.batches
+            result.retries += partial.retries
+            conflicts = [doc_id for _, doc_id in partial.conflicts]
+            if not conflicts:
+                break
+            if attempt == CONFLICT_RETRIES:
+                result.failed.extend((self._compras.collection_name, order_id, "La compra cambió durante el relleno")
+                                     for order_id in conflicts)
+                break
+            operations = self._reread(conflicts)
+        return result
+
+    def _resolve(self, orders, report):
+        missing = missing_products(orders) - self._vendors.keys()
+        if not missing:
+            return
+        found = self._productos.lookup(missing)
+        report.lookups += 1
+        report.products_looked_up += len(missing)
+        for product_id in missing:
+            self._vendors[product_id] = (found.get(product_id) or {}).get("vendedor_id") or ""
+
+    def _operations(self, page, report):
+        """Updates de la página, cada uno con el update_time leído como precondición."""
+        operations = []
+        for order_id, data in page.items:
+            changes, fixed, unresolved = order_fix(data, self._vendors)
+            report.unresolved += unresolved
+            if changes is not None:
+                operations.append((self._compras.collection_name, "update", order_id, changes,
+                                   page.update_times.get(order_id)))
+                report.lines_fixed += fixed
+        report.updated += len(operations)
+        return operations
+
+    def _settle(self, pending, report, limit):
+        """
+        Marca como escritas las páginas terminadas, en orden, y avanza el checkpoint.
+        Espera a las más antiguas mientras haya más de `limit` pendientes. Tras la
+        primera página con fallos el cursor ya no avanza, para reintentarla al reanudar.
+        """
+        advanced = False
+        while pending and (len(pending) > limit or pending[0][0].done()):
+            future, cursor = pending.popleft()
+            result = future.result()
+            report.committed += result.committed
+            report.failed.extend(result.failed)
+            if not report.failed:
+                report.cursor = cursor
+                advanced = True
+        if advanced and self.checkpoint:
+            save_checkpoint(self.checkpoint, report)
+
+    def run(self, cursor=None):
+        """Recorre `compras` desde `cursor` (o el checkpoint) y devuelve un BackfillReport."""
+        report = BackfillReport()
+        report.cursor = cursor or (None if self.dry_run else load_checkpoint(self.checkpoint))
+        pages = self._compras.paginate(page_size=self.page_size, cursor=report.cursor,
+                                       fields=BACKFILL_FIELDS).pages()
+        if self.dry_run:
+            for page in pages:
+                self._resolve(page.items, report)
+                report.scanned += len(page)
+                report.pages += 1
+                self._operations(page, report)
+                report.cursor = page.next_cursor
+                self.progress(report)
+            return report
+
+        pending = deque()  # (futuro de escritura de la página, cursor tras la página)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for page in pages:
+                self._resolve(page.items, report)
+                report.scanned += len(page)
+                report.pages += 1
+                operations = self._operations(page, report)
+                pending.append((executor.submit(self._write, operations), page.next_cursor))
+                # No se leen más de dos páginas por hilo por delante de lo escrito
+                self._settle(pending, report, limit=self.workers * 2)
+                self.progress(report)
+            self._settle(pending, report, limit=0)
+        if self.checkpoint and not report.failed and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        self.progress(report)
+        return report
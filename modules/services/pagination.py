@@ -0,0 +1,178 @@
+"""
+Paginación por cursor sobre colecciones de Firestore.
+En lugar de leer una colección completa con `.get()`, se recorre por páginas con
+`start_after`, ordenando siempre por un campo y por el ID del documento (así el
+orden es total y ninguna página repite ni salta documentos).
+Mientras se consume una página, la siguiente se lee en un hilo en segundo plano.
+El cursor se expone como un token opaco que puede devolverse a clientes HTTP y
+usarse después para continuar el recorrido (también en trabajos por lotes).
+"""
+
+import base64
+import binascii
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+DOCUMENT_ID = "__name__"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"__ts__": value.isoformat()}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    raise ValueError(f"Tipo no soportado en un cursor: {type(value).__name__}")
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if set(value) != {"__ts__"}:
+            raise ValueError("Cursor inválido")
+        return datetime.fromisoformat(value["__ts__"])
+    return value
+
+
+def encode_cursor(order_value, doc_id):
+    """Token opaco (base64 urlsafe) con el valor de orden y el ID del último documento."""
+    payload = json.dumps([_encode_value(order_value), doc_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Devuelve (valor_de_orden, doc_id) a partir de un token de encode_cursor.
+    Lanza ValueError si el token está mal formado.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        order_value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as exc:
+        raise ValueError("Cursor inválido") from exc
+    if not isinstance(doc_id, str) or not doc_id:
+        raise ValueError("Cursor inválido")
+    return _decode_value(order_value), doc_id
+
+
+def clamp_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Convierte el parámetro `limit` de una petición en un tamaño de página válido."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+class Page:
+    """
+    Una página de resultados: lista de (doc_id, dict), el cursor para continuar y el
+    update_time de cada documento leído ({doc_id: update_time}, para precondiciones).
+    """
+
+    def __init__(self, items, next_cursor, update_times=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.update_times = update_times or {}
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class CollectionIterator:
+    """
+    Recorre una consulta de Firestore por páginas.
+      - `query`: consulta base (colección con filtros), sin order_by ni limit.
+      - `order_by`: campo de orden; el ID del documento se añade como desempate.
+      - `cursor`: token devuelto por una página anterior para continuar.
+      - `prefetch`: lee la siguiente página en segundo plano mientras se consume la actual.
+    Iterar el objeto produce (doc_id, dict) y mantiene `self.cursor` actualizado tras
+    cada documento, de modo que un trabajo interrumpido puede reanudarse desde ahí.
+    """
+
+    def __init__(self, query, order_by=DOCUMENT_ID, direction="asc", page_size=DEFAULT_PAGE_SIZE,
+                 cursor=None, prefetch=True, fields=None):
+        self.query = query
+        self.order_by = order_by
+        self.direction = "DESCENDING" if direction == "desc" else "ASCENDING"
+        self.page_size = max(1, int(page_size))
+        self.prefetch = prefetch
+        self.fields = list(fields) if fields else None
+        if self.fields and order_by != DOCUMENT_ID and order_by not in self.fields:
+            # El valor de orden es necesario para construir el cursor
+            self.fields.append(order_by)
+        self.cursor = cursor
+        self._position = decode_cursor(cursor) if cursor else None
+
+    def _page_query(self, position):
+        query = self.query
+        if self.order_by != DOCUMENT_ID:
+            query = query.order_by(self.order_by, direction=self.direction)
+        query = query.order_by(DOCUMENT_ID, direction=self.direction)
+        if self.fields:
+            query = query.select(self.fields)
+        if position is not None:
+            order_value, doc_id = position
+            values = {DOCUMENT_ID: doc_id}
+            if self.order_by != DOCUMENT_ID:
+                values[self.order_by] = order_value
+            query = query.start_after(values)
+        return query.limit(self.page_size)
+
+    def _order_value(self, doc_id, data):
+        if self.order_by == DOCUMENT_ID:
+            return doc_id
+        value = data
+        for part in self.order_by.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    def _fetch(self, position):
+        items, update_times = [], {}
+        for snapshot in self._page_query(position).stream():
+            items.append((snapshot.id, snapshot.to_dict() or {}))
+            update_times[snapshot.id] = snapshot.update_time
+        if len(items) < self.page_size:
+            return items, update_times, None
+        doc_id, data = items[-1]
+        return items, update_times, (self._order_value(doc_id, data), doc_id)
+
+    def _token(self, position):
+        return encode_cursor(*position) if position is not None else None
+
+    def pages(self):
+        """Genera objetos Page hasta agotar la consulta."""
+        if self.query is None:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            items, update_times, position = self._fetch(self._position)
+            while True:
+                pending = None
+                if position is not None and executor is not None:
+                    pending = executor.submit(self._fetch, position)
+                yield Page(items, self._token(position), update_times)
+                if position is None:
+                    return
+                items, update_times, position = pending.result() if pending is not None else self._fetch(position)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def first_page(self):
+        """Lee solo una página (sin prefetch): lo habitual en un endpoint HTTP."""
+        if self.query is None:
+            return Page([], None)
+        items, update_times, position = self._fetch(self._position)
+        return Page(items, self._token(position), update_times)
+
+    def __iter__(self):
+        for page in self.pages():
+            for doc_id, data in page:
+                self.cursor = encode_cursor(self._order_value(doc_id, data), doc_id)
+                yield doc_id, data
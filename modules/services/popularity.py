@@ -0,0 +1,303 @@
+"""
+Ranking de productos populares con decaimiento exponencial.
+La popularidad de un producto es la suma de sus ventas (una por pedido) ponderadas
+por 0.5 ** (antigüedad / vida media): una venta de hace una vida media vale la mitad.
+  - Cada puntuación se guarda referida a un instante fijo (`_reference`): una venta en
+    t suma exp(λ·(t - referencia)). Como todas decaen al mismo ritmo, el orden no cambia
+    con el paso del tiempo y solo hay que recolocar los productos que venden.
+  - Se mantienen listas ordenadas de productos visibles para todo el catálogo y por
+    categoría, así que el top-K se lee en O(K).
+  - Las ventas nuevas llegan de un listener sobre `compras` (pedidos posteriores al
+    último cálculo completo) y la visibilidad y los datos de la tarjeta, del feed de
+    productos.
+  - Pasados WATCH_REANCHOR_SECONDS, la siguiente llamada a `ensure_started` reabre el
+    listener desde hace WATCH_OVERLAP_SECONDS, así que no acumula todo el historial
+    desde el arranque del proceso. Los pedidos ya
+    contados dentro del margen se descartan por ID y los IDs anteriores al nuevo
+    inicio se olvidan, porque la consulta ya no puede devolverlos.
+  - El cálculo completo sobre el historial lo hace `flask firestore popularidad`, que
+    guarda el resultado en `popularidad_productos`; conviene programarlo a diario para
+    que el listener arranque con pocos pedidos pendientes.
+"""
+
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+
+from .catalog import ALL_CATEGORIES
+from .firestore_client import _get_config, get_firestore_client
+from .productos_feed import ProductosListener, is_visible, normalize_category, product_summary, productos_feed
+
+SCORES_COLLECTION = "popularidad_productos"
+ORDERS_COLLECTION = "compras"
+COUNTED_STATES = ("pagado", "pendiente")
+DEFAULT_HALF_LIFE_DAYS = 7.0
+HISTORY_HALF_LIVES = 4  # sin cálculo previo, el listener arranca con los pedidos de 4 vidas medias
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 24
+WATCH_REANCHOR_SECONDS = 6 * 3600
+WATCH_OVERLAP_SECONDS = 3600  # margen para pedidos que se escriben con retraso respecto a fecha_compra
+CARD_FIELDS = ("id", "nombre", "precio", "precio_con_descuento", "descuento", "categoria", "unidad", "imagen",
+               "stock", "vendedor_nombre")
+
+logger = logging.getLogger(__name__)
+
+
+def decay_rate(half_life_days=None):
+    """λ por segundo para la vida media configurada (POPULARITY_HALF_LIFE_DAYS)."""
+    if half_life_days is None:
+        half_life_days = float(_get_config().get("POPULARITY_HALF_LIFE_DAYS") or DEFAULT_HALF_LIFE_DAYS)
+    return math.log(2) / (half_life_days * 86400)
+
+
+def order_time(data):
+    """Instante del pedido en segundos: fecha_compra o, en pedidos antiguos, fecha_creacion (ISO)."""
+    value = data.get("fecha_compra")
+    if isinstance(value, datetime):
+        return value.timestamp()
+    value = data.get("fecha_creacion")
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return None
+
+
+def order_products(data):
+    """IDs de producto distintos de un pedido que cuenta como venta (pagado o pendiente)."""
+    if (data.get("estado") or "pendiente") not in COUNTED_STATES:
+        return []
+    return list(dict.fromkeys(
+        item["producto_id"] for item in data.get("productos") or ()
+        if isinstance(item, dict) and item.get("producto_id")
+    ))
+
+
+def compute_scores(orders, now=None, half_life_days=None):
+    """
+    Popularidad de cada producto en `now` a partir de un iterable de (pedido_id, datos).
+    Devuelve {producto_id: (puntuación, ventas)}.
+    """
+    now = time.time() if now is None else now
+    rate = decay_rate(half_life_days)
+    scores = {}
+    for _, data in orders:
+        moment = order_time(data)
+        if moment is None:
+            continue
+        weight = math.exp(-rate * max(0.0, now - moment))
+        for product_id in order_products(data):
+            score, sales = scores.get(product_id, (0.0, 0))
+            scores[product_id] = (score + weight, sales + 1)
+    return scores
+
+
+class PopularityRanking(ProductosListener):
+    def __init__(self, half_life_days=None):
+        self._half_life_days = half_life_days
+        self._lock = threading.RLock()
+        self._watch = None
+        self._client = None
+        self._started = False
+        self._clear_scores()
+        self._cards = {}       # doc_id -> (categoría, tarjeta) de los productos visibles
+        self._ranked = {}      # categoría ("" = todas) -> [(-puntuación, doc_id)] ordenada
+
+    def _clear_scores(self):
+        self._rate = None
+        self._reference = time.time()
+        self._scores = {}      # doc_id -> puntuación referida a self._reference
+        self._seen_orders = {}  # pedido_id -> instante, solo de pedidos posteriores a self._since
+        self._since = None      # inicio de la consulta del listener (los anteriores ya están contados)
+        self._anchored_at = None
+        self.checkpoint = None  # instante del último cálculo completo cargado
+
+    @property
+    def rate(self):
+        if self._rate is None:
+            self._rate = decay_rate(self._half_life_days)
+        return self._rate
+
+    # ----- Visibilidad (ProductosListener) -----
+
+    def reset(self, documents):
+        with self._lock:
+            self._cards = {}
+            self._ranked = {}
+            for doc_id, data in documents.items():
+                self._add_card(doc_id, data)
+
+    def apply(self, changes):
+        with self._lock:
+            for doc_id, _, data in changes:
+                self._remove_card(doc_id)
+                if data is not None:
+                    self._add_card(doc_id, data)
+
+    def _add_card(self, doc_id, data):
+        if not is_visible(data):
+            return
+        summary = product_summary(doc_id, data)
+        category = normalize_category(summary["categoria"])
+        self._cards[doc_id] = (category, {field: summary[field] for field in CARD_FIELDS})
+        if doc_id in self._scores:
+            self._rank(doc_id, category, self._scores[doc_id])
+
+    def _remove_card(self, doc_id):
+        item = self._cards.pop(doc_id, None)
+        if item is not None and doc_id in self._scores:
+            self._unrank(doc_id, item[0], self._scores[doc_id])
+
+    def _rank(self, doc_id, category, score):
+        for partition in (ALL_CATEGORIES, category):
+            insort(self._ranked.setdefault(partition, []), (-score, doc_id))
+
+    def _unrank(self, doc_id, category, score):
+        for partition in (ALL_CATEGORIES, category):
+            entries = self._ranked[partition]
+            del entries[bisect_left(entries, (-score, doc_id))]
+            if not entries:
+                del self._ranked[partition]
+
+    # ----- Ventas -----
+
+    def _add_score(self, doc_id, amount):
+        card = self._cards.get(doc_id)
+        previous = self._scores.get(doc_id)
+        if card is not None and previous is not None:
+            self._unrank(doc_id, card[0], previous)
+        score = self._scores[doc_id] = (previous or 0.0) + amount
+        if card is not None:
+            self._rank(doc_id, card[0], score)
+
+    def _rebase(self, moment):
+        """Mueve la referencia a `moment` para que los pesos no crezcan sin límite."""
+        factor = math.exp(-self.rate * (moment - self._reference))
+        self._scores = {doc_id: score * factor for doc_id, score in self._scores.items()}
+        self._reference = moment
+        self._ranked = {}
+        for doc_id, (category, _) in self._cards.items():
+            if doc_id in self._scores:
+                self._rank(doc_id, category, self._scores[doc_id])
+
+    def _weight(self, moment):
+        if self.rate * (moment - self._reference) > 500:
+            self._rebase(moment)
+        return math.exp(self.rate * (moment - self._reference))
+
+    def record_order(self, order_id, data):
+        """Suma las ventas de un pedido nuevo (los repetidos se ignoran)."""
+        moment = order_time(data)
+        if moment is None:
+            return
+        with self._lock:
+            if order_id in self._seen_orders or (self._since is not None and moment <= self._since):
+                return
+            self._seen_orders[order_id] = moment
+            weight = self._weight(moment)
+            for product_id in order_products(data):
+                self._add_score(product_id, weight)
+
+    def load(self, scores, computed_at):
+        """Carga un cálculo completo: {producto_id: puntuación en `computed_at`}."""
+        with self._lock:
+            self._clear_scores()
+            weight = self._weight(computed_at)
+            for product_id, score in scores.items():
+                self._scores[product_id] = score * weight
+            self.checkpoint = computed_at
+            self._ranked = {}
+            for doc_id, (category, _) in self._cards.items():
+                if doc_id in self._scores:
+                    self._rank(doc_id, category, self._scores[doc_id])
+
+    # ----- Listener de compras -----
+
+    def ensure_started(self, client=None):
+        """Carga el último cálculo completo y escucha los pedidos posteriores. True si está activo."""
+        with self._lock:
+            if self._started:
+                if time.time() - self._anchored_at >= WATCH_REANCHOR_SECONDS:
+                    self._reanchor()
+                return True
+            client = client or get_firestore_client()
+            if client is None:
+                return False
+            scores, computed_at = {}, None
+            for snapshot in client.collection(SCORES_COLLECTION).stream():
+                data = snapshot.to_dict() or {}
+                scores[snapshot.id] = float(data.get("puntuacion") or 0)
+                moment = data.get("calculado_en")
+                if isinstance(moment, datetime):
+                    computed_at = max(computed_at or 0.0, moment.timestamp())
+            if computed_at is None:
+                computed_at = time.time() - HISTORY_HALF_LIVES * math.log(2) / self.rate
+            self.load(scores, computed_at)
+            self._client = client
+            self._listen(computed_at)
+            self._started = True
+            return True
+
+    def _listen(self, since):
+        self._since = since
+        self._anchored_at = time.time()
+        self._seen_orders = {order_id: moment for order_id, moment in self._seen_orders.items() if moment > since}
+        query = self._client.collection(ORDERS_COLLECTION).where(
+            "fecha_compra", ">", datetime.fromtimestamp(since, tz=timezone.utc))
+        self._watch = query.on_snapshot(self._on_orders)
+
+    def _reanchor(self):
+        """Reabre el listener desde hace WATCH_OVERLAP_SECONDS para acotar su resultado y `_seen_orders`."""
+        since = max(self._since, time.time() - WATCH_OVERLAP_SECONDS)
+        previous = self._watch
+        self._watch = None
+        if previous is not None:
+            previous.unsubscribe()
+        self._listen(since)
+
+    def stop(self):
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+            self._watch = None
+            self._client = None
+            self._started = False
+            self._clear_scores()
+            self._ranked = {}
+
+    def _on_orders(self, documents, changes, read_time):
+        try:
+            for change in changes:
+                if change.type.name == "ADDED":
+                    self.record_order(change.document.id, change.document.to_dict() or {})
+        except Exception:
+            logger.exception("Error aplicando pedidos al ranking de popularidad")
+
+    # ----- Consultas -----
+
+    def score(self, doc_id, now=None):
+        """Popularidad actual de un producto (ventas ponderadas por antigüedad)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._scores.get(doc_id, 0.0) * math.exp(-self.rate * (now - self._reference))
+
+    def top(self, categoria=None, limit=DEFAULT_LIMIT):
+        """Los `limit` productos visibles más populares, con su puntuación en `popularidad`."""
+        partition = normalize_category(categoria) if categoria else ALL_CATEGORIES
+        limit = max(1, min(limit, MAX_LIMIT))
+        with self._lock:
+            factor = math.exp(-self.rate * (time.time() - self._reference))
+            return [
+                dict(self._cards[doc_id][1], popularidad=round(-score * factor, 4))
+                for score, doc_id in self._ranked.get(partition, [])[:limit]
+            ]
+
+
+popularity_ranking = productos_feed.subscribe(PopularityRanking())
@@ -0,0 +1,77 @@
+"""
+Detalle de producto en una sola respuesta: producto, resumen del vendedor, sus otros
+productos, primera página de comentarios y resumen de calificaciones.
+  - El producto y los otros productos del vendedor salen de memoria (feed de productos);
+    si el feed no está listo, el producto se lee de Firestore.
+  - El vendedor, la primera página de comentarios y el agregado de calificaciones (ver
+    ratings) se leen a la vez (run_concurrently) y se guardan unos segundos por producto
+    en `product_detail_cache`, porque no cambian con el stock.
+"""
+
+from .async_firestore import AsyncRepository, run_concurrently
+from .cache import TTLCache
+from .productos_feed import product_summary, productos_feed
+from .ratings import (
+    COMMENTS_PAGE_SIZE, comment_filters, comment_summary, json_value, next_comments_cursor, rating_summary,
+)
+from .repositories import calificaciones_repo, comentarios_repo, productos_repo, usuarios_repo
+from .vendor_products import vendor_products
+
+RELATED_LIMIT = 4
+VENDOR_FIELDS = (
+    "nombre", "nombre_tienda", "email", "ubicacion", "ubicacion_formatted",
+    "ubicacion_lat", "ubicacion_lng", "fecha_registro",
+)
+
+# producto_id -> {"vendedor", "comentarios", "comentarios_cursor", "calificaciones"}; configurable en create_app
+product_detail_cache = TTLCache(maxsize=512, ttl=15)
+
+
+def vendor_summary(data):
+    if data is None:
+        return None
+    return {field: json_value(data.get(field)) for field in VENDOR_FIELDS}
+
+
+async def _first_comments(repo, product_id):
+    # Mismo orden que comments_page: fecha y después ID, ambos descendentes
+    return await repo.query(comment_filters(product_id), order_by=("fecha", "desc"), limit=COMMENTS_PAGE_SIZE)
+
+
+def _load_related_reads(product_id, vendor_id):
+    cached = product_detail_cache.get(product_id)
+    if cached is not None:
+        return cached
+
+    vendor, comments, ratings = run_concurrently([
+        AsyncRepository(usuarios_repo).get(vendor_id, fields=VENDOR_FIELDS),
+        _first_comments(AsyncRepository(comentarios_repo), product_id),
+        AsyncRepository(calificaciones_repo).get(product_id),
+    ])
+    result = {
+        "vendedor": vendor_summary(vendor),
+        "comentarios": [comment_summary(doc_id, data) for doc_id, data in comments],
+        "comentarios_cursor": next_comments_cursor(comments, COMMENTS_PAGE_SIZE),
+        "calificaciones": rating_summary(ratings),
+    }
+    product_detail_cache.set(product_id, result)
+    return result
+
+
+def product_detail(product_id):
+    """Devuelve el detalle agregado del producto o None si no existe."""
+    data = productos_feed.get(product_id)[0] if productos_feed.ready else productos_repo.get(product_id)
+    if data is None:
+        return None
+
+    producto = product_summary(product_id, data)
+    producto["imagenes"] = [
+        imagen for imagen in data.get("imagenes") or ()
+        if isinstance(imagen, str) and imagen.startswith(("http://", "https://"))
+    ]
+    vendor_id = producto["vendedor_id"]
+    detail = {"producto": producto}
+    detail.update(_load_related_reads(product_id, vendor_id))
+    total, related = vendor_products.top(vendor_id, limit=RELATED_LIMIT, exclude=product_id) if vendor_id else (0, [])
+    detail["mas_del_vendedor"] = {"total": total, "productos": related}
+    return detail
@@ -0,0 +1,199 @@
+"""
+Feed de cambios de la colección `productos`.
+Un único listener de Firestore (on_snapshot) por proceso mantiene en memoria el
+estado actual del catálogo y reparte los cambios a los índices suscritos (búsqueda,
+vista de catálogo, facetas...), así ninguno de ellos vuelve a leer la colección.
+  - Al arrancar, cada suscriptor recibe reset({doc_id: datos}) con todo el catálogo.
+  - Después recibe apply([(doc_id, anterior, nuevo)]) con cada lote de cambios
+    (anterior es None en altas y nuevo es None en bajas).
+El listener arranca la primera vez que una petición lo necesita (ensure_started).
+Con varios workers cada proceso mantiene su propio feed.
+`version` crece con cada lote de cambios y cada producto guarda la versión en la que
+cambió por última vez; junto con `epoch` (distinto en cada proceso) sirven de ETag.
+"""
+
+import logging
+import threading
+import uuid
+
+from .firestore_client import _get_config, get_firestore_client
+from .metrics import record
+
+DEFAULT_START_TIMEOUT = 10.0  # segundos de espera del snapshot inicial
+
+logger = logging.getLogger(__name__)
+
+
+def _as_number(value, default=0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def is_visible(data):
+    """Mismas reglas que productos-comprador.js: activo === true y stock > 0."""
+    return data.get("activo") is True and _as_number(data.get("stock")) > 0
+
+
+def discounted_price(data):
+    """Precio con descuento (como en productos-comprador.js) o None si no aplica."""
+    precio = _as_number(data.get("precio"))
+    descuento = _as_number(data.get("descuento"))
+    if descuento > 0 and precio > 0:
+        return round(precio * (1 - descuento / 100), 2)
+    return None
+
+
+def normalize_category(value):
+    """Categoría normalizada: minúsculas, sin espacios extremos y guiones como espacios."""
+    return " ".join(str(value or "otros").replace("-", " ").lower().split()) or "otros"
+
+
+def normalize_origin(value):
+    """Origen normalizado: minúsculas y espacios colapsados; vacío cuenta como "local"."""
+    return " ".join(str(value or "").lower().split()) or "local"
+
+
+def product_summary(doc_id, data):
+    """Representación pública de un producto para el comprador (misma forma que en el frontend)."""
+    imagen = data.get("imagen")
+    if not (isinstance(imagen, str) and imagen.strip().startswith(("http://", "https://"))):
+        imagen = None
+    precio = _as_number(data.get("precio"))
+    return {
+        "id": doc_id,
+        "nombre": data.get("nombre") or "Sin nombre",
+        "precio": precio,
+        "precio_con_descuento": discounted_price(data),
+        "descuento": _as_number(data.get("descuento")),
+        "categoria": data.get("categoria") or "otros",
+        "stock": _as_number(data.get("stock")),
+        "unidad": data.get("unidad") or "kg",
+        "imagen": imagen,
+        "vendedor_id": data.get("vendedor_id") or data.get("vendedorId") or "",
+        "vendedor_nombre": data.get("vendedor_nombre") or "N/A",
+        "descripcion": data.get("descripcion") or "",
+        "origen": data.get("origen") or "Local",
+        "activo": data.get("activo") is True,
+    }
+
+
+class ProductosListener:
+    """Base de los suscriptores del feed; por defecto ignoran los eventos que no usan."""
+
+    def reset(self, documents):
+        """Estado completo: {doc_id: datos}."""
+
+    def apply(self, changes):
+        """Lote de cambios: [(doc_id, datos_anteriores, datos_nuevos)] (nuevos None si se borró)."""
+
+
+class ProductosFeed:
+    collection_name = "productos"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._documents = {}
+        self._watch = None
+        self._ready = threading.Event()
+        self._versions = {}  # doc_id -> versión del feed en la que cambió
+        self.version = 0  # cambia con cada snapshot aplicado
+        self.epoch = uuid.uuid4().hex[:8]
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def subscribe(self, listener):
+        """Registra un suscriptor; si el feed ya está activo recibe el estado actual."""
+        with self._lock:
+            self._listeners.append(listener)
+            if self.ready:
+                self._notify(listener, "reset", self._documents)
+        return listener
+
+    def documents(self):
+        """Copia superficial del estado actual {doc_id: datos}; los datos no deben modificarse."""
+        with self._lock:
+            return dict(self._documents)
+
+    def get(self, doc_id):
+        """(datos, versión) de un producto, o (None, None) si no existe."""
+        with self._lock:
+            return self._documents.get(doc_id), self._versions.get(doc_id)
+
+    def etag(self, doc_id=None):
+        """ETag del catálogo completo o, con `doc_id`, de un producto."""
+        version = self.version if doc_id is None else self._versions.get(doc_id)
+        return f"{self.epoch}.{version}"
+
+    def ensure_started(self, client=None, timeout=None):
+        """
+        Arranca el listener si no está activo y espera el snapshot inicial.
+        Devuelve True si el feed está listo.
+        """
+        if not self.ready:
+            with self._lock:
+                if self._watch is None:
+                    client = client or get_firestore_client()
+                    if client is None:
+                        return False
+                    self._watch = client.collection(self.collection_name).on_snapshot(self._on_snapshot)
+            if timeout is None:
+                timeout = float(_get_config().get("PRODUCTOS_FEED_TIMEOUT") or DEFAULT_START_TIMEOUT)
+            self._ready.wait(timeout)
+        return self.ready
+
+    def stop(self):
+        """Detiene el listener y vacía el estado (útil en pruebas)."""
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+            self._watch = None
+            self._documents = {}
+            self._versions = {}
+            self._ready.clear()
+
+    def _notify(self, listener, method, payload):
+        # Un suscriptor con errores no debe detener al resto ni al listener
+        try:
+            getattr(listener, method)(payload)
+        except Exception:
+            logger.exception("Error actualizando %s desde el feed de productos", type(listener).__name__)
+
+    def _on_snapshot(self, documents, changes, read_time):
+        with self._lock:
+            record(reads=len(changes))
+            if not self.ready:
+                self._documents = {snapshot.id: snapshot.to_dict() or {} for snapshot in documents}
+                for listener in self._listeners:
+                    self._notify(listener, "reset", self._documents)
+                self.version += 1
+                self._versions = dict.fromkeys(self._documents, self.version)
+                self._ready.set()
+                return
+
+            diffs = []
+            version = self.version + 1
+            for change in changes:
+                doc_id = change.document.id
+                previous = self._documents.get(doc_id)
+                if change.type.name == "REMOVED":
+                    current = None
+                    self._documents.pop(doc_id, None)
+                    self._versions.pop(doc_id, None)
+                else:
+                    current = change.document.to_dict() or {}
+                    self._documents[doc_id] = current
+                    self._versions[doc_id] = version
+                diffs.append((doc_id, previous, current))
+            if not diffs:
+                return
+            for listener in self._listeners:
+                self._notify(listener, "apply", diffs)
+            self.version = version
+
+
+productos_feed = ProductosFeed()
@@ -0,0 +1,183 @@
+"""
+Calificaciones precalculadas y comentarios paginados de productos.
+Cada producto tiene un documento en `calificaciones_productos` (mismo ID que el
+producto) con el número de calificaciones, su suma y cuántas hay de cada estrella:
+  - add_comment crea el comentario y actualiza el agregado en la misma transacción,
+    así que el resumen nunca se separa de los comentarios publicados por el servidor.
+    Si el producto aún no tiene agregado, se inicializa con sus comentarios activos.
+  - El detalle de producto lee ese único documento en lugar de todos los comentarios.
+  - Los comentarios se sirven por páginas con cursor, por fecha descendente (índice
+    compuesto producto_id + activo + fecha, ver firestore.indexes.json).
+  - `flask firestore calificaciones` reconstruye los agregados desde los comentarios
+    (datos anteriores a este cambio o comentarios editados desde el cliente).
+"""
+
+from datetime import datetime
+
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+
+from .firestore_client import run_transaction
+from .pagination import encode_cursor
+from .productos_feed import _as_number
+from .repositories import calificaciones_repo, comentarios_repo, productos_repo
+
+RATINGS_COLLECTION = calificaciones_repo.collection_name
+STARS = tuple(str(stars) for stars in range(1, 6))
+COMMENTS_PAGE_SIZE = 10
+MAX_COMMENTS_PAGE_SIZE = 50
+MAX_TEXT_LENGTH = 1000
+
+
+def json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stars_of(value):
+    """Estrellas (1..5) de una calificación guardada; 0 si no es un entero válido ("5 " o 4.0 valen 5 y 4)."""
+    number = float(_as_number(value))
+    return int(number) if number.is_integer() and 1 <= number <= 5 else 0
+
+
+def comment_summary(doc_id, data):
+    return {
+        "id": doc_id,
+        "nombre_usuario": data.get("nombre_usuario") or "Usuario",
+        "texto": data.get("texto") or "",
+        "calificacion": stars_of(data.get("calificacion")),
+        "fecha": json_value(data.get("fecha")),
+        "usuario_id": data.get("usuario_id"),
+    }
+
+
+def comment_filters(product_id):
+    return [("producto_id", "==", product_id), ("activo", "==", True)]
+
+
+# ----- Agregados -----
+
+def empty_aggregate():
+    return {"total": 0, "suma": 0, "distribucion": {stars: 0 for stars in STARS}}
+
+
+def add_rating(aggregate, calificacion):
+    """Devuelve una copia de `aggregate` con una calificación más (1..5; el resto no cuenta)."""
+    distribution = dict(empty_aggregate()["distribucion"], **(aggregate.get("distribucion") or {}))
+    result = {"total": int(aggregate.get("total") or 0), "suma": int(aggregate.get("suma") or 0),
+              "distribucion": distribution}
+    stars = str(calificacion)
+    if stars in distribution:
+        result["total"] += 1
+        result["suma"] += calificacion
+        distribution[stars] += 1
+    return result
+
+
+def aggregate_comments(comments):
+    """{producto_id: agregado} a partir de un iterable de (comentario_id, datos)."""
+    aggregates = {}
+    for _, data in comments:
+        product_id = data.get("producto_id")
+        if not product_id or data.get("activo") is False:
+            continue
+        aggregates[product_id] = add_rating(aggregates.get(product_id) or empty_aggregate(),
+                                            stars_of(data.get("calificacion")))
+    return aggregates
+
+
+def rating_summary(aggregate):
+    """Total, promedio y distribución {"1".."5"} de un agregado (None = sin calificaciones)."""
+    aggregate = aggregate or empty_aggregate()
+    total = int(aggregate.get("total") or 0)
+    return {
+        "total": total,
+        "promedio": round(aggregate.get("suma", 0) / total, 1) if total else 0.0,
+        "distribucion": dict(empty_aggregate()["distribucion"], **(aggregate.get("distribucion") or {})),
+    }
+
+
+def product_ratings(product_id):
+    """Resumen de calificaciones del producto leído de su agregado."""
+    return rating_summary(calificaciones_repo.get(product_id))
+
+
+# ----- Comentarios -----
+
+def validate_comment(texto, calificacion):
+    """Devuelve (texto, calificación) limpios o lanza ValueError."""
+    texto = (texto or "").strip()
+    if not texto:
+        raise ValueError("El comentario no puede estar vacío")
+    if len(texto) > MAX_TEXT_LENGTH:
+        raise ValueError(f"El comentario no puede superar {MAX_TEXT_LENGTH} caracteres")
+    try:
+        calificacion = int(calificacion)
+    except (TypeError, ValueError):
+        raise ValueError("Calificación inválida") from None
+    if str(calificacion) not in STARS:
+        raise ValueError("La calificación debe estar entre 1 y 5")
+    return texto, calificacion
+
+
+def add_comment(product_id, usuario_id, nombre_usuario, texto, calificacion):
+    """
+    Publica un comentario y suma su calificación al agregado del producto en una
+    transacción. Devuelve (comentario_id, resumen de calificaciones), None si el
+    producto no existe o Firestore no está disponible; ValueError si los datos no son válidos.
+    """
+    texto, calificacion = validate_comment(texto, calificacion)
+    client = comentarios_repo.client
+    if client is None:
+        return None
+    product_ref = productos_repo.document(product_id)
+    aggregate_ref = calificaciones_repo.document(product_id)
+    comment_ref = comentarios_repo.collection().document()
+
+    def publish(transaction):
+        # Todas las lecturas van antes de las escrituras, como exige Firestore. Con una
+        # referencia, transaction.get devuelve un generador: se lee con ref.get(transaction=...)
+        if not product_ref.get(transaction=transaction).exists:
+            return None
+        snapshot = aggregate_ref.get(transaction=transaction)
+        if snapshot.exists:
+            aggregate = snapshot.to_dict() or {}
+        else:
+            existing = comentarios_repo.query(comment_filters(product_id), fields=["producto_id", "calificacion"])
+            aggregate = aggregate_comments(
+                (item.id, item.to_dict() or {}) for item in transaction.get(existing)
+            ).get(product_id) or empty_aggregate()
+
+        aggregate = add_rating(aggregate, calificacion)
+        transaction.set(comment_ref, {
+            "producto_id": product_id,
+            "usuario_id": usuario_id,
+            "nombre_usuario": nombre_usuario or "Usuario",
+            "texto": texto,
+            "calificacion": calificacion,
+            "fecha": SERVER_TIMESTAMP,
+            "activo": True,
+        })
+        transaction.set(aggregate_ref, dict(aggregate, actualizado=SERVER_TIMESTAMP))
+        return comment_ref.id, rating_summary(aggregate)
+
+    return run_transaction(client, publish)
+
+
+def next_comments_cursor(items, limit):
+    """Cursor tras la última de `items` (doc_id, datos) si la página vino llena."""
+    if len(items) < limit:
+        return None
+    doc_id, data = items[-1]
+    return encode_cursor(data.get("fecha"), doc_id)
+
+
+def comments_page(product_id, cursor=None, limit=COMMENTS_PAGE_SIZE):
+    """
+    Una página de comentarios activos del producto, del más reciente al más antiguo.
+    Devuelve (comentarios, next_cursor); ValueError si el cursor no es válido.
+    """
+    limit = max(1, min(limit, MAX_COMMENTS_PAGE_SIZE))
+    page = comentarios_repo.paginate(
+        comment_filters(product_id), order_by="fecha", direction="desc",
+        page_size=limit, cursor=cursor, prefetch=False,
+    ).first_page()
+    return [comment_summary(doc_id, data) for doc_id, data in page], page.next_cursor
@@ -0,0 +1,380 @@
+"""
+Repositorios de Firestore por colección.
+Todos comparten el cliente del proceso (ver firestore_client) y aplican las mismas
+reglas de lotes, máscaras de campos y manejo de errores:
+  - Si Firestore no está disponible, las lecturas devuelven None / vacío y las
+    escrituras devuelven False (igual que el resto de servicios).
+  - Los errores de Firestore se propagan para que la ruta decida la respuesta HTTP.
+Dentro de una unidad de trabajo (ver unit_of_work) las lecturas de documentos usan
+el identity map de la petición y los set(..., merge=True) se acumulan.
+"""
+
+from .bulk import WRITE_BATCH_SIZE, BulkMutator
+from .cache import TTLCache
+from .firestore_client import get_firestore_client
+from .pagination import DEFAULT_PAGE_SIZE, DOCUMENT_ID, CollectionIterator
+from .unit_of_work import covers, current_unit_of_work, is_plain_value, merge_document, normalize_fields
+
+# Límites de Firestore: get_all acepta muchas referencias, pero conviene trocear;
+# un WriteBatch admite como máximo 500 operaciones (WRITE_BATCH_SIZE, ver bulk).
+READ_BATCH_SIZE = 100
+
+
+def chunked(items, size):
+    """Divide una secuencia en trozos de tamaño `size`."""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def build_query(query, filters=(), order_by=None, limit=None, fields=None):
+    """
+    Aplica filtros, orden, máscara de campos y límite sobre una colección o consulta
+    (síncrona o asíncrona: ambas comparten la misma API de construcción).
+    `filters` es una lista de tuplas (campo, operador, valor);
+    `order_by` es un campo o una tupla (campo, "asc"|"desc").
+    """
+    if query is None:
+        return None
+    for field, op, value in filters:
+        query = query.where(field, op, value)
+    if order_by:
+        field, direction = order_by if isinstance(order_by, tuple) else (order_by, "asc")
+        query = query.order_by(field, direction="DESCENDING" if direction == "desc" else "ASCENDING")
+    if fields:
+        query = query.select(list(fields))
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+class FirestoreRepository:
+    """
+    Acceso a una colección de Firestore.
+    Las subclases solo definen `collection_name` y, si aplica, consultas propias.
+    """
+
+    collection_name = None
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_firestore_client()
+
+    def collection(self):
+        client = self.client
+        if client is None:
+            return None
+        return client.collection(self.collection_name)
+
+    def document(self, doc_id):
+        collection = self.collection()
+        if collection is None:
+            return None
+        return collection.document(doc_id)
+
+    # ----- Lecturas -----
+
+    def get(self, doc_id, fields=None):
+        """
+        Devuelve el documento como dict o None si no existe / Firestore no está disponible.
+        `fields` limita los campos descargados (máscara de campos).
+        """
+        if not doc_id:
+            return None
+        uow = current_unit_of_work()
+        if uow is not None:
+            return uow.get(self, doc_id, self._fetch, fields)
+        return self._fetch(doc_id, fields)
+
+    def _fetch(self, doc_id, fields=None):
+        doc_ref = self.document(doc_id)
+        if doc_ref is None:
+            return None
+        snapshot = doc_ref.get(field_paths=list(fields)) if fields else doc_ref.get()
+        if not snapshot.exists:
+            return None
+        return snapshot.to_dict() or {}
+
+    def get_many(self, doc_ids, fields=None, batch_size=READ_BATCH_SIZE):
+        """
+        Obtiene varios documentos con `get_all` en lotes.
+        Devuelve {doc_id: dict} solo con los documentos existentes.
+        """
+        unique_ids = list(dict.fromkeys(doc_id for doc_id in doc_ids if doc_id))
+        client = self.client
+        if client is None or not unique_ids:
+            return {}
+
+        collection = client.collection(self.collection_name)
+        result = {}
+        for chunk in chunked(unique_ids, batch_size):
+            refs = [collection.document(doc_id) for doc_id in chunk]
+            snapshots = client.get_all(refs, field_paths=list(fields)) if fields else client.get_all(refs)
+            for snapshot in snapshots:
+                if snapshot.exists:
+                    result[snapshot.id] = snapshot.to_dict() or {}
+        return result
+
+    def query(self, filters=(), order_by=None, limit=None, fields=None):
+        """
+        Construye una consulta sobre la colección (ver build_query).
+        Devuelve None si Firestore no está disponible.
+        """
+        return build_query(self.collection(), filters, order_by=order_by, limit=limit, fields=fields)
+
+    def stream(self, filters=(), order_by=None, limit=None, fields=None):
+        """Itera los resultados de una consulta como tuplas (doc_id, dict)."""
+        query = self.query(filters, order_by=order_by, limit=limit, fields=fields)
+        if query is None:
+            return
+        for snapshot in query.stream():
+            yield snapshot.id, snapshot.to_dict() or {}
+
+    def paginate(self, filters=(), order_by=DOCUMENT_ID, direction="asc", page_size=DEFAULT_PAGE_SIZE,
+                 cursor=None, fields=None, prefetch=True):
+        """
+        Devuelve un CollectionIterator sobre la colección (ver pagination).
+        `cursor` es el token de una página anterior; ValueError si no es válido.
+        """
+        return CollectionIterator(
+            self.query(filters),
+            order_by=order_by,
+            direction=direction,
+            page_size=page_size,
+            cursor=cursor,
+            prefetch=prefetch,
+            fields=fields,
+        )
+
+    def find_first(self, filters=(), order_by=None, fields=None):
+        """Devuelve (doc_id, dict) del primer resultado o None."""
+        for doc_id, data in self.stream(filters, order_by=order_by, limit=1, fields=fields):
+            return doc_id, data
+        return None
+
+    # ----- Escrituras -----
+
+    def set(self, doc_id, data, merge=False):
+        uow = current_unit_of_work()
+        if uow is not None:
+            if merge:
+                if self.document(doc_id) is None:
+                    return False
+                uow.merge(self, doc_id, data)
+                return True
+            uow.discard(self, doc_id)
+        return self._apply_set(doc_id, data, merge=merge)
+
+    def _apply_set(self, doc_id, data, merge=False):
+        doc_ref = self.document(doc_id)
+        if doc_ref is None:
+            return False
+        doc_ref.set(data, merge=merge)
+        self._after_write(doc_id, data, merge)
+        return True
+
+    def update(self, doc_id, data):
+        self._before_direct_write(doc_id)
+        doc_ref = self.document(doc_id)
+        if doc_ref is None:
+            return False
+        doc_ref.update(data)
+        return True
+
+    def delete(self, doc_id):
+        self._before_direct_write(doc_id)
+        doc_ref = self.document(doc_id)
+        if doc_ref is None:
+            return False
+        doc_ref.delete()
+        return True
+
+    def _before_direct_write(self, doc_id):
+        uow = current_unit_of_work()
+        if uow is not None:
+            uow.discard(self, doc_id)
+        self._invalidate(doc_id)
+
+    # Ganchos para repositorios con caché
+    def _after_write(self, doc_id, data, merge):
+        pass
+
+    def _invalidate(self, doc_id):
+        pass
+
+    def write_many(self, operations, batch_size=WRITE_BATCH_SIZE, **options):
+        """
+        Aplica operaciones en lotes de hasta 500 con el servicio de escrituras masivas
+        (ritmo progresivo, reintentos y aislamiento de errores; ver bulk).
+        Cada operación es (acción, doc_id, datos) con acción "set", "merge", "create",
+        "update" o "delete". Devuelve el BulkResult de la ejecución.
+        """
+        client = self.client
+        if client is None:
+            return None
+
+        operations = list(operations)
+        for _, doc_id, _ in operations:
+            self._before_direct_write(doc_id)
+
+        return BulkMutator(client=client, batch_size=batch_size, **options).run(
+            ((self.collection_name, action, doc_id, data) for action, doc_id, data in operations),
+            total=len(operations),
+        )
+
+
+class UsuariosRepository(FirestoreRepository):
+    """
+    Además del acceso normal, mantiene una caché TTL de documentos.
+    Cada entrada recuerda qué campos conoce, así que sirve a cualquier proyección
+    que cubra. Las escrituras hechas desde el servidor actualizan la caché
+    (write-through); los cambios hechos desde el navegador se ven como máximo
+    `ttl` segundos tarde.
+    """
+
+    collection_name = "usuarios"
+
+    # Proyección del flujo de Stripe Connect (modules/vendors)
+    STRIPE_FIELDS = (
+        "stripe_account_id",
+        "stripe_account_email",
+        "stripe_status",
+        "stripe_account_status",
+        "stripe_account_created_at",
+        "email",
+        "correo",
+    )
+
+    def __init__(self, client=None, cache=None):
+        super().__init__(client)
+        self.cache = cache or TTLCache(maxsize=1024, ttl=30)
+
+    def get_cached(self, doc_id, fields=None):
+        """Lectura a través de la caché; solo se guardan documentos existentes."""
+        if not doc_id:
+            return None
+        uow = current_unit_of_work()
+        if uow is not None:
+            return uow.get(self, doc_id, self._fetch_cached, fields)
+        return self._fetch_cached(doc_id, fields)
+
+    def _fetch_cached(self, doc_id, fields=None):
+        requested = normalize_fields(fields)
+        entry = self.cache.get(doc_id)
+        if entry is not None and covers(entry["fields"], requested):
+            return entry["data"]
+        data = self._fetch(doc_id, fields)
+        if data is not None:
+            self.cache.set(doc_id, {"fields": requested, "data": data})
+        return data
+
+    def _after_write(self, doc_id, data, merge):
+        # Write-through: la caché refleja lo que el servidor acaba de escribir.
+        if not is_plain_value(data):
+            self.cache.pop(doc_id)
+            return
+        if not merge:
+            self.cache.set(doc_id, {"fields": None, "data": data})
+            return
+        entry = self.cache.get(doc_id)
+        if entry is not None:
+            known = entry["fields"] | frozenset(data) if entry["fields"] is not None else None
+            self.cache.set(doc_id, {"fields": known, "data": merge_document(entry["data"], data)})
+
+    def _invalidate(self, doc_id):
+        # update() admite rutas con puntos; es más seguro invalidar que replicar la semántica.
+        self.cache.pop(doc_id)
+
+
+class ProductosRepository(FirestoreRepository):
+    collection_name = "productos"
+
+    # Campos que necesitan las líneas de compra (estadísticas/ventas del vendedor).
+    # `vendedorId` es el nombre antiguo del campo en algunos productos.
+    LOOKUP_FIELDS = ("vendedor_id", "vendedorId", "nombre", "precio")
+
+    def lookup(self, product_ids):
+        """
+        Búsqueda masiva para líneas de compra: deduplica los IDs, los pide con `get_all`
+        en lotes y solo descarga vendedor_id/nombre/precio.
+        Devuelve {producto_id: {"vendedor_id", "nombre", "precio"}}.
+        """
+        productos = self.get_many(product_ids, fields=self.LOOKUP_FIELDS)
+        return {
+            producto_id: {
+                "vendedor_id": data.get("vendedor_id") or data.get("vendedorId") or "",
+                "nombre": data.get("nombre"),
+                "precio": data.get("precio"),
+            }
+            for producto_id, data in productos.items()
+        }
+
+
+class ComprasRepository(FirestoreRepository):
+    collection_name = "compras"
+
+
+class CarritoRepository(FirestoreRepository):
+    collection_name = "carrito"
+
+
+class ChatsRepository(FirestoreRepository):
+    collection_name = "chats"
+
+
+class ComentariosRepository(FirestoreRepository):
+    collection_name = "comentarios"
+
+
+class CalificacionesRepository(FirestoreRepository):
+    """Agregado de calificaciones por producto (mismo ID que el producto, ver ratings)."""
+    collection_name = "calificaciones_productos"
+
+
+class SolicitudesVendedoresRepository(FirestoreRepository):
+    collection_name = "solicitudes_vendedores"
+
+
+class PasswordResetCodesRepository(FirestoreRepository):
+    collection_name = "password_reset_codes"
+
+    # Campos que necesita la validación de un código
+    VALIDATION_FIELDS = ("email", "code_hash", "used", "verified", "expires_at")
+
+
+def write_together(groups, batch_size=WRITE_BATCH_SIZE, **options):
+    """
+    Aplica grupos de operaciones (repositorio, acción, doc_id, datos) que pueden tocar
+    varias colecciones; cada grupo se confirma en un mismo lote, todo o nada (ver
+    BulkMutator.run_groups). Los repositorios deben compartir cliente: ValueError si no.
+    Devuelve el BulkResult o None si Firestore no está disponible.
+    """
+    groups = [list(group) for group in groups]
+    clients = {repo.client for group in groups for repo, _, _, _ in group}
+    if len(clients) > 1:
+        raise ValueError("Los repositorios de un mismo write_together deben usar el mismo cliente")
+    client = clients.pop() if clients else get_firestore_client()
+    if client is None:
+        return None
+
+    for group in groups:
+        for repo, _, doc_id, _ in group:
+            repo._before_direct_write(doc_id)
+
+    return BulkMutator(client=client, batch_size=batch_size, **options).run_groups(
+        ([(repo.collection_name, action, doc_id, data) for repo, action, doc_id, data in group] for group in groups),
+        total=sum(len(group) for group in groups),
+    )
+
+usuarios_repo = UsuariosRepository()
+productos_repo = ProductosRepository()
+compras_repo = ComprasRepository()
+carrito_repo = CarritoRepository()
+chats_repo = ChatsRepository()
+comentarios_repo = ComentariosRepository()
+calificaciones_repo = CalificacionesRepository()
+solicitudes_vendedores_repo = SolicitudesVendedoresRepository()
+password_reset_codes_repo = PasswordResetCodesRepository()
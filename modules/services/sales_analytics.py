@@ -0,0 +1,194 @@
+"""
+Series temporales de ventas de un vendedor para la página de estadísticas.
+Las ventas del vendedor (ver vendor_lines) se cargan en arrays de NumPy, una fila por
+línea (fecha, importe, cantidad, código de producto) y otra por pedido (fecha,
+importe, código de estado). Cada serie se calcula con operaciones vectorizadas:
+  - np.searchsorted asigna cada venta a su intervalo (día, semana o mes, con los
+    límites en la zona horaria del navegador) y np.bincount suma importes, unidades,
+    pedidos y pedidos por estado de todos los intervalos a la vez.
+  - El ticket promedio de cada intervalo es ingresos / pedidos.
+Los arrays y los resultados se guardan en una caché LRU con expiración (TTLCache)
+indexada por (vendedor_id, vendor_lines.version()): una venta nueva o un cambio de
+estado cambia la versión, así que la siguiente consulta los rehace, y las entradas
+viejas o de vendedores inactivos salen por tamaño o por tiempo. Un resultado no se
+indexa por los instantes exactos de la consulta (`hasta` suele ser "ahora") sino por
+sus intervalos y por los pedidos que caen en el rango, que es de lo único que depende.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from .cache import TTLCache
+from .vendor_lines import vendor_lines
+
+GRANULARITIES = ("dia", "semana", "mes")
+MAX_BUCKETS = 1000
+TOP_PRODUCTS = 10
+
+
+class VendorArrays:
+    """Ventas de un vendedor por columnas. No se modifica una vez construida."""
+
+    def __init__(self, orders):
+        lines = [line for order in orders for line in order]
+        products = {}
+        self.product_names = []
+        codes = []
+        for line in lines:
+            key = line["producto_id"] or line["nombre"]
+            if key not in products:
+                products[key] = len(products)
+                self.product_names.append((key, line["nombre"]))
+            codes.append(products[key])
+        self.line_fecha = np.array([line["fecha"] for line in lines], dtype=np.float64)
+        self.line_total = np.array([line["total"] for line in lines], dtype=np.float64)
+        self.line_cantidad = np.array([line["cantidad"] for line in lines], dtype=np.float64)
+        self.line_producto = np.array(codes, dtype=np.int64)
+
+        states = {}
+        self.state_names = []
+        state_codes = []
+        for order in orders:
+            state = order[0]["estado_pedido"].lower()
+            if state not in states:
+                states[state] = len(states)
+                self.state_names.append(state)
+            state_codes.append(states[state])
+        self.order_fecha = np.array([order[0]["fecha"] for order in orders], dtype=np.float64)
+        self.order_total = np.array([sum(line["total"] for line in order) for order in orders], dtype=np.float64)
+        self.order_estado = np.array(state_codes, dtype=np.int64)
+
+
+def bucket_edges(desde, hasta, granularidad, utc_offset=0):
+    """
+    Inicios de los intervalos que cubren [desde, hasta) en segundos, alineados a la
+    medianoche local (utc_offset en minutos, como Date.getTimezoneOffset() con el signo
+    cambiado: -360 para UTC-6). Las semanas empiezan en lunes. ValueError si no es válido.
+    """
+    if granularidad not in GRANULARITIES:
+        raise ValueError(f"Granularidad no soportada: {granularidad}")
+    if hasta <= desde:
+        raise ValueError("El rango de fechas está vacío")
+    zone = timezone(timedelta(minutes=utc_offset))
+    start = datetime.fromtimestamp(desde, tz=zone).replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularidad == "semana":
+        start -= timedelta(days=start.weekday())
+    elif granularidad == "mes":
+        start = start.replace(day=1)
+
+    if granularidad == "mes":
+        edges = []
+        moment = start
+        while moment.timestamp() < hasta and len(edges) <= MAX_BUCKETS:
+            edges.append(moment.timestamp())
+            moment = moment.replace(year=moment.year + moment.month // 12, month=moment.month % 12 + 1)
+        edges = np.array(edges, dtype=np.float64)
+    else:
+        step = 86400 * (7 if granularidad == "semana" else 1)
+        count = int(np.ceil((hasta - start.timestamp()) / step))
+        if count > MAX_BUCKETS:
+            raise ValueError(f"Máximo {MAX_BUCKETS} intervalos por consulta")
+        edges = start.timestamp() + step * np.arange(count, dtype=np.float64)
+    if len(edges) > MAX_BUCKETS:
+        raise ValueError(f"Máximo {MAX_BUCKETS} intervalos por consulta")
+    return edges
+
+
+def _assign(fechas, edges, desde, hasta):
+    """Índice de intervalo de cada fecha y máscara de las que caen en [desde, hasta)."""
+    inside = (fechas >= desde) & (fechas < hasta)
+    return np.searchsorted(edges, fechas[inside], side="right") - 1, inside
+
+
+def compute_series(arrays, desde, hasta, granularidad, utc_offset=0, edges=None):
+    """Series por intervalo y totales del rango para las ventas de `arrays`."""
+    if edges is None:
+        edges = bucket_edges(desde, hasta, granularidad, utc_offset)
+    buckets = len(edges)
+
+    line_bucket, line_inside = _assign(arrays.line_fecha, edges, desde, hasta)
+    unidades = np.bincount(line_bucket, weights=arrays.line_cantidad[line_inside], minlength=buckets)
+
+    order_bucket, order_inside = _assign(arrays.order_fecha, edges, desde, hasta)
+    ingresos = np.bincount(order_bucket, weights=arrays.order_total[order_inside], minlength=buckets)
+    pedidos = np.bincount(order_bucket, minlength=buckets)
+    ticket = np.divide(ingresos, pedidos, out=np.zeros(buckets), where=pedidos > 0)
+
+    states = len(arrays.state_names)
+    by_state = np.bincount(
+        order_bucket * states + arrays.order_estado[order_inside], minlength=buckets * states
+    ).reshape(buckets, states) if states else np.zeros((buckets, 0), dtype=np.int64)
+
+    product_units = np.bincount(arrays.line_producto[line_inside], weights=arrays.line_cantidad[line_inside],
+                                minlength=len(arrays.product_names))
+    product_revenue = np.bincount(arrays.line_producto[line_inside], weights=arrays.line_total[line_inside],
+                                  minlength=len(arrays.product_names))
+    top = [code for code in np.argsort(-product_units, kind="stable")[:TOP_PRODUCTS] if product_units[code] > 0]
+
+    total_ingresos = float(ingresos.sum())
+    total_pedidos = int(pedidos.sum())
+    zone = timezone(timedelta(minutes=utc_offset))
+    return {
+        "granularidad": granularidad,
+        "etiquetas": [datetime.fromtimestamp(edge, tz=zone).isoformat() for edge in edges],
+        "ingresos": np.round(ingresos, 2).tolist(),
+        "unidades": np.round(unidades, 3).tolist(),
+        "pedidos": pedidos.tolist(),
+        "ticket_promedio": np.round(ticket, 2).tolist(),
+        "estados": {name: by_state[:, code].tolist() for code, name in enumerate(arrays.state_names)
+                    if by_state[:, code].any()},
+        "totales": {
+            "ingresos": round(total_ingresos, 2),
+            "unidades": round(float(unidades.sum()), 3),
+            "pedidos": total_pedidos,
+            "ticket_promedio": round(total_ingresos / total_pedidos, 2) if total_pedidos else 0.0,
+            "pedidos_por_estado": {name: int(count) for name, count in zip(arrays.state_names, by_state.sum(axis=0))
+                                   if count},
+        },
+        "productos": [
+            {
+                "producto_id": arrays.product_names[code][0],
+                "nombre": arrays.product_names[code][1],
+                "cantidad": round(float(product_units[code]), 3),
+                "total": round(float(product_revenue[code]), 2),
+            }
+            for code in top
+        ],
+    }
+
+
+class SalesAnalytics:
+    def __init__(self, lines_index, cache=None):
+        self._lines = lines_index
+        # (vendedor_id, versión) -> VendorArrays y (vendedor_id, versión, intervalos, tramo) -> resultado;
+        # ninguno se modifica después de guardarse, así que no hace falta copiarlos
+        self.cache = cache if cache is not None else TTLCache(maxsize=256, ttl=300, copy_values=False)
+
+    def series(self, vendedor_id, desde, hasta, granularidad="dia", utc_offset=0):
+        """
+        Series de ingresos, unidades, pedidos, ticket promedio y pedidos por estado del
+        vendedor en [desde, hasta) (segundos). ValueError si el rango o la granularidad no son válidos.
+        """
+        edges = bucket_edges(desde, hasta, granularidad, utc_offset)
+        version = self._lines.version(vendedor_id)
+        arrays = self.cache.get((vendedor_id, version))
+        if arrays is None:
+            version, orders = self._lines.orders(vendedor_id)
+            arrays = VendorArrays(orders)
+            self.cache.set((vendedor_id, version), arrays)
+
+        # Los pedidos vienen ordenados por fecha: el rango [desde, hasta) es un tramo de order_fecha
+        first, last = np.searchsorted(arrays.order_fecha, [desde, hasta], side="left")
+        key = (vendedor_id, version, granularidad, int(utc_offset), float(edges[0]), len(edges), int(first), int(last))
+        result = self.cache.get(key)
+        if result is None:
+            result = compute_series(arrays, desde, hasta, granularidad, utc_offset, edges=edges)
+            self.cache.set(key, result)
+        return result
+
+    def clear(self):
+        self.cache.clear()
+
+
+sales_analytics = SalesAnalytics(vendor_lines)
@@ -0,0 +1,104 @@
+"""
+Exportación en streaming del historial de ventas de un vendedor (CSV o JSONL).
+Las filas salen de las líneas del vendedor en vendor_lines (ver iter_lines) y se
+escriben en bloques de EXPORT_CHUNK_ROWS filas: la respuesta de Flask va enviando
+cada bloque según se genera, así que la memoria del worker no crece con el número de
+ventas. Con gzip, cada bloque se comprime con el mismo compresor incremental de zlib.
+En CSV, los textos que una hoja de cálculo tomaría por fórmula (nombres, correos y
+ciudades los escribe el comprador) se prefijan con un apóstrofo.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+EXPORT_COLUMNS = (
+    "fecha", "compra_id", "estado", "estado_pedido", "producto_id", "nombre", "cantidad", "unidad",
+    "precio_unitario", "total", "comprador_nombre", "comprador_email", "metodo_pago", "ciudad",
+)
+EXPORT_CHUNK_ROWS = 200
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def export_row(line):
+    """Fila de exportación de una línea de venta (sales_feed.sale_lines)."""
+    return {
+        "fecha": datetime.fromtimestamp(line["fecha"], tz=timezone.utc).isoformat() if line["fecha"] else "",
+        "compra_id": line["compra_id"],
+        "estado": line["estado"],
+        "estado_pedido": line["estado_pedido"].lower(),
+        "producto_id": line["producto_id"],
+        "nombre": line["nombre"],
+        "cantidad": line["cantidad"],
+        "unidad": line["unidad"],
+        "precio_unitario": round(line["precio_unitario"], 2),
+        "total": round(line["total"], 2),
+        "comprador_nombre": line["comprador_nombre"],
+        "comprador_email": line["comprador_email"],
+        "metodo_pago": line["metodo_pago"],
+        "ciudad": (line["direccion_entrega"] or {}).get("ciudad") or "",
+    }
+
+
+def _csv_safe(row):
+    return {
+        column: f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+        for column, value in row.items()
+    }
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Cabecera y filas CSV en bloques de texto (BOM inicial para que Excel lea UTF-8)."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for batch in _batches(rows, chunk_rows):
+        writer.writerows(_csv_safe(row) for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def jsonl_chunks(rows, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Un objeto JSON por línea, en bloques de texto."""
+    for batch in _batches(rows, chunk_rows):
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+
+
+def gzip_chunks(chunks):
+    """Comprime un flujo de bloques de texto en un único flujo gzip."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: cabecera y cola gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(lines, formato="csv", gzip=False):
+    """Bloques de la exportación de `lines` en `formato` (csv o jsonl); ValueError si no se conoce."""
+    if formato not in FORMATS:
+        raise ValueError(f"Formato no soportado: {formato}")
+    rows = (export_row(line) for line in lines)
+    chunks = csv_chunks(rows) if formato == "csv" else jsonl_chunks(rows)
+    return gzip_chunks(chunks) if gzip else (chunk.encode("utf-8") for chunk in chunks)
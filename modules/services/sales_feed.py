@@ -0,0 +1,277 @@
+"""
+Feed de líneas de venta de la colección `compras`.
+Un único listener de Firestore (on_snapshot) por proceso convierte cada pedido en
+sus líneas de venta (una por producto, con el vendedor ya resuelto) y reparte los
+cambios a las vistas suscritas (estadísticas por vendedor, ...), así ninguna
+petición del vendedor vuelve a recorrer los pedidos de toda la plataforma.
+  - Al arrancar, cada suscriptor recibe reset({compra_id: [líneas]}).
+  - Después recibe apply([(compra_id, líneas_anteriores, líneas_nuevas)]) con cada lote
+    de cambios: altas, cambios de `estado_pedido` y bajas (lista vacía).
+  - Las líneas antiguas sin `vendedor_id` se resuelven con el feed de productos y, si
+    el producto ya no existe en él, con una búsqueda masiva (productos_repo.lookup).
+El listener arranca la primera vez que una petición lo necesita (ensure_started).
+Con varios workers cada proceso mantiene su propio feed: cada worker guarda en memoria
+las líneas de todos los pedidos que escucha y el snapshot inicial cuesta una lectura
+por pedido, así que un despliegue lee N_workers × |compras| documentos.
+  - VENTAS_FEED_WINDOW_DAYS > 0 limita el listener a los pedidos con `fecha_compra` en
+    esa ventana (los pedidos antiguos que solo tienen fecha_creacion quedan fuera). El
+    listener se reabre cada FEED_REANCHOR_SECONDS para que la ventana avance: cada
+    reapertura vuelve a leer los pedidos de la ventana y los suscriptores reciben un
+    reset con el estado nuevo. Con 0 (por defecto) se escucha todo el historial.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+
+from .firestore_client import _get_config, get_firestore_client
+from .metrics import record
+from .popularity import order_time
+from .productos_feed import _as_number, productos_feed
+from .repositories import ProductosRepository
+
+DEFAULT_START_TIMEOUT = 10.0  # segundos de espera del snapshot inicial
+DEFAULT_ORDER_STATE = "preparando"
+FEED_REANCHOR_SECONDS = 86400  # con ventana, el listener se reabre una vez al día
+
+logger = logging.getLogger(__name__)
+
+
+def delivery_address(data):
+    """Dirección de entrega del pedido (los pedidos antiguos la guardan en la raíz)."""
+    address = data.get("direccion_entrega") or {}
+    if not (address.get("ciudad") or address.get("telefono") or address.get("formatted")) and (
+            data.get("ciudad") or data.get("telefono") or data.get("formatted")):
+        address = {field: data.get(field) or address.get(field) or "" for field in ("ciudad", "telefono", "formatted")}
+    return address
+
+
+def order_fields(data):
+    """Datos del pedido que se repiten en cada una de sus líneas (desnormalizados)."""
+    return {
+        "estado": data.get("estado") or "pendiente",
+        "comprador_id": data.get("usuario_id") or "",
+        "comprador_nombre": data.get("usuario_nombre") or "Cliente",
+        "comprador_email": data.get("usuario_email") or "",
+        "metodo_pago": data.get("metodo_pago") or "N/A",
+        "payment_intent_id": data.get("payment_intent_id"),
+        "direccion_entrega": delivery_address(data),
+    }
+
+
+def sale_lines(order_id, data, vendor_of):
+    """
+    Líneas de venta de un pedido. `vendor_of(producto_id)` resuelve el vendedor de las
+    líneas que no lo traen. Cada línea es un dict con compra_id, linea (posición en el
+    pedido), vendedor_id, producto_id, nombre, cantidad, unidad, precio_unitario, total,
+    imagen, estado_pedido, fecha (segundos; 0 si no se conoce) y los datos del pedido
+    de order_fields (estado del pago, comprador, método de pago y dirección).
+    """
+    fecha = order_time(data) or 0.0
+    order_state = data.get("estado_pedido") or DEFAULT_ORDER_STATE
+    shared = order_fields(data)
+    lines = []
+    for position, item in enumerate(data.get("productos") or ()):
+        if not isinstance(item, dict):
+            continue
+        product_id = item.get("producto_id") or ""
+        vendor_id = item.get("vendedor_id") or item.get("vendedorId") or (vendor_of(product_id) if product_id else "")
+        if not vendor_id:
+            continue
+        cantidad = _as_number(item.get("cantidad"))
+        precio_unitario = _as_number(item.get("precio_unitario", item.get("precio")))
+        lines.append(dict(
+            shared,
+            compra_id=order_id,
+            linea=position,
+            vendedor_id=vendor_id,
+            producto_id=product_id,
+            nombre=item.get("nombre") or "Producto sin nombre",
+            cantidad=cantidad,
+            unidad=item.get("unidad") or "kg",
+            precio_unitario=precio_unitario,
+            total=_as_number(item.get("precio_total"), precio_unitario * cantidad),
+            imagen=item.get("imagen") or "",
+            estado_pedido=item.get("estado_pedido") or order_state,
+            fecha=fecha,
+        ))
+    return lines
+
+
+class SalesListener:
+    """Base de los suscriptores del feed de ventas; por defecto ignoran los eventos que no usan."""
+
+    def reset(self, lines):
+        """Estado completo: {compra_id: [líneas]}."""
+
+    def apply(self, changes):
+        """Lote de cambios: [(compra_id, líneas_anteriores, líneas_nuevas)] (nuevas vacías si se borró)."""
+
+
+class SalesFeed:
+    collection_name = "compras"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._lines = {}            # compra_id -> [líneas]
+        self._product_vendors = {}  # producto_id -> vendedor_id de productos que ya no están en el feed
+        self._products = None       # repositorio de productos con el cliente del listener
+        self._watch = None
+        self._generation = 0        # identifica el listener activo; los avisos de uno cerrado se ignoran
+        self._pending_reset = True  # el siguiente snapshot del listener activo es el inicial
+        self._anchored_at = None
+        self._window_days = 0.0     # ventana del listener activo (0 = todo el historial)
+        self._ready = threading.Event()
+        self.version = 0  # cambia con cada snapshot aplicado
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def subscribe(self, listener):
+        """Registra un suscriptor; si el feed ya está activo recibe el estado actual."""
+        with self._lock:
+            self._listeners.append(listener)
+            if self.ready:
+                self._notify(listener, "reset", self._lines)
+        return listener
+
+    def lines(self, order_id):
+        with self._lock:
+            return list(self._lines.get(order_id, ()))
+
+    def ensure_started(self, client=None, timeout=None):
+        """
+        Arranca el listener si no está activo y espera el snapshot inicial.
+        Devuelve True si el feed está listo.
+        """
+        if self.ready and self._window_days and time.time() - self._anchored_at >= FEED_REANCHOR_SECONDS:
+            self._reanchor()
+        if not self.ready:
+            if timeout is None:
+                timeout = float(_get_config().get("VENTAS_FEED_TIMEOUT") or DEFAULT_START_TIMEOUT)
+            with self._lock:
+                if self._watch is None:
+                    client = client or get_firestore_client()
+                    if client is None:
+                        return False
+                    # El feed de productos resuelve el vendedor de las líneas antiguas
+                    productos_feed.ensure_started(client=client, timeout=timeout)
+                    self._products = ProductosRepository(client=client)
+                    self._listen(client)
+            self._ready.wait(timeout)
+        return self.ready
+
+    def _listen(self, client):
+        query = client.collection(self.collection_name)
+        self._window_days = float(_get_config().get("VENTAS_FEED_WINDOW_DAYS") or 0)
+        if self._window_days:
+            since = datetime.fromtimestamp(time.time() - self._window_days * 86400, tz=timezone.utc)
+            query = query.where("fecha_compra", ">=", since)
+        self._generation += 1
+        self._pending_reset = True
+        self._anchored_at = time.time()
+        self._watch = query.on_snapshot(partial(self._on_snapshot, self._generation))
+
+    def _reanchor(self):
+        """Reabre el listener con la ventana actual; el feed sigue sirviendo el estado anterior hasta el reset."""
+        with self._lock:
+            if self._watch is None or time.time() - self._anchored_at < FEED_REANCHOR_SECONDS:
+                return
+            self._watch.unsubscribe()
+            self._listen(self._products.client)
+
+    def stop(self):
+        """Detiene el listener y vacía el estado (útil en pruebas)."""
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+            self._watch = None
+            self._generation += 1
+            self._lines = {}
+            self._product_vendors = {}
+            self._products = None
+            self._ready.clear()
+
+    def _notify(self, listener, method, payload):
+        # Un suscriptor con errores no debe detener al resto ni al listener
+        try:
+            getattr(listener, method)(payload)
+        except Exception:
+            logger.exception("Error actualizando %s desde el feed de ventas", type(listener).__name__)
+
+    def _lookup_vendors(self, orders):
+        """
+        {producto_id: vendedor_id} de los productos sin vendedor_id que no están en el feed
+        ni se buscaron antes, leídos de una vez.
+        """
+        missing = set()
+        for _, data in orders:
+            for item in data.get("productos") or ():
+                if not isinstance(item, dict) or item.get("vendedor_id") or item.get("vendedorId"):
+                    continue
+                product_id = item.get("producto_id")
+                if product_id and product_id not in self._product_vendors and productos_feed.get(product_id)[0] is None:
+                    missing.add(product_id)
+        products = self._products
+        if not missing or products is None:
+            return {}
+        found = products.lookup(missing)
+        return {product_id: (found.get(product_id) or {}).get("vendedor_id") or "" for product_id in missing}
+
+    def _vendor_of(self, product_id):
+        data = productos_feed.get(product_id)[0]
+        if data is not None:
+            return data.get("vendedor_id") or data.get("vendedorId") or ""
+        return self._product_vendors.get(product_id, "")
+
+    def _on_snapshot(self, generation, documents, changes, read_time):
+        if generation != self._generation:
+            return
+        record(reads=len(changes))
+        initial = self._pending_reset
+        if initial:
+            updated = [(snapshot.id, snapshot.to_dict() or {}) for snapshot in documents]
+        else:
+            updated = [
+                (change.document.id, None if change.type.name == "REMOVED" else change.document.to_dict() or {})
+                for change in changes
+            ]
+        # La búsqueda lee Firestore: se hace antes de tomar el lock para no bloquear a
+        # las peticiones que consultan el feed mientras tanto
+        vendors = self._lookup_vendors([(order_id, data) for order_id, data in updated if data is not None])
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._product_vendors.update(vendors)
+            if initial:
+                self._pending_reset = False
+                self._lines = {order_id: sale_lines(order_id, data, self._vendor_of) for order_id, data in updated}
+                for listener in self._listeners:
+                    self._notify(listener, "reset", self._lines)
+                self.version += 1
+                self._ready.set()
+                return
+
+            diffs = []
+            for order_id, data in updated:
+                previous = self._lines.get(order_id, [])
+                if data is None:
+                    current = []
+                    self._lines.pop(order_id, None)
+                else:
+                    current = self._lines[order_id] = sale_lines(order_id, data, self._vendor_of)
+                if previous or current:
+                    diffs.append((order_id, previous, current))
+            if not diffs:
+                return
+            for listener in self._listeners:
+                self._notify(listener, "apply", diffs)
+            self.version += 1
+
+
+sales_feed = SalesFeed()
@@ -0,0 +1,215 @@
+"""
+Búsqueda de productos en memoria con índice invertido y ranking BM25.
+  - Se indexan nombre, categoría, origen y descripción (con distinto peso por campo).
+  - El texto se normaliza: minúsculas, sin acentos, sin palabras vacías y con un
+    stemmer ligero de español (plurales y género: "jitomates" y "jitomate" coinciden).
+  - Las listas de ocurrencias se guardan en arrays compactos (ordinal del documento y
+    peso); al editar un producto su entrada anterior queda marcada como borrada y se
+    compacta el índice cuando hay demasiadas.
+  - La visibilidad (activo y stock > 0) se comprueba al consultar, no al indexar.
+El índice se mantiene al día con el feed de productos (ver productos_feed).
+"""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+
+from .productos_feed import ProductosListener, is_visible, normalize_category, product_summary, productos_feed
+
+FIELD_WEIGHTS = {"nombre": 3.0, "categoria": 2.0, "origen": 1.0, "descripcion": 1.0}
+STOPWORDS = frozenset((
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los", "o", "para",
+    "por", "sin", "su", "sus", "un", "una", "unos", "unas", "y",
+))
+MAX_PREFIX_EXPANSIONS = 20
+COMPACT_RATIO = 0.25  # entradas borradas por documento vivo antes de compactar
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    """Minúsculas y sin acentos ni diéresis ("Limón" -> "limon", "Ñame" -> "name")."""
+    decomposed = unicodedata.normalize("NFD", str(text).lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def stem(token):
+    """Stemmer ligero de español (el de Savoy, usado por Lucene): plurales y género."""
+    if len(token) < 5 or token.isdigit():
+        return token
+    if token.endswith("eses"):
+        return token[:-2]
+    if token.endswith("ces"):
+        return token[:-3] + "z"
+    if token.endswith(("os", "as", "es")):
+        return token[:-2]
+    if token[-1] in "oae":
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Términos indexables de un texto, en orden."""
+    return [stem(token) for token in _TOKEN_RE.findall(fold(text or "")) if token not in STOPWORDS]
+
+
+class SearchIndex(ProductosListener):
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._postings = {}        # término -> (array("I") ordinales, array("f") pesos)
+        self._df = {}              # término -> documentos vivos que lo contienen
+        self._terms = []           # términos ordenados (para búsquedas por prefijo)
+        self._ordinal_ids = []     # ordinal -> doc_id (None si está borrado)
+        self._lengths = array("f")
+        self._visible = bytearray()
+        self._categories = []      # ordinal -> categoría normalizada
+        self._doc_terms = {}       # ordinal -> {término: peso}
+        self._doc_ordinal = {}     # doc_id -> ordinal vigente
+        self._summaries = {}       # doc_id -> producto_summary
+        self._total_length = 0.0
+        self._deleted = 0
+
+    # ----- Mantenimiento (ProductosListener) -----
+
+    def reset(self, documents):
+        with self._lock:
+            self._clear()
+            for doc_id, data in documents.items():
+                self._add(doc_id, data)
+
+    def apply(self, changes):
+        with self._lock:
+            for doc_id, _, data in changes:
+                self._remove(doc_id)
+                if data is not None:
+                    self._add(doc_id, data)
+            # Cada edición deja una entrada muerta en las listas: se compacta en cuanto
+            # superan una fracción de los documentos vivos, sea cual sea el tamaño del catálogo
+            if self._deleted > COMPACT_RATIO * len(self._doc_ordinal):
+                self._compact()
+
+    def _add(self, doc_id, data):
+        weights = {}
+        length = 0.0
+        for field, field_weight in FIELD_WEIGHTS.items():
+            for term in tokenize(data.get(field)):
+                weights[term] = weights.get(term, 0.0) + field_weight
+                length += field_weight
+
+        ordinal = len(self._ordinal_ids)
+        self._ordinal_ids.append(doc_id)
+        self._lengths.append(length)
+        self._visible.append(1 if is_visible(data) else 0)
+        self._categories.append(normalize_category(data.get("categoria")))
+        self._doc_terms[ordinal] = weights
+        self._doc_ordinal[doc_id] = ordinal
+        self._summaries[doc_id] = product_summary(doc_id, data)
+        self._total_length += length
+
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("f"))
+                insort(self._terms, term)
+            postings[0].append(ordinal)
+            postings[1].append(weight)
+            self._df[term] = self._df.get(term, 0) + 1
+
+    def _remove(self, doc_id):
+        ordinal = self._doc_ordinal.pop(doc_id, None)
+        if ordinal is None:
+            return
+        self._summaries.pop(doc_id, None)
+        self._ordinal_ids[ordinal] = None
+        self._visible[ordinal] = 0
+        self._total_length -= self._lengths[ordinal]
+        for term in self._doc_terms.pop(ordinal):
+            self._df[term] -= 1
+        self._deleted += 1
+
+    def _compact(self):
+        """Reconstruye las listas sin las entradas borradas."""
+        live = [(self._ordinal_ids[ordinal], ordinal) for ordinal in sorted(self._doc_ordinal.values())]
+        previous = (self._doc_terms, self._lengths, self._visible, self._categories, self._summaries)
+        self._clear()
+        doc_terms, lengths, visible, categories, summaries = previous
+        for doc_id, old in live:
+            ordinal = len(self._ordinal_ids)
+            self._ordinal_ids.append(doc_id)
+            self._lengths.append(lengths[old])
+            self._visible.append(visible[old])
+            self._categories.append(categories[old])
+            self._doc_terms[ordinal] = doc_terms[old]
+            self._doc_ordinal[doc_id] = ordinal
+            self._summaries[doc_id] = summaries[doc_id]
+            self._total_length += lengths[old]
+            for term, weight in doc_terms[old].items():
+                postings = self._postings.setdefault(term, (array("I"), array("f")))
+                postings[0].append(ordinal)
+                postings[1].append(weight)
+                self._df[term] = self._df.get(term, 0) + 1
+        self._terms = sorted(self._postings)
+
+    # ----- Consultas -----
+
+    def __len__(self):
+        return len(self._doc_ordinal)
+
+    def _expand(self, term, prefix):
+        if not prefix:
+            return [term] if self._df.get(term) else []
+        # El último término puede estar a medio escribir: se buscan los que empiezan igual
+        expanded = []
+        index = bisect_left(self._terms, term)
+        while index < len(self._terms) and self._terms[index].startswith(term):
+            if self._df.get(self._terms[index]):
+                expanded.append(self._terms[index])
+                if len(expanded) >= MAX_PREFIX_EXPANSIONS:
+                    break
+            index += 1
+        return expanded
+
+    def search(self, query, limit=20, categoria=None):
+        """
+        Devuelve [(puntuación, producto)] de los productos visibles, de mayor a menor
+        relevancia; con `categoria` solo los de esa categoría.
+        """
+        raw_tokens = [token for token in _TOKEN_RE.findall(fold(query or "")) if token not in STOPWORDS]
+        if not raw_tokens:
+            return []
+
+        category = normalize_category(categoria) if categoria else None
+        with self._lock:
+            documents = len(self._doc_ordinal)
+            if not documents:
+                return []
+            average_length = self._total_length / documents or 1.0
+            scores = {}
+            for position, token in enumerate(raw_tokens):
+                is_last = position == len(raw_tokens) - 1
+                terms = set(self._expand(stem(token), prefix=False))
+                if is_last:
+                    terms.update(self._expand(token, prefix=True))
+                for term in terms:
+                    df = self._df[term]
+                    idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+                    ordinals, weights = self._postings[term]
+                    for ordinal, tf in zip(ordinals, weights):
+                        if not self._visible[ordinal] or (category and self._categories[ordinal] != category):
+                            continue
+                        norm = self.k1 * (1 - self.b + self.b * self._lengths[ordinal] / average_length)
+                        scores[ordinal] = scores.get(ordinal, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(round(score, 4), self._summaries[self._ordinal_ids[ordinal]]) for ordinal, score in best]
+
+
+search_index = productos_feed.subscribe(SearchIndex())
@@ -0,0 +1,186 @@
+"""
+Unidad de trabajo por petición para Firestore.
+Dentro de una ruta decorada con @unit_of_work:
+  - Las lecturas del mismo documento devuelven el snapshot ya obtenido (identity map).
+  - Las escrituras set(..., merge=True) al mismo documento se acumulan y se confirman
+    juntas al terminar la petición (un set por documento, o un único lote si hay varios).
+Los repositorios consultan la unidad activa, así que los handlers no cambian.
+"""
+
+import copy
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+
+
+def is_plain_value(value):
+    """False si el valor contiene centinelas de Firestore (SERVER_TIMESTAMP, ArrayUnion, ...)."""
+    if isinstance(value, dict):
+        return all(is_plain_value(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(is_plain_value(item) for item in value)
+    return not type(value).__module__.startswith("google.cloud.firestore")
+
+
+def _copy_value(value):
+    # Los centinelas de Firestore se comparan por identidad: no se copian.
+    if isinstance(value, dict):
+        return {key: _copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(item) for item in value]
+    if is_plain_value(value):
+        return copy.deepcopy(value)
+    return value
+
+
+def normalize_fields(fields):
+    """Convierte una proyección en frozenset (None = documento completo)."""
+    return frozenset(fields) if fields else None
+
+
+def covers(known_fields, requested_fields):
+    """True si un documento leído con `known_fields` incluye `requested_fields`."""
+    if known_fields is None:
+        return True
+    return requested_fields is not None and requested_fields <= known_fields
+
+
+def merge_document(base, changes):
+    """Aplica `changes` sobre `base` igual que set(..., merge=True): los mapas se fusionan."""
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            merge_document(base[key], value)
+        else:
+            base[key] = _copy_value(value)
+    return base
+
+
+class UnitOfWork:
+    def __init__(self):
+        self._snapshots = {}
+        self._pending = OrderedDict()
+
+    @staticmethod
+    def _path(repo, doc_id):
+        return f"{repo.collection_name}/{doc_id}"
+
+    def get(self, repo, doc_id, loader, fields=None):
+        """
+        Devuelve el documento desde el identity map o lo carga con `loader(doc_id, fields)`.
+        Si lo guardado no cubre la proyección pedida, se leen los campos que faltan.
+        Los merges pendientes ya están aplicados sobre el snapshot guardado.
+        """
+        path = self._path(repo, doc_id)
+        requested = normalize_fields(fields)
+        entry = self._snapshots.get(path)
+        if entry is not None and covers(entry[0], requested):
+            data = entry[1]
+        else:
+            if entry is None or requested is None:
+                known = requested
+            else:
+                known = entry[0] | requested
+            data = loader(doc_id, sorted(known) if known else None)
+            if entry is not None and entry[1] is not None:
+                data = merge_document(data or {}, entry[1])
+            pending = self._pending.get(path)
+            if pending is not None:
+                data = merge_document(data or {}, pending[2])
+            # Un documento inexistente cubre cualquier proyección
+            self._snapshots[path] = (known if data is not None else None, data)
+        return _copy_value(data) if data is not None else None
+
+    def merge(self, repo, doc_id, payload):
+        path = self._path(repo, doc_id)
+        pending = self._pending.get(path)
+        if pending is None:
+            pending = self._pending[path] = (repo, doc_id, {})
+        merge_document(pending[2], payload)
+
+        entry = self._snapshots.get(path)
+        if entry is not None:
+            known = entry[0] | frozenset(payload) if entry[0] is not None else None
+            self._snapshots[path] = (known, merge_document(entry[1] or {}, payload))
+
+    def discard(self, repo, doc_id):
+        """
+        Prepara una escritura directa (set sin merge, update, delete): confirma antes
+        los merges pendientes del documento para respetar el orden y olvida el snapshot.
+        """
+        path = self._path(repo, doc_id)
+        pending = self._pending.pop(path, None)
+        if pending is not None:
+            repo._apply_set(doc_id, pending[2], merge=True)
+        self._snapshots.pop(path, None)
+
+    def commit(self):
+        """
+        Confirma los merges acumulados: un lote por cliente de Firestore (o un set si
+        solo hay un documento). Devuelve el número de documentos escritos.
+        """
+        pending = list(self._pending.values())
+        self._pending.clear()
+
+        by_client = OrderedDict()
+        for repo, doc_id, payload in pending:
+            by_client.setdefault(repo.client, []).append((repo, doc_id, payload))
+
+        written = 0
+        for client, writes in by_client.items():
+            if client is None:
+                continue
+            if len(writes) == 1:
+                repo, doc_id, payload = writes[0]
+                if repo._apply_set(doc_id, payload, merge=True):
+                    written += 1
+                continue
+            batch = client.batch()
+            for repo, doc_id, payload in writes:
+                batch.set(client.collection(repo.collection_name).document(doc_id), payload, merge=True)
+            batch.commit()
+            for repo, doc_id, payload in writes:
+                repo._after_write(doc_id, payload, merge=True)
+            written += len(writes)
+        return written
+
+
+def current_unit_of_work():
+    if not has_app_context():
+        return None
+    return g.get("_firestore_uow")
+
+
+def _commit_pending(uow, reraise):
+    try:
+        uow.commit()
+    except Exception:
+        current_app.logger.exception("No se pudieron confirmar las escrituras pendientes en Firestore.")
+        if reraise:
+            raise
+
+
+def unit_of_work(f):
+    """
+    Decorator que abre una unidad de trabajo para la ruta y confirma las escrituras
+    acumuladas al terminar, también si el handler lanza una excepción (como ocurría
+    cuando cada escritura se hacía en el momento). En ese caso un fallo al confirmar
+    solo se registra: se propaga la excepción original del handler.
+    """
+    @wraps(f)
+    def wrapped(*args, **kwargs):
+        if current_unit_of_work() is not None:
+            return f(*args, **kwargs)
+
+        uow = UnitOfWork()
+        g._firestore_uow = uow
+        try:
+            result = f(*args, **kwargs)
+        except Exception:
+            g._firestore_uow = None
+            _commit_pending(uow, reraise=False)
+            raise
+        g._firestore_uow = None
+        _commit_pending(uow, reraise=True)
+        return result
+    return wrapped
@@ -0,0 +1,169 @@
+"""
+Índice de líneas de venta por vendedor para /vendedor/ventas y su exportación.
+Cada vendedor tiene sus pedidos ordenados por (fecha_compra, compra_id) y, en cada
+uno, solo sus líneas con los datos del pedido ya desnormalizados (comprador, pago,
+dirección). Una página se lee desde el cursor sin tocar pedidos de otros vendedores:
+el coste depende de las ventas del vendedor, no de las de toda la plataforma.
+El índice se mantiene al día con el feed de ventas (ver sales_feed).
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+
+from .pagination import decode_cursor, encode_cursor
+from .sales_feed import SalesListener, sales_feed
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+ORDER_FIELDS = ("compra_id", "estado", "estado_pedido", "comprador_id", "comprador_nombre", "comprador_email",
+                "metodo_pago", "payment_intent_id", "direccion_entrega")
+LINE_FIELDS = ("producto_id", "nombre", "cantidad", "unidad", "precio_unitario", "imagen", "estado_pedido",
+               "vendedor_id")
+
+
+def _iso(moment):
+    return datetime.fromtimestamp(moment, tz=timezone.utc).isoformat() if moment else None
+
+
+def vendor_sale(lines):
+    """Venta de un vendedor en un pedido (mismo formato que ventas.js) a partir de sus líneas."""
+    first = lines[0]
+    sale = {field: first[field] for field in ORDER_FIELDS}
+    sale["estado_pedido"] = first["estado_pedido"].lower()
+    sale["fecha"] = _iso(first["fecha"])
+    sale["productos"] = [dict({field: line[field] for field in LINE_FIELDS}, precio_total=line["total"])
+                         for line in lines]
+    sale["total"] = round(sum(line["total"] for line in lines), 2)
+    return sale
+
+
+class VendorLines(SalesListener):
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._versions = {}  # vendedor_id -> contador de cambios (solo crece; invalida cálculos memorizados)
+        self._clear()
+
+    def _clear(self):
+        self._orders = {}   # compra_id -> {vendedor_id: [líneas]}
+        self._sorted = {}   # vendedor_id -> [(fecha, compra_id)] ordenada
+
+    # ----- Mantenimiento (SalesListener) -----
+
+    def reset(self, lines):
+        with self._lock:
+            for vendor_id in self._sorted:
+                self._versions[vendor_id] += 1
+            self._clear()
+            for order_id, order_lines in lines.items():
+                self._add(order_id, order_lines)
+
+    def apply(self, changes):
+        with self._lock:
+            for order_id, _, order_lines in changes:
+                self._remove(order_id)
+                self._add(order_id, order_lines)
+
+    def _add(self, order_id, lines):
+        by_vendor = {}
+        for line in lines:
+            by_vendor.setdefault(line["vendedor_id"], []).append(line)
+        if not by_vendor:
+            return
+        self._orders[order_id] = by_vendor
+        for vendor_id, vendor_lines in by_vendor.items():
+            insort(self._sorted.setdefault(vendor_id, []), (vendor_lines[0]["fecha"], order_id))
+            self._versions[vendor_id] = self._versions.get(vendor_id, 0) + 1
+
+    def _remove(self, order_id):
+        for vendor_id, vendor_lines in self._orders.pop(order_id, {}).items():
+            entries = self._sorted[vendor_id]
+            del entries[bisect_left(entries, (vendor_lines[0]["fecha"], order_id))]
+            self._versions[vendor_id] += 1
+            if not entries:
+                del self._sorted[vendor_id]
+
+    # ----- Consultas -----
+
+    def count(self, vendedor_id):
+        with self._lock:
+            return len(self._sorted.get(vendedor_id, ()))
+
+    def version(self, vendedor_id):
+        """Cambia cada vez que se añade, modifica o borra una venta del vendedor."""
+        with self._lock:
+            return self._versions.get(vendedor_id, 0)
+
+    def orders(self, vendedor_id):
+        """(versión, [líneas de cada pedido]) del vendedor, del pedido más antiguo al más reciente."""
+        with self._lock:
+            return self._versions.get(vendedor_id, 0), [
+                self._orders[order_id][vendedor_id] for _, order_id in self._sorted.get(vendedor_id, ())
+            ]
+
+    def iter_lines(self, vendedor_id, desde=None, hasta=None, estados_pedido=None, estados=None,
+                   chunk_size=MAX_PAGE_SIZE):
+        """
+        Recorre las líneas de venta del vendedor del pedido más antiguo al más reciente,
+        con fecha en [desde, hasta) (segundos) y filtradas por estado del pedido y del pago.
+        Lee de `chunk_size` pedidos en `chunk_size` pedidos y suelta el bloqueo entre bloques,
+        así que la memoria no depende del número de ventas y el feed no espera a quien consume.
+        """
+        estados_pedido = {estado.lower() for estado in estados_pedido} if estados_pedido else None
+        estados = set(estados) if estados else None
+        position = (desde,) if desde is not None else None
+        while True:
+            with self._lock:
+                entries = self._sorted.get(vendedor_id, [])
+                # Se reanuda tras el último pedido leído aunque el índice haya cambiado entretanto
+                index = bisect_right(entries, position) if position else 0
+                scanned = entries[index:index + chunk_size]
+                chunk = []
+                for fecha, order_id in scanned:
+                    if hasta is not None and fecha >= hasta:
+                        break
+                    lines = self._orders[order_id][vendedor_id]
+                    if estados_pedido is not None and lines[0]["estado_pedido"].lower() not in estados_pedido:
+                        continue
+                    if estados is not None and lines[0]["estado"] not in estados:
+                        continue
+                    chunk.extend(lines)
+                position = scanned[-1] if scanned else None
+                done = len(scanned) < chunk_size or (hasta is not None and position[0] >= hasta)
+            yield from chunk
+            if done:
+                return
+
+    def page(self, vendedor_id, estados_pedido=None, estados=None, cursor=None, page_size=PAGE_SIZE):
+        """
+        Devuelve (ventas, next_cursor): ventas del vendedor de la más reciente a la más
+        antigua, filtradas por estado del pedido y del pago (colecciones de valores).
+        ValueError si el cursor no es válido.
+        """
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        position = decode_cursor(cursor) if cursor else None
+        if position and not isinstance(position[0], (int, float)):
+            raise ValueError("Cursor inválido")
+        estados_pedido = {estado.lower() for estado in estados_pedido} if estados_pedido else None
+        estados = set(estados) if estados else None
+
+        ventas, last = [], None
+        with self._lock:
+            entries = self._sorted.get(vendedor_id, [])
+            index = bisect_left(entries, tuple(position)) if position else len(entries)
+            while index > 0:
+                index -= 1
+                fecha, order_id = entries[index]
+                lines = self._orders[order_id][vendedor_id]
+                if estados_pedido is not None and lines[0]["estado_pedido"].lower() not in estados_pedido:
+                    continue
+                if estados is not None and lines[0]["estado"] not in estados:
+                    continue
+                if len(ventas) == page_size:
+                    return ventas, encode_cursor(*last)
+                ventas.append(vendor_sale(lines))
+                last = (fecha, order_id)
+        return ventas, None
+
+
+vendor_lines = sales_feed.subscribe(VendorLines())
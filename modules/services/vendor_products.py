@@ -0,0 +1,104 @@
+"""
+Índice de productos visibles (activo y stock > 0) por vendedor, para la sección
+"más de este vendedor" del detalle de producto.
+Cada vendedor tiene sus productos ordenados por fecha de publicación, precio final
+y descuento, así que los primeros N de cualquier orden se leen sin recorrer el resto.
+Solo se guardan los campos de la tarjeta de producto.
+El índice se mantiene al día con el feed de productos (ver productos_feed).
+"""
+
+import threading
+from bisect import bisect_left, insort
+
+from .catalog import DEFAULT_ORDER, ORDERS, effective_price, published_at
+from .productos_feed import ProductosListener, is_visible, product_summary, productos_feed
+
+DEFAULT_LIMIT = 6
+MAX_LIMIT = 24
+CARD_FIELDS = ("id", "nombre", "precio", "precio_con_descuento", "descuento", "categoria", "unidad", "imagen", "stock")
+
+
+class VendorProducts(ProductosListener):
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._items = {}       # doc_id -> (vendedor_id, claves, tarjeta)
+        self._sorted = {}      # vendedor_id -> {clave: [(valor, doc_id)]}
+
+    # ----- Mantenimiento (ProductosListener) -----
+
+    def reset(self, documents):
+        with self._lock:
+            self._clear()
+            for doc_id, data in documents.items():
+                self._add(doc_id, data)
+
+    def apply(self, changes):
+        with self._lock:
+            for doc_id, _, data in changes:
+                self._remove(doc_id)
+                if data is not None:
+                    self._add(doc_id, data)
+
+    def _add(self, doc_id, data):
+        if not is_visible(data):
+            return
+        summary = product_summary(doc_id, data)
+        vendor_id = summary["vendedor_id"]
+        if not vendor_id:
+            return
+        keys = {
+            "fecha": published_at(data),
+            "precio_final": effective_price(summary),
+            "descuento": summary["descuento"],
+        }
+        self._items[doc_id] = (vendor_id, keys, {field: summary[field] for field in CARD_FIELDS})
+        lists = self._sorted.setdefault(vendor_id, {key: [] for key in keys})
+        for key, value in keys.items():
+            insort(lists[key], (value, doc_id))
+
+    def _remove(self, doc_id):
+        item = self._items.pop(doc_id, None)
+        if item is None:
+            return
+        vendor_id, keys, _ = item
+        lists = self._sorted[vendor_id]
+        for key, value in keys.items():
+            entries = lists[key]
+            del entries[bisect_left(entries, (value, doc_id))]
+        if not lists["fecha"]:
+            del self._sorted[vendor_id]
+
+    # ----- Consultas -----
+
+    def count(self, vendedor_id):
+        with self._lock:
+            return len(self._sorted.get(vendedor_id, {}).get("fecha", ()))
+
+    def top(self, vendedor_id, orden=DEFAULT_ORDER, limit=DEFAULT_LIMIT, exclude=None):
+        """
+        Devuelve (total, tarjetas): cuántos productos visibles tiene el vendedor y los
+        primeros `limit` según `orden` (los de ORDERS del catálogo), sin `exclude`.
+        ValueError si el orden no es válido.
+        """
+        if orden not in ORDERS:
+            raise ValueError(f"Orden no soportado: {orden}")
+        key, descending = ORDERS[orden]
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        with self._lock:
+            entries = self._sorted.get(vendedor_id, {}).get(key, [])
+            ordered = reversed(entries) if descending else iter(entries)
+            cards = []
+            for _, doc_id in ordered:
+                if doc_id == exclude:
+                    continue
+                cards.append(self._items[doc_id][2])
+                if len(cards) == limit:
+                    break
+            return len(entries), cards
+
+
+vendor_products = productos_feed.subscribe(VendorProducts())
@@ -0,0 +1,154 @@
+"""
+Vista materializada de ventas por vendedor para /vendedor/estadisticas.
+Por cada vendedor se mantienen el total vendido, los pedidos, las unidades, los
+pedidos por `estado_pedido` y las unidades e ingresos de cada producto.
+Cada pedido aporta un resumen por vendedor (sus líneas de ese vendedor); cuando el
+pedido cambia (p. ej. de estado) se resta su aporte anterior y se suma el nuevo, así
+que consultar las estadísticas cuesta lo mismo con diez pedidos que con un millón.
+La vista se mantiene al día con el feed de ventas (ver sales_feed).
+"""
+
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+from .sales_feed import SalesListener, sales_feed
+
+COMPLETED_STATES = ("recibido", "entregado")
+
+
+def order_contributions(lines):
+    """{vendedor_id: aporte del pedido} a partir de sus líneas de venta."""
+    contributions = {}
+    for line in lines:
+        item = contributions.get(line["vendedor_id"])
+        if item is None:
+            item = contributions[line["vendedor_id"]] = {
+                "compra_id": line["compra_id"],
+                "fecha": line["fecha"],
+                # Como en la página de ventas: el estado de la primera línea del vendedor
+                "estado_pedido": line["estado_pedido"].lower(),
+                "total": 0.0,
+                "unidades": 0.0,
+                "productos": {},
+            }
+        item["total"] += line["total"]
+        item["unidades"] += line["cantidad"]
+        key = line["producto_id"] or line["nombre"]
+        nombre, cantidad, total = item["productos"].get(key, (line["nombre"], 0.0, 0.0))
+        item["productos"][key] = (nombre, cantidad + line["cantidad"], total + line["total"])
+    return contributions
+
+
+class _VendorTotals:
+    __slots__ = ("total", "compras", "unidades", "estados", "productos")
+
+    def __init__(self):
+        self.total = 0.0
+        self.compras = {}    # compra_id -> aporte del pedido
+        self.unidades = 0.0
+        self.estados = Counter()
+        self.productos = {}  # producto -> [nombre, cantidad, total, pedidos]
+
+    def add(self, item, sign):
+        if sign > 0:
+            self.compras[item["compra_id"]] = item
+        else:
+            self.compras.pop(item["compra_id"], None)
+        self.total += sign * item["total"]
+        self.unidades += sign * item["unidades"]
+        self.estados[item["estado_pedido"]] += sign
+        if self.estados[item["estado_pedido"]] <= 0:
+            del self.estados[item["estado_pedido"]]
+        for key, (nombre, cantidad, total) in item["productos"].items():
+            entry = self.productos.setdefault(key, [nombre, 0.0, 0.0, 0])
+            entry[0] = nombre if sign > 0 else entry[0]
+            entry[1] += sign * cantidad
+            entry[2] += sign * total
+            entry[3] += sign
+            if entry[3] <= 0:
+                del self.productos[key]
+
+
+class VendorStats(SalesListener):
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._orders = {}   # compra_id -> {vendedor_id: aporte}
+        self._vendors = {}  # vendedor_id -> _VendorTotals
+
+    # ----- Mantenimiento (SalesListener) -----
+
+    def reset(self, lines):
+        with self._lock:
+            self._clear()
+            for order_id, order_lines in lines.items():
+                self._add(order_id, order_lines)
+
+    def apply(self, changes):
+        with self._lock:
+            for order_id, _, order_lines in changes:
+                self._remove(order_id)
+                self._add(order_id, order_lines)
+
+    def _add(self, order_id, lines):
+        contributions = order_contributions(lines)
+        if not contributions:
+            return
+        self._orders[order_id] = contributions
+        for vendor_id, item in contributions.items():
+            self._vendors.setdefault(vendor_id, _VendorTotals()).add(item, 1)
+
+    def _remove(self, order_id):
+        for vendor_id, item in self._orders.pop(order_id, {}).items():
+            totals = self._vendors[vendor_id]
+            totals.add(item, -1)
+            if not totals.compras:
+                del self._vendors[vendor_id]
+
+    # ----- Consultas -----
+
+    def summary(self, vendedor_id):
+        """Totales del vendedor, pedidos por estado y productos ordenados por unidades vendidas."""
+        with self._lock:
+            totals = self._vendors.get(vendedor_id) or _VendorTotals()
+            productos = sorted(
+                (
+                    {"producto_id": key, "nombre": nombre, "cantidad": round(cantidad, 3), "total": round(total, 2)}
+                    for key, (nombre, cantidad, total, _) in totals.productos.items()
+                ),
+                key=lambda item: (-item["cantidad"], -item["total"], item["nombre"]),
+            )
+            return {
+                "total_vendido": round(totals.total, 2),
+                "pedidos": len(totals.compras),
+                "productos_vendidos": round(totals.unidades, 3),
+                "pedidos_completados": sum(totals.estados[state] for state in COMPLETED_STATES),
+                "pedidos_por_estado": dict(totals.estados),
+                "productos": productos,
+            }
+
+    def orders(self, vendedor_id):
+        """Resumen de cada pedido del vendedor, del más reciente al más antiguo."""
+        with self._lock:
+            totals = self._vendors.get(vendedor_id)
+            items = list(totals.compras.values()) if totals is not None else []
+        items.sort(key=lambda item: (item["fecha"], item["compra_id"]), reverse=True)
+        return [
+            {
+                "compra_id": item["compra_id"],
+                "fecha": datetime.fromtimestamp(item["fecha"], tz=timezone.utc).isoformat() if item["fecha"] else None,
+                "estado_pedido": item["estado_pedido"],
+                "total": round(item["total"], 2),
+                "productos": [
+                    {"nombre": nombre, "cantidad": cantidad, "precio_total": round(total, 2)}
+                    for nombre, cantidad, total in item["productos"].values()
+                ],
+            }
+            for item in items
+        ]
+
+
+vendor_stats = sales_feed.subscribe(VendorStats())
@@ -1,7 +1,15 @@
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from datetime import datetime, timedelta, timezone
+from flask import (Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app,
+                   Response, stream_with_context)
 from werkzeug.utils import secure_filename
 from modules.auth.decorators import login_required, role_required
+from modules.services.repositories import productos_repo
+from modules.services.sales_analytics import sales_analytics
+from modules.services.sales_export import FORMATS, export_chunks
+from modules.services.sales_feed import sales_feed
+from modules.services.vendor_lines import vendor_lines
+from modules.services.vendor_stats import vendor_stats
 
 vendedor_bp = Blueprint('vendedor', __name__, template_folder='templates')
 
@@ -91,6 +99,173 @@ def ver_estadisticas():
                          nombre=session.get("nombre"), 
                          page='estadisticas')
 
+# ===== API: Estadísticas del vendedor =====
+@vendedor_bp.route("/api/estadisticas")
+@login_required
+@role_required("vendedor")
+def api_estadisticas():
+    """
+    Estadísticas del vendedor en sesión desde la vista materializada de ventas:
+    totales, pedidos por estado, unidades e ingresos por producto y el resumen de cada pedido.
+    """
+    if not sales_feed.ensure_started():
+        current_app.logger.warning("Estadísticas no disponibles: el feed de ventas no arrancó")
+        return jsonify({"success": False, "error": "Las estadísticas no están disponibles"}), 503
+
+    vendedor_id = session.get("usuario_id")
+    return jsonify({
+        "success": True,
+        "resumen": vendor_stats.summary(vendedor_id),
+        "ventas": vendor_stats.orders(vendedor_id),
+    })
+
+def _fecha_param(nombre, zona, por_defecto):
+    """Fecha ISO 8601 del parámetro en segundos; sin zona horaria se interpreta en `zona`."""
+    valor = request.args.get(nombre)
+    if not valor:
+        return por_defecto
+    fecha = datetime.fromisoformat(valor)
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=zona)
+    return fecha.timestamp()
+
+
+@vendedor_bp.route("/api/estadisticas/series")
+@login_required
+@role_required("vendedor")
+def api_estadisticas_series():
+    """
+    Ingresos, unidades, pedidos, ticket promedio y pedidos por estado del vendedor en
+    sesión por día, semana o mes. Parámetros: desde y hasta (ISO 8601; por defecto los
+    últimos 30 días), granularidad (dia, semana o mes) y utc_offset (minutos del navegador).
+    """
+    try:
+        utc_offset = int(request.args.get('utc_offset', 0))
+        zona = timezone(timedelta(minutes=utc_offset))
+        hasta = _fecha_param('hasta', zona, datetime.now(timezone.utc).timestamp())
+        desde = _fecha_param('desde', zona, hasta - 30 * 86400)
+    except (ValueError, OverflowError):
+        return jsonify({"success": False, "error": "Parámetros de fecha inválidos"}), 400
+
+    if not sales_feed.ensure_started():
+        current_app.logger.warning("Series de ventas no disponibles: el feed de ventas no arrancó")
+        return jsonify({"success": False, "error": "Las estadísticas no están disponibles"}), 503
+
+    try:
+        series = sales_analytics.series(
+            session.get("usuario_id"), desde, hasta,
+            granularidad=request.args.get('granularidad', 'dia'),
+            utc_offset=utc_offset,
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "series": series})
+
+# ===== API: Ventas del vendedor (paginadas) =====
+def _lista_param(nombre):
+    """Parámetro con valores separados por comas ('preparando,enviado') o None."""
+    valores = [valor.strip() for valor in request.args.get(nombre, '').split(',') if valor.strip()]
+    return valores or None
+
+
+@vendedor_bp.route("/api/ventas")
+@login_required
+@role_required("vendedor")
+def api_ventas():
+    """
+    Ventas del vendedor en sesión, de la más reciente a la más antigua, por páginas.
+    Parámetros: estado_pedido y estado (listas separadas por comas), cursor y limit (máx. 100).
+    """
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        limit = 20
+
+    if not sales_feed.ensure_started():
+        current_app.logger.warning("Ventas no disponibles: el feed de ventas no arrancó")
+        return jsonify({"success": False, "error": "Las ventas no están disponibles"}), 503
+
+    try:
+        ventas, next_cursor = vendor_lines.page(
+            session.get("usuario_id"),
+            estados_pedido=_lista_param('estado_pedido'),
+            estados=_lista_param('estado'),
+            cursor=request.args.get('cursor') or None,
+            page_size=limit,
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, "ventas": ventas, "next_cursor": next_cursor})
+
+# ===== API: Exportación del historial de ventas =====
+@vendedor_bp.route("/api/ventas/exportar")
+@login_required
+@role_required("vendedor")
+def api_exportar_ventas():
+    """
+    Descarga las líneas de venta del vendedor en sesión, de la más antigua a la más reciente.
+    Parámetros: formato (csv o jsonl), desde y hasta (ISO 8601; hasta no incluido), utc_offset,
+    estado_pedido y estado (listas separadas por comas). La respuesta se genera en streaming y
+    va comprimida con gzip si el navegador lo acepta.
+    """
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATS:
+        return jsonify({"success": False, "error": f"Formato no soportado: {formato}"}), 400
+    try:
+        zona = timezone(timedelta(minutes=int(request.args.get('utc_offset', 0))))
+        desde = _fecha_param('desde', zona, None)
+        hasta = _fecha_param('hasta', zona, None)
+    except (ValueError, OverflowError):
+        return jsonify({"success": False, "error": "Parámetros de fecha inválidos"}), 400
+
+    if not sales_feed.ensure_started():
+        current_app.logger.warning("Exportación no disponible: el feed de ventas no arrancó")
+        return jsonify({"success": False, "error": "Las ventas no están disponibles"}), 503
+
+    vendedor_id = session.get("usuario_id")
+    lineas = vendor_lines.iter_lines(
+        vendedor_id, desde=desde, hasta=hasta,
+        estados_pedido=_lista_param('estado_pedido'),
+        estados=_lista_param('estado'),
+    )
+    comprimir = request.accept_encodings['gzip'] > 0
+    current_app.logger.info(f"Exportando ventas de {vendedor_id} en {formato} (gzip={comprimir})")
+
+    response = Response(stream_with_context(export_chunks(lineas, formato, gzip=comprimir)),
+                        content_type=FORMATS[formato])
+    nombre = f"ventas-{datetime.now(timezone.utc):%Y%m%d}.{formato}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if comprimir:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+# ===== API: Búsqueda masiva de productos de líneas de compra =====
+MAX_LOOKUP_IDS = 1000
+
+@vendedor_bp.route("/api/productos/lookup", methods=["POST"])
+@login_required
+@role_required("vendedor")
+def api_lookup_productos():
+    """
+    Recibe {"ids": [...]} y devuelve {"productos": {id: {vendedor_id, nombre, precio}}}.
+    Sustituye la lectura de un producto por cada línea de compra en ventas/estadísticas.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids") or []
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        return jsonify({"success": False, "error": "ids debe ser una lista de strings"}), 400
+    if len(ids) > MAX_LOOKUP_IDS:
+        return jsonify({"success": False, "error": f"Máximo {MAX_LOOKUP_IDS} ids por petición"}), 400
+
+    try:
+        productos = productos_repo.lookup(ids)
+    except Exception as e:
+        current_app.logger.error(f"Error en búsqueda masiva de productos: {str(e)}")
+        return jsonify({"success": False, "error": "No fue posible consultar los productos"}), 500
+
+    return jsonify({"success": True, "productos": productos})
+
 # ===== Ver Productos (Catálogo) =====
 @vendedor_bp.route("/catalogo")
 @login_required
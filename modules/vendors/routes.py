@@ -5,7 +5,8 @@ from flask import Blueprint, current_app, jsonify, request, url_for
 import stripe
 
 from modules.auth.decorators import login_required, role_required
-from modules.services.firestore_client import get_firestore_client
+from modules.services.repositories import usuarios_repo
+from modules.services.unit_of_work import unit_of_work
 
 if hasattr(stripe, "error"):
     StripeError = stripe.error.StripeError  # type: ignore[attr-defined]
@@ -37,24 +38,14 @@ def _ensure_firestore_vendor(vendor_id):
     Obtiene una referencia al documento del vendedor en Firestore.
     Devuelve (doc_ref, snapshot_dict) o (None, None) si Firestore no está disponible.
     """
-    client = get_firestore_client()
-    if not client:
+    doc_ref = usuarios_repo.document(vendor_id)
+    if doc_ref is None:
         return None, None
 
-    doc_ref = client.collection("usuarios").document(vendor_id)
-    snapshot = doc_ref.get()
-    if snapshot.exists:
-        return doc_ref, snapshot.to_dict()
-
-    return doc_ref, {}
+    return doc_ref, usuarios_repo.get_cached(vendor_id, fields=usuarios_repo.STRIPE_FIELDS) or {}
 
 
 def _save_vendor_account(vendor_id, account_id, email=None, status=None, extra=None):
-    client = get_firestore_client()
-    if not client:
-        return
-
-    doc_ref = client.collection("usuarios").document(vendor_id)
     payload = {
         "stripe_account_id": account_id,
         "stripe_account_email": (email or "").lower(),
@@ -67,17 +58,13 @@ def _save_vendor_account(vendor_id, account_id, email=None, status=None, extra=N
     if extra:
         payload.update(extra)
 
-    doc_ref.set(payload, merge=True)
+    usuarios_repo.set(vendor_id, payload, merge=True)
 
 
 def _get_vendor_account(vendor_id):
-    client = get_firestore_client()
-    if not client:
-        return None
-    snapshot = client.collection("usuarios").document(vendor_id).get()
-    if not snapshot.exists:
+    data = usuarios_repo.get_cached(vendor_id, fields=usuarios_repo.STRIPE_FIELDS)
+    if data is None:
         return None
-    data = snapshot.to_dict() or {}
     account_id = data.get("stripe_account_id")
     if not account_id:
         return None
@@ -129,25 +116,21 @@ def _find_completed_account_by_email(email, exclude_vendor_id=None):
     if not email:
         return None
 
-    client = get_firestore_client()
-    if not client:
-        return None
-
     try:
-        query = (
-            client.collection("usuarios")
-            .where("stripe_account_email", "==", email.lower())
-            .limit(5)
-            .stream()
+        matches = list(
+            usuarios_repo.stream(
+                [("stripe_account_email", "==", email.lower())],
+                limit=5,
+                fields=usuarios_repo.STRIPE_FIELDS,
+            )
         )
     except Exception as exc:
         current_app.logger.warning("No se pudo consultar Firestore por email: %s", exc)
         return None
 
-    for doc in query:
-        if exclude_vendor_id and doc.id == exclude_vendor_id:
+    for doc_id, data in matches:
+        if exclude_vendor_id and doc_id == exclude_vendor_id:
             continue
-        data = doc.to_dict() or {}
         account_id = data.get("stripe_account_id")
         status = data.get("stripe_status") or data.get("stripe_account_status") or {}
         charges = bool(status.get("charges_enabled"))
@@ -159,7 +142,7 @@ def _find_completed_account_by_email(email, exclude_vendor_id=None):
 
         if account_id and charges and payouts:
             return {
-                "vendor_id": doc.id,
+                "vendor_id": doc_id,
                 "account_id": account_id,
                 "status": {
                     "charges_enabled": charges,
@@ -329,6 +312,7 @@ def _process_create_account(payload):
 @vendors_bp.route("/create-account", methods=["POST"])
 @login_required
 @role_required("vendedor")
+@unit_of_work
 def create_connect_account():
     """
     Crea una cuenta de Stripe Connect Standard para el vendedor y devuelve la URL de onboarding.
@@ -352,6 +336,7 @@ def create_connect_account():
 
 
 @vendors_bp.route("/create-account/public", methods=["POST"])
+@unit_of_work
 def create_connect_account_public():
     """
     Versión sin autenticación, útil para pruebas locales o consumo externo.
@@ -376,6 +361,7 @@ def create_connect_account_public():
 @vendors_bp.route("/status/<vendor_id>", methods=["GET"])
 @login_required
 @role_required("vendedor")
+@unit_of_work
 def get_connect_status(vendor_id):
     """
     Devuelve el estado actual de la cuenta de Stripe Connect del vendedor.
@@ -429,7 +415,8 @@ def get_connect_status(vendor_id):
                 "dashboard_url": f"https://dashboard.stripe.com/connect/accounts/{stripe_account_id}",
             }
             if doc_ref:
-                doc_ref.set(
+                usuarios_repo.set(
+                    vendor_id,
                     {
                         "stripe_account_id": stripe_account_id,
                         "stripe_account_email": vendor_email,
@@ -473,7 +460,8 @@ def get_connect_status(vendor_id):
         )
 
         if doc_ref:
-            doc_ref.set(
+            usuarios_repo.set(
+                vendor_id,
                 {"stripe_status": status_payload, "stripe_account_status": status_payload},
                 merge=True,
             )
@@ -490,6 +478,7 @@ def get_connect_status(vendor_id):
 @vendors_bp.route("/payments/create-intent", methods=["POST"])
 @login_required
 @role_required("vendedor")
+@unit_of_work
 def create_payment_intent():
     """
     Crea un PaymentIntent conectado, enviando la comisión a la plataforma y el resto al vendedor.
@@ -376,6 +376,37 @@
             return null;
         }
 
+        // El servidor lanza en paralelo las consultas por metadata.orderId y pedido_id
+        try {
+            const params = new URLSearchParams({ pedido_id: pedidoId });
+            if (vendedorIdEspecifico) {
+                params.set("vendedor_id", vendedorIdEspecifico);
+            }
+            const response = await fetch(`/api/chats/existente?${params.toString()}`, {
+                credentials: "same-origin",
+                headers: { Accept: "application/json" },
+            });
+            if (response.ok) {
+                const resultado = await response.json();
+                if (resultado.success) {
+                    if (!resultado.chat_id) {
+                        return null;
+                    }
+                    const ref = db.collection("chats").doc(resultado.chat_id);
+                    const doc = await ref.get();
+                    if (doc.exists) {
+                        return { id: doc.id, ref, data: doc.data() };
+                    }
+                }
+            }
+        } catch (error) {
+            console.warn("⚠️ Búsqueda de chat en el servidor no disponible, consultando Firestore:", error);
+        }
+
+        return buscarChatExistenteEnFirestore(pedidoId, userId, vendedorIdEspecifico);
+    }
+
+    async function buscarChatExistenteEnFirestore(pedidoId, userId, vendedorIdEspecifico = null) {
         try {
             const candidatosMap = new Map();
 
@@ -9,6 +9,8 @@ let productoData = null;
 let productoId = null;
 let currentRating = 0;
 let imagenes = [];
+let comentariosCursor = null;   // next_cursor de la última página de comentarios del servidor
+let totalComentarios = null;    // total del agregado de calificaciones (null = comentarios cargados)
 
 // Inicializar Firebase
 async function inicializarFirebase() {
@@ -79,15 +81,6 @@ async function inicializarFirebase() {
             console.warn('⚠️ No se pudo habilitar persistencia:', error.message);
         }
         
-        // Verificar que db esté funcionando con una prueba simple
-        try {
-            await db.collection('_test_connection').limit(0).get();
-            console.log('✅ Conexión a Firestore verificada');
-        } catch (testError) {
-            console.warn('⚠️ Advertencia al verificar conexión:', testError.message);
-            // No fallar aquí, podría ser un problema de permisos pero la conexión funciona
-        }
-        
         console.log('✅ Firebase completamente inicializado');
         return true;
     } catch (error) {
@@ -108,12 +101,65 @@ function obtenerProductoId() {
     return pathParts[pathParts.length - 1];
 }
 
+// Detalle agregado del servidor: producto, vendedor, comentarios y calificaciones en una petición
+async function cargarDetalleDelServidor() {
+    try {
+        const response = await fetch(`/comprador/api/productos/${encodeURIComponent(productoId)}/detalle`, {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' }
+        });
+        const data = response.ok ? await response.json() : null;
+        return data && data.success ? data : null;
+    } catch (error) {
+        console.warn('⚠️ Detalle agregado no disponible, cargando desde Firestore:', error);
+        return null;
+    }
+}
+
+// Preparar la galería a partir de productoData
+function prepararImagenes() {
+    imagenes = [];
+    if (productoData.imagen) {
+        imagenes.push(productoData.imagen);
+    }
+    // Si hay más imágenes en un array
+    if (productoData.imagenes && Array.isArray(productoData.imagenes)) {
+        imagenes = [...imagenes, ...productoData.imagenes];
+    }
+    // Eliminar duplicados
+    imagenes = [...new Set(imagenes.filter(img => img && img.trim() !== ''))];
+    
+    if (imagenes.length === 0) {
+        // Usar un placeholder SVG en base64 en lugar de una imagen que no existe
+        imagenes.push('data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjQwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj48cmVjdCB3aWR0aD0iNDAwIiBoZWlnaHQ9IjQwMCIgZmlsbD0iI2Y4ZjlmYSIvPjx0ZXh0IHg9IjUwJSIgeT0iNTAlIiBmb250LWZhbWlseT0iQXJpYWwiIGZvbnQtc2l6ZT0iMjQiIGZpbGw9IiM5OTkiIHRleHQtYW5jaG9yPSJtaWRkbGUiIGR5PSIuM2VtIj5TaW4gaW1hZ2VuPC90ZXh0Pjwvc3ZnPg==');
+    }
+}
+
 // Cargar datos del producto
 async function cargarProducto() {
     try {
         productoId = obtenerProductoId();
         console.log('📦 Cargando producto:', productoId);
         
+        const detalle = await cargarDetalleDelServidor();
+        if (detalle) {
+            productoData = detalle.producto;
+            prepararImagenes();
+            mostrarProducto();
+            document.getElementById('loadingState').style.display = 'none';
+            document.getElementById('productContent').style.display = 'block';
+            
+            mostrarInformacionVendedor(detalle.vendedor);
+            document.getElementById('sellerProducts').textContent = detalle.mas_del_vendedor.total;
+            mostrarMasProductosVendedor(detalle.mas_del_vendedor.productos);
+            
+            mostrarResumenCalificaciones(detalle.calificaciones);
+            totalComentarios = detalle.calificaciones.total;
+            mostrarPaginaComentarios(detalle.comentarios, detalle.comentarios_cursor, false);
+            verificarPermisoComentar();
+            return;
+        }
+        
         if (!db) {
             console.error('❌ db no está disponible');
             throw new Error('Base de datos no disponible');
@@ -131,23 +177,7 @@ async function cargarProducto() {
         console.log('✅ Producto cargado:', productoData);
         console.log('🔍 vendedor_id del producto:', productoData.vendedor_id);
         
-        // Cargar imágenes (si hay múltiples)
-        imagenes = [];
-        if (productoData.imagen) {
-            imagenes.push(productoData.imagen);
-        }
-        // Si hay más imágenes en un array
-        if (productoData.imagenes && Array.isArray(productoData.imagenes)) {
-            imagenes = [...imagenes, ...productoData.imagenes];
-        }
-        // Eliminar duplicados
-        imagenes = [...new Set(imagenes.filter(img => img && img.trim() !== ''))];
-        
-        if (imagenes.length === 0) {
-            // Usar un placeholder SVG en base64 en lugar de una imagen que no existe
-            imagenes.push('data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjQwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj48cmVjdCB3aWR0aD0iNDAwIiBoZWlnaHQ9IjQwMCIgZmlsbD0iI2Y4ZjlmYSIvPjx0ZXh0IHg9IjUwJSIgeT0iNTAlIiBmb250LWZhbWlseT0iQXJpYWwiIGZvbnQtc2l6ZT0iMjQiIGZpbGw9IiM5OTkiIHRleHQtYW5jaG9yPSJtaWRkbGUiIGR5PSIuM2VtIj5TaW4gaW1hZ2VuPC90ZXh0Pjwvc3ZnPg==');
-        }
-        
+        prepararImagenes();
         mostrarProducto();
         
         // Ocultar loading y mostrar contenido PRIMERO para que el usuario vea la página
@@ -304,9 +334,25 @@ async function cargarInformacionVendedor() {
         console.log('👤 Buscando vendedor con ID:', productoData.vendedor_id);
         
         const vendedorDoc = await db.collection('usuarios').doc(productoData.vendedor_id).get();
+        mostrarInformacionVendedor(vendedorDoc.exists ? vendedorDoc.data() : null);
         
-        if (vendedorDoc.exists) {
-            const vendedorData = vendedorDoc.data();
+        // Conteo y "más de este vendedor" desde el índice del servidor
+        await cargarMasProductosVendedor(productoData.vendedor_id);
+        
+    } catch (error) {
+        console.error('❌ Error cargando información del vendedor:', error);
+        console.error('❌ Stack:', error.stack);
+        // Mostrar mensaje de error en la UI
+        const sellerName = document.getElementById('sellerName');
+        if (sellerName) {
+            sellerName.textContent = productoData.vendedor_nombre || 'Vendedor no disponible';
+        }
+    }
+}
+
+// Mostrar los datos del vendedor (documento de Firestore o resumen del servidor)
+function mostrarInformacionVendedor(vendedorData) {
+        if (vendedorData) {
             console.log('✅ Datos del vendedor cargados:', vendedorData);
             
             // Nombre del vendedor
@@ -360,37 +406,72 @@ async function cargarInformacionVendedor() {
                 newLocationEl.style.cursor = 'default';
             }
             
-            // Fecha de registro
+            // Fecha de registro (Timestamp de Firestore o fecha ISO del servidor)
             if (vendedorData.fecha_registro) {
-                const fecha = new Date(vendedorData.fecha_registro.toDate());
+                const registro = vendedorData.fecha_registro;
+                const fecha = registro.toDate ? registro.toDate() : new Date(registro);
                 document.getElementById('sellerSince').textContent = fecha.getFullYear();
             }
             
-            // Contar productos del vendedor (con límite para mejorar rendimiento)
-            const productosSnapshot = await db.collection('productos')
-                .where('vendedor_id', '==', productoData.vendedor_id)
-                .where('activo', '==', true)
-                .limit(100) // Limitar consulta para mejor rendimiento
-                .get();
-            document.getElementById('sellerProducts').textContent = productosSnapshot.size;
-            
         } else {
             console.warn('⚠️ Vendedor no encontrado en Firestore, usando datos del producto como fallback');
             // Usar datos del producto como fallback
             document.getElementById('sellerName').textContent = productoData.vendedor_nombre || 'Vendedor';
         }
-        
-    } catch (error) {
-        console.error('❌ Error cargando información del vendedor:', error);
-        console.error('❌ Stack:', error.stack);
-        // Mostrar mensaje de error en la UI
-        const sellerName = document.getElementById('sellerName');
-        if (sellerName) {
-            sellerName.textContent = productoData.vendedor_nombre || 'Vendedor no disponible';
+}
+
+// Más productos del vendedor (índice en memoria del servidor)
+async function cargarMasProductosVendedor(vendedorId) {
+    const contador = document.getElementById('sellerProducts');
+    try {
+        const response = await fetch(
+            `/comprador/api/vendedores/${encodeURIComponent(vendedorId)}/productos?limit=4&excluir=${encodeURIComponent(productoId)}`,
+            { credentials: 'same-origin', headers: { 'Accept': 'application/json' } }
+        );
+        const data = response.ok ? await response.json() : null;
+        if (!data || !data.success) {
+            throw new Error('Respuesta no válida del servidor');
         }
+
+        contador.textContent = data.total;
+        mostrarMasProductosVendedor(data.productos);
+    } catch (error) {
+        // Respaldo: contar directamente en Firestore
+        console.warn('⚠️ Índice de productos del vendedor no disponible:', error);
+        const productosSnapshot = await db.collection('productos')
+            .where('vendedor_id', '==', vendedorId)
+            .where('activo', '==', true)
+            .limit(100) // Limitar consulta para mejor rendimiento
+            .get();
+        contador.textContent = productosSnapshot.size;
     }
 }
 
+function mostrarMasProductosVendedor(productos) {
+    const contenedor = document.getElementById('sellerMoreProducts');
+    if (!contenedor) return;
+
+    contenedor.innerHTML = '';
+    productos.forEach((producto) => {
+        const enlace = document.createElement('a');
+        enlace.className = 'seller-more-item';
+        enlace.href = `/comprador/producto/${encodeURIComponent(producto.id)}`;
+
+        const nombre = document.createElement('span');
+        nombre.className = 'seller-more-name';
+        nombre.textContent = producto.nombre;
+
+        const precio = document.createElement('span');
+        precio.className = 'seller-more-price';
+        const precioFinal = producto.precio_con_descuento || producto.precio;
+        precio.textContent = `$${Number(precioFinal).toFixed(2)} / ${producto.unidad}`;
+
+        enlace.append(nombre, precio);
+        contenedor.appendChild(enlace);
+    });
+    contenedor.style.display = productos.length ? '' : 'none';
+}
+
 // Cargar comentarios
 async function cargarComentarios() {
     try {
@@ -442,8 +523,8 @@ async function cargarComentarios() {
         // Ordenar manualmente si no se pudo ordenar en la consulta
         if (comentarios.length > 0 && comentarios[0].fecha) {
             comentarios.sort((a, b) => {
-                const fechaA = a.fecha?.toDate ? a.fecha.toDate().getTime() : 0;
-                const fechaB = b.fecha?.toDate ? b.fecha.toDate().getTime() : 0;
+                const fechaA = tiempoComentario(a);
+                const fechaB = tiempoComentario(b);
                 return fechaB - fechaA; // Más recientes primero
             });
         }
@@ -476,21 +557,69 @@ async function cargarComentarios() {
     }
 }
 
-// Actualizar resumen de calificaciones
-function actualizarResumenCalificaciones(comentarios) {
-    const ratingSummary = document.getElementById('ratingSummary');
-    if (!ratingSummary) return;
+// Añadir (o sustituir) la página de comentarios recibida del servidor
+function mostrarPaginaComentarios(pagina, cursor, agregar) {
+    const nuevos = pagina.map(prepararComentario);
+    window.comentariosGlobales = agregar ? [...(window.comentariosGlobales || []), ...nuevos] : nuevos;
+    comentariosCursor = cursor;
     
-    if (comentarios.length === 0) {
-        ratingSummary.style.display = 'none';
-        return;
-    }
-    
-    ratingSummary.style.display = 'block';
+    const sortSelect = document.getElementById('sortComments');
+    const orden = sortSelect ? sortSelect.value : 'recientes';
+    mostrarComentarios(ordenarComentarios(window.comentariosGlobales, orden));
     
-    // Calcular promedio
+    const btnMas = document.getElementById('loadMoreCommentsBtn');
+    if (btnMas) {
+        btnMas.style.display = comentariosCursor ? 'inline-flex' : 'none';
+    }
+}
+
+// Cargar la siguiente página de comentarios (orden por fecha descendente en el servidor)
+async function cargarMasComentarios() {
+    if (!comentariosCursor) return;
+    const btnMas = document.getElementById('loadMoreCommentsBtn');
+    if (btnMas) btnMas.disabled = true;
+    try {
+        const params = new URLSearchParams({ cursor: comentariosCursor, limit: 10 });
+        const response = await fetch(`/comprador/api/productos/${encodeURIComponent(productoId)}/comentarios?${params}`, {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' }
+        });
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        mostrarPaginaComentarios(data.comentarios, data.next_cursor, true);
+    } catch (error) {
+        console.error('❌ Error cargando más comentarios:', error);
+        mostrarNotificacion('❌ No se pudieron cargar más comentarios', 'error');
+    } finally {
+        if (btnMas) btnMas.disabled = false;
+    }
+}
+
+// Recargar la primera página de comentarios y el resumen tras publicar
+async function recargarComentariosDelServidor(calificaciones) {
+    mostrarResumenCalificaciones(calificaciones);
+    totalComentarios = calificaciones.total;
+    try {
+        const response = await fetch(`/comprador/api/productos/${encodeURIComponent(productoId)}/comentarios`, {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' }
+        });
+        const data = await response.json();
+        if (response.ok && data.success) {
+            mostrarPaginaComentarios(data.comentarios, data.next_cursor, false);
+            return;
+        }
+    } catch (error) {
+        console.warn('⚠️ No se pudo recargar la página de comentarios:', error);
+    }
+    await cargarComentarios();
+}
+
+// Actualizar resumen de calificaciones a partir de los comentarios cargados
+function actualizarResumenCalificaciones(comentarios) {
     let sumaCalificaciones = 0;
-    let totalCalificaciones = comentarios.length;
     const distribucion = { 5: 0, 4: 0, 3: 0, 2: 0, 1: 0 };
     
     comentarios.forEach(comentario => {
@@ -501,7 +630,28 @@ function actualizarResumenCalificaciones(comentarios) {
         }
     });
     
-    const promedio = totalCalificaciones > 0 ? (sumaCalificaciones / totalCalificaciones).toFixed(1) : '0.0';
+    mostrarResumenCalificaciones({
+        total: comentarios.length,
+        promedio: comentarios.length > 0 ? sumaCalificaciones / comentarios.length : 0,
+        distribucion: distribucion
+    });
+}
+
+// Mostrar resumen de calificaciones: { total, promedio, distribucion: {1..5: conteo} }
+function mostrarResumenCalificaciones(resumen) {
+    const ratingSummary = document.getElementById('ratingSummary');
+    if (!ratingSummary) return;
+    
+    if (!resumen || resumen.total === 0) {
+        ratingSummary.style.display = 'none';
+        return;
+    }
+    
+    ratingSummary.style.display = 'block';
+    
+    const totalCalificaciones = resumen.total;
+    const distribucion = resumen.distribucion;
+    const promedio = Number(resumen.promedio).toFixed(1);
     
     // Actualizar promedio
     document.getElementById('ratingAverage').textContent = promedio;
@@ -559,6 +709,19 @@ function actualizarResumenCalificaciones(comentarios) {
     }
 }
 
+// Comentario recibido del servidor (fecha ISO) con la fecha como Date
+function prepararComentario(comentario) {
+    return { ...comentario, fecha: comentario.fecha ? new Date(comentario.fecha) : null };
+}
+
+// Milisegundos de la fecha de un comentario (Timestamp de Firestore o Date)
+function tiempoComentario(comentario) {
+    const fecha = comentario.fecha;
+    if (!fecha) return 0;
+    if (fecha.toDate) return fecha.toDate().getTime();
+    return fecha instanceof Date ? fecha.getTime() : 0;
+}
+
 // Ordenar comentarios
 function ordenarComentarios(comentarios, orden) {
     const comentariosOrdenados = [...comentarios];
@@ -566,15 +729,15 @@ function ordenarComentarios(comentarios, orden) {
     switch(orden) {
         case 'recientes':
             comentariosOrdenados.sort((a, b) => {
-                const fechaA = a.fecha?.toDate ? a.fecha.toDate().getTime() : 0;
-                const fechaB = b.fecha?.toDate ? b.fecha.toDate().getTime() : 0;
+                const fechaA = tiempoComentario(a);
+                const fechaB = tiempoComentario(b);
                 return fechaB - fechaA;
             });
             break;
         case 'antiguos':
             comentariosOrdenados.sort((a, b) => {
-                const fechaA = a.fecha?.toDate ? a.fecha.toDate().getTime() : 0;
-                const fechaB = b.fecha?.toDate ? b.fecha.toDate().getTime() : 0;
+                const fechaA = tiempoComentario(a);
+                const fechaB = tiempoComentario(b);
                 return fechaA - fechaB;
             });
             break;
@@ -584,8 +747,8 @@ function ordenarComentarios(comentarios, orden) {
                 const calB = b.calificacion || 0;
                 if (calB !== calA) return calB - calA;
                 // Si tienen la misma calificación, ordenar por fecha
-                const fechaA = a.fecha?.toDate ? a.fecha.toDate().getTime() : 0;
-                const fechaB = b.fecha?.toDate ? b.fecha.toDate().getTime() : 0;
+                const fechaA = tiempoComentario(a);
+                const fechaB = tiempoComentario(b);
                 return fechaB - fechaA;
             });
             break;
@@ -595,8 +758,8 @@ function ordenarComentarios(comentarios, orden) {
                 const calB = b.calificacion || 0;
                 if (calA !== calB) return calA - calB;
                 // Si tienen la misma calificación, ordenar por fecha
-                const fechaA = a.fecha?.toDate ? a.fecha.toDate().getTime() : 0;
-                const fechaB = b.fecha?.toDate ? b.fecha.toDate().getTime() : 0;
+                const fechaA = tiempoComentario(a);
+                const fechaB = tiempoComentario(b);
                 return fechaB - fechaA;
             });
             break;
@@ -615,7 +778,7 @@ function mostrarComentarios(comentarios) {
         return;
     }
     
-    commentsCount.textContent = comentarios.length;
+    commentsCount.textContent = totalComentarios !== null ? totalComentarios : comentarios.length;
     
     if (comentarios.length === 0) {
         commentsList.innerHTML = `
@@ -795,51 +958,28 @@ async function publicarComentario() {
             return;
         }
         
-        // Obtener nombre del usuario
-        let nombreUsuario = 'Usuario';
-        try {
-        const userDoc = await db.collection('usuarios').doc(user.uid).get();
-            if (userDoc.exists) {
-                const userData = userDoc.data();
-                nombreUsuario = userData.nombre || userData.nombre_tienda || user.displayName || user.email.split('@')[0] || 'Usuario';
-            } else {
-                nombreUsuario = user.displayName || user.email.split('@')[0] || 'Usuario';
-            }
-        } catch (error) {
-            console.warn('⚠️ Error obteniendo nombre del usuario:', error);
-            nombreUsuario = user.displayName || user.email.split('@')[0] || 'Usuario';
-        }
-        
-        // Crear comentario para guardar en Firestore
-        const comentario = {
-            producto_id: productoId,
-            usuario_id: user.uid,
-            nombre_usuario: nombreUsuario,
-            texto: texto.trim(),
-            calificacion: currentRating,
-            fecha: firebase.firestore.FieldValue.serverTimestamp(),
-            activo: true
-        };
-        
-        console.log('💾 Guardando comentario en Firestore:', {
-            producto_id: productoId,
-            nombre_usuario: nombreUsuario,
-            calificacion: currentRating,
-            texto_length: texto.trim().length
+        // El servidor guarda el comentario y actualiza el resumen de calificaciones en una transacción
+        const response = await fetch(`/comprador/api/productos/${encodeURIComponent(productoId)}/comentarios`, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+            body: JSON.stringify({ texto: texto, calificacion: currentRating })
         });
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            mostrarNotificacion(`❌ ${data.error || 'Error al publicar comentario'}`, 'error');
+            return;
+        }
         
-        // Guardar en Firestore
-        await db.collection('comentarios').add(comentario);
-        
-        console.log('✅ Comentario guardado exitosamente en Firestore');
+        console.log('✅ Comentario guardado:', data.comentario_id);
         
         mostrarNotificacion('✅ Comentario publicado exitosamente', 'success');
         
         // Limpiar y ocultar formulario
         ocultarFormularioComentario();
         
-        // Actualizar comentarios globales y recargar
-        await cargarComentarios();
+        // Actualizar resumen y primera página de comentarios
+        await recargarComentariosDelServidor(data.calificaciones);
         
     } catch (error) {
         console.error('❌ Error publicando comentario:', error);
@@ -1208,6 +1348,12 @@ document.addEventListener('DOMContentLoaded', async function() {
         submitBtn.addEventListener('click', publicarComentario);
     }
     
+    // Botón para cargar más comentarios
+    const loadMoreBtn = document.getElementById('loadMoreCommentsBtn');
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', cargarMasComentarios);
+    }
+    
     // Selector de ordenamiento
     const sortSelect = document.getElementById('sortComments');
     if (sortSelect) {
@@ -4,6 +4,7 @@
 let db;
 let auth;
 let ventasData = [];
+let ventasDelServidor = false;
 
 async function inicializarFirebase() {
     try {
@@ -24,6 +25,117 @@ async function inicializarFirebase() {
     }
 }
 
+// Obtiene vendedor_id/nombre/precio de varios productos en una sola petición al servidor
+// (evita leer un documento de 'productos' por cada línea de compra)
+async function obtenerProductosPorIds(ids) {
+    const unicos = [...new Set(ids.filter(Boolean))];
+    const resultado = {};
+    for (let i = 0; i < unicos.length; i += 1000) {
+        try {
+            const response = await fetch('/vendedor/api/productos/lookup', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                credentials: 'same-origin',
+                body: JSON.stringify({ ids: unicos.slice(i, i + 1000) })
+            });
+            const data = await response.json();
+            if (response.ok && data.success) {
+                Object.assign(resultado, data.productos || {});
+            } else {
+                console.error('❌ Error obteniendo productos:', data.error);
+            }
+        } catch (error) {
+            console.error('❌ Error obteniendo productos:', error);
+        }
+    }
+    return resultado;
+}
+
+// Ventas del vendedor desde la vista materializada del servidor (null si no está disponible)
+async function cargarVentasDelServidor() {
+    try {
+        const response = await fetch('/vendedor/api/estadisticas', {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' }
+        });
+        const data = await response.json();
+        if (!response.ok || !data.success) {
+            console.warn('⚠️ Estadísticas del servidor no disponibles:', data.error);
+            return null;
+        }
+        return data.ventas.map(venta => ({
+            ...venta,
+            fecha_compra: venta.fecha ? new Date(venta.fecha) : new Date(),
+            fecha_creacion: venta.fecha || new Date().toISOString()
+        }));
+    } catch (error) {
+        console.warn('⚠️ Estadísticas del servidor no disponibles:', error);
+        return null;
+    }
+}
+
+// Respaldo: recorre todas las compras y se queda con las líneas del vendedor
+async function cargarVentasDesdeFirestore(user) {
+    const comprasSnapshot = await db.collection('compras').get();
+
+    // IDs de productos cuyas líneas no traen vendedor_id: se resuelven todos juntos
+    const idsSinVendedor = [];
+    comprasSnapshot.docs.forEach(compraDoc => {
+        (compraDoc.data().productos || []).forEach(producto => {
+            if (!producto.vendedor_id && producto.producto_id) {
+                idsSinVendedor.push(producto.producto_id);
+            }
+        });
+    });
+    const productosInfo = idsSinVendedor.length > 0 ? await obtenerProductosPorIds(idsSinVendedor) : {};
+
+    const ventas = [];
+
+    for (const compraDoc of comprasSnapshot.docs) {
+        const compraData = compraDoc.data();
+
+        const productos = compraData.productos || [];
+
+        const productosVendedor = productos.map((producto) => {
+            let vendedorId = producto.vendedor_id || '';
+
+            if (!vendedorId && producto.producto_id && productosInfo[producto.producto_id]) {
+                vendedorId = productosInfo[producto.producto_id].vendedor_id || '';
+            }
+
+            const esDelVendedor = String(vendedorId || '') === String(user.uid);
+
+            if (esDelVendedor) {
+                return { ...producto, vendedor_id: vendedorId };
+            }
+            return null;
+        }).filter(p => p !== null);
+
+        if (productosVendedor.length > 0) {
+            const totalVenta = productosVendedor.reduce((acc, prod) =>
+                acc + (Number(prod.precio_total) || 0), 0
+            );
+
+            const estadoPedido = productosVendedor[0]?.estado_pedido ||
+                                 compraData.estado_pedido ||
+                                 'preparando';
+
+            ventas.push({
+                compra_id: compraDoc.id,
+                fecha_compra: compraData.fecha_compra?.toDate?.() ||
+                             (compraData.fecha_creacion ? new Date(compraData.fecha_creacion) : new Date()),
+                fecha_creacion: compraData.fecha_creacion || new Date().toISOString(),
+                productos: productosVendedor,
+                total: totalVenta,
+                estado: compraData.estado || 'pendiente',
+                estado_pedido: estadoPedido
+            });
+        }
+    }
+
+    return ventas;
+}
+
 async function cargarVentasParaEstadisticas() {
     try {
         const user = auth.currentUser;
@@ -40,61 +152,10 @@ async function cargarVentasParaEstadisticas() {
         if (emptyEl) emptyEl.style.display = 'none';
         if (containerEl) containerEl.style.display = 'none';
 
-        const comprasSnapshot = await db.collection('compras').get();
-
-        ventasData = [];
-
-        for (const compraDoc of comprasSnapshot.docs) {
-            const compraData = compraDoc.data();
-
-            const productos = compraData.productos || [];
-
-            const productosVendedorPromesas = productos.map(async (producto) => {
-                let vendedorId = producto.vendedor_id || '';
-
-                if (!vendedorId && producto.producto_id) {
-                    try {
-                        const productoDoc = await db.collection('productos').doc(producto.producto_id).get();
-                        if (productoDoc.exists) {
-                            const productoData = productoDoc.data();
-                            vendedorId = productoData.vendedor_id || productoData.vendedorId || '';
-                        }
-                    } catch (error) {
-                        console.error('❌ Error obteniendo vendedor_id del producto:', error);
-                    }
-                }
-
-                const esDelVendedor = String(vendedorId || '') === String(user.uid);
-
-                if (esDelVendedor) {
-                    return { ...producto, vendedor_id: vendedorId };
-                }
-                return null;
-            });
-
-            const productosVendedorTemp = await Promise.all(productosVendedorPromesas);
-            const productosVendedor = productosVendedorTemp.filter(p => p !== null);
-
-            if (productosVendedor.length > 0) {
-                const totalVenta = productosVendedor.reduce((acc, prod) =>
-                    acc + (Number(prod.precio_total) || 0), 0
-                );
-
-                const estadoPedido = productosVendedor[0]?.estado_pedido ||
-                                     compraData.estado_pedido ||
-                                     'preparando';
-
-                ventasData.push({
-                    compra_id: compraDoc.id,
-                    fecha_compra: compraData.fecha_compra?.toDate?.() ||
-                                 (compraData.fecha_creacion ? new Date(compraData.fecha_creacion) : new Date()),
-                    fecha_creacion: compraData.fecha_creacion || new Date().toISOString(),
-                    productos: productosVendedor,
-                    total: totalVenta,
-                    estado: compraData.estado || 'pendiente',
-                    estado_pedido: estadoPedido
-                });
-            }
+        ventasData = await cargarVentasDelServidor();
+        ventasDelServidor = ventasData !== null;
+        if (!ventasDelServidor) {
+            ventasData = await cargarVentasDesdeFirestore(user);
         }
 
         ventasData.sort((a, b) => {
@@ -144,7 +205,18 @@ function cargarEstadisticas() {
 
     // Obtener filtro de período
     const filtroPeriodo = document.getElementById('filtro-periodo-estadisticas')?.value || '30';
-    
+
+    if (ventasDelServidor) {
+        cargarEstadisticasDelServidor(filtroPeriodo).then(ok => {
+            if (!ok) generarEstadisticasLocales(filtroPeriodo);
+        });
+        return;
+    }
+    generarEstadisticasLocales(filtroPeriodo);
+}
+
+// Respaldo: métricas y gráficas calculadas en el navegador a partir de ventasData
+function generarEstadisticasLocales(filtroPeriodo) {
     // Filtrar ventas por período
     const ventasFiltradas = filtrarVentasPorPeriodo(ventasData, filtroPeriodo);
 
@@ -155,6 +227,83 @@ function cargarEstadisticas() {
     generarGraficas(ventasFiltradas);
 }
 
+// ===== SERIES CALCULADAS EN EL SERVIDOR =====
+async function cargarSeriesDelServidor(desde, hasta, granularidad) {
+    const params = new URLSearchParams({
+        desde: desde.toISOString(),
+        hasta: hasta.toISOString(),
+        granularidad,
+        utc_offset: String(-new Date().getTimezoneOffset())
+    });
+    const response = await fetch(`/vendedor/api/estadisticas/series?${params}`, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' }
+    });
+    const data = await response.json();
+    if (!response.ok || !data.success) {
+        throw new Error(data.error || 'Series no disponibles');
+    }
+    return data.series;
+}
+
+function inicioDelDia(fecha) {
+    const inicio = new Date(fecha);
+    inicio.setHours(0, 0, 0, 0);
+    return inicio;
+}
+
+// Métricas y gráficas del período con las series del servidor (false si no están disponibles)
+async function cargarEstadisticasDelServidor(filtroPeriodo) {
+    const ahora = new Date();
+    const manana = inicioDelDia(ahora);
+    manana.setDate(manana.getDate() + 1);
+
+    let desde;
+    if (filtroPeriodo === 'todos') {
+        const fechas = ventasData.map(v => v.fecha_compra instanceof Date ? v.fecha_compra : new Date(v.fecha_creacion));
+        desde = fechas.length > 0 ? new Date(Math.min(...fechas)) : ahora;
+    } else {
+        desde = new Date(ahora);
+        desde.setDate(ahora.getDate() - parseInt(filtroPeriodo));
+    }
+    const desdeDia = new Date(manana);
+    desdeDia.setDate(manana.getDate() - 30);
+
+    try {
+        const [periodo, ultimosDias] = await Promise.all([
+            cargarSeriesDelServidor(desde, manana, 'mes'),
+            cargarSeriesDelServidor(desdeDia, manana, 'dia')
+        ]);
+        // Los totales cubren exactamente el período filtrado, como filtrarVentasPorPeriodo
+        const totales = periodo.totales;
+        const estados = totales.pedidos_por_estado;
+        mostrarMetricas(
+            totales.ingresos,
+            totales.pedidos,
+            totales.unidades,
+            (estados.recibido || 0) + (estados.entregado || 0)
+        );
+
+        Object.values(charts).forEach(chart => {
+            if (chart) chart.destroy();
+        });
+        dibujarGraficaVentasMes(
+            periodo.etiquetas.map(e => new Date(e).toLocaleString('es-MX', { month: 'short', year: 'numeric' })),
+            periodo.ingresos
+        );
+        dibujarGraficaProductosVendidos(periodo.productos);
+        dibujarGraficaEstados(estados);
+        dibujarGraficaVentasDia(
+            ultimosDias.etiquetas.map(e => new Date(e).toLocaleDateString('es-MX', { month: 'short', day: 'numeric' })),
+            ultimosDias.ingresos
+        );
+        return true;
+    } catch (error) {
+        console.warn('⚠️ Series del servidor no disponibles:', error);
+        return false;
+    }
+}
+
 function filtrarVentasPorPeriodo(ventas, dias) {
     if (dias === 'todos') return ventas;
     
@@ -188,7 +337,10 @@ function calcularMetricas(ventas) {
         return estado === 'recibido' || estado === 'entregado';
     }).length;
 
-    // Actualizar UI
+    mostrarMetricas(totalVendido, totalPedidos, productosVendidos, pedidosCompletados);
+}
+
+function mostrarMetricas(totalVendido, totalPedidos, productosVendidos, pedidosCompletados) {
     document.getElementById('metrica-total-vendido').textContent = `$${totalVendido.toFixed(2)}`;
     document.getElementById('metrica-total-pedidos').textContent = totalPedidos.toString();
     document.getElementById('metrica-productos-vendidos').textContent = productosVendidos.toString();
@@ -237,6 +389,13 @@ function generarGraficaVentasMes(ventas) {
     });
     const valores = meses.map(mes => ventasPorMes[mes]);
 
+    dibujarGraficaVentasMes(meses, valores);
+}
+
+function dibujarGraficaVentasMes(meses, valores) {
+    const ctx = document.getElementById('grafica-ventas-mes');
+    if (!ctx) return;
+
     charts.ventasMes = new Chart(ctx, {
         type: 'line',
         data: {
@@ -296,13 +455,25 @@ function generarGraficaProductosVendidos(ventas) {
     // Ordenar por cantidad y tomar los top 10
     const productosArray = Object.entries(productosMap)
         .map(([nombre, datos]) => ({
-            nombre: nombre.length > 20 ? nombre.substring(0, 20) + '...' : nombre,
+            nombre,
             cantidad: datos.cantidad,
             total: datos.total
         }))
         .sort((a, b) => b.cantidad - a.cantidad)
         .slice(0, 10);
 
+    dibujarGraficaProductosVendidos(productosArray);
+}
+
+// productos: [{nombre, cantidad}] ya ordenados, como mucho 10
+function dibujarGraficaProductosVendidos(productos) {
+    const ctx = document.getElementById('grafica-productos-vendidos');
+    if (!ctx) return;
+
+    const productosArray = productos.map(p => ({
+        ...p,
+        nombre: p.nombre.length > 20 ? p.nombre.substring(0, 20) + '...' : p.nombre
+    }));
     const nombres = productosArray.map(p => p.nombre);
     const cantidades = productosArray.map(p => p.cantidad);
 
@@ -350,6 +521,14 @@ function generarGraficaEstados(ventas) {
         estadosMap[estado] = (estadosMap[estado] || 0) + 1;
     });
 
+    dibujarGraficaEstados(estadosMap);
+}
+
+// estadosMap: {estado_pedido: pedidos}
+function dibujarGraficaEstados(estadosMap) {
+    const ctx = document.getElementById('grafica-estados');
+    if (!ctx) return;
+
     const estados = Object.keys(estadosMap);
     const valores = estados.map(estado => estadosMap[estado]);
     
@@ -411,8 +590,12 @@ function generarGraficaVentasDia(ventas) {
         }
     });
 
-    const dias = Object.keys(ventasPorDia);
-    const valores = Object.values(ventasPorDia);
+    dibujarGraficaVentasDia(Object.keys(ventasPorDia), Object.values(ventasPorDia));
+}
+
+function dibujarGraficaVentasDia(dias, valores) {
+    const ctx = document.getElementById('grafica-ventas-dia');
+    if (!ctx) return;
 
     charts.ventasDia = new Chart(ctx, {
         type: 'bar',
@@ -57,8 +57,32 @@
                 }
             }
 
-            // Contar productos por categoría
+            // Contar productos por categoría (facetas precalculadas en el servidor)
             async function contarProductosPorCategoria() {
+                try {
+                    const response = await fetch('/comprador/api/catalogo/facetas', {
+                        credentials: 'same-origin',
+                        headers: { 'Accept': 'application/json' }
+                    });
+                    const data = response.ok ? await response.json() : null;
+
+                    if (data && data.success) {
+                        const conteos = { 'todos': data.facetas.total, 'frutas': 0, 'verduras': 0, 'semillas': 0, 'otros': 0 };
+                        Object.entries(data.facetas.categorias).forEach(([categoria, conteo]) => {
+                            const clave = conteos.hasOwnProperty(categoria) && categoria !== 'todos' ? categoria : 'otros';
+                            conteos[clave] += conteo;
+                        });
+                        return conteos;
+                    }
+                } catch (error) {
+                    console.warn('⚠️ Facetas no disponibles, contando en Firestore:', error);
+                }
+
+                return contarProductosEnFirestore();
+            }
+
+            // Contar productos por categoría leyendo la colección (respaldo)
+            async function contarProductosEnFirestore() {
                 try {
                     if (!db) {
                         return {};
@@ -153,8 +177,33 @@
                 categoriasGrid.innerHTML = categoriasHTML;
             }
 
-            // Cargar productos recomendados
+            // Cargar productos recomendados: primero los más vendidos (ranking del servidor)
             async function cargarProductosRecomendados() {
+                try {
+                    const response = await fetch('/comprador/api/populares?limit=8', {
+                        credentials: 'same-origin',
+                        headers: { 'Accept': 'application/json' }
+                    });
+                    const data = response.ok ? await response.json() : null;
+
+                    if (data && data.success && data.productos.length > 0) {
+                        productos = data.productos.map(producto => ({
+                            ...producto,
+                            precio: producto.precio_con_descuento || producto.precio
+                        }));
+                        console.log(`✅ ${productos.length} productos populares cargados`);
+                        mostrarProductosRecomendados(productos);
+                        return;
+                    }
+                } catch (error) {
+                    console.warn('⚠️ Ranking de populares no disponible:', error);
+                }
+
+                await cargarProductosDeFirestore();
+            }
+
+            // Respaldo: primeros productos activos de Firestore
+            async function cargarProductosDeFirestore() {
                 try {
                     if (!db) {
                         throw new Error('Base de datos no disponible');
@@ -6,6 +6,11 @@
     let productosOriginales = [];
     let queryBusqueda = '';
     let ordenActual = null; // 'precio-asc', 'precio-desc', o null
+    let siguienteCursor = null; // cursor de la siguiente página del catálogo
+    let cargandoPagina = false;
+    let resultadosBusqueda = null; // resultados del servidor para queryBusqueda
+    let temporizadorBusqueda = null;
+    let temporizadorSugerencias = null;
     let filtrosActivos = {
         categorias: [],
         unidades: [],
@@ -85,87 +90,80 @@
         }
     }
 
+    const ORDEN_API = {
+        'precio-asc': 'precio_asc',
+        'precio-desc': 'precio_desc'
+    };
+
     async function cargarTodosLosProductos() {
-        try {
-            if (!db) {
-                throw new Error('Base de datos de Firestore no está disponible');
-            }
+        const categoriaFiltro = normalizarCategoria(categoriaActual);
 
-            const categoriaFiltro = normalizarCategoria(categoriaActual);
+        const categoriaTitulo = document.getElementById('categoria-titulo');
+        if (categoriaTitulo) {
+            categoriaTitulo.textContent = obtenerNombreCategoria(categoriaActual);
+        }
 
-            const categoriaTitulo = document.getElementById('categoria-titulo');
-            if (categoriaTitulo) {
-                categoriaTitulo.textContent = obtenerNombreCategoria(categoriaActual);
-            }
+        actualizarBreadcrumb(categoriaFiltro);
 
-            actualizarBreadcrumb(categoriaFiltro);
+        productos = [];
+        productosOriginales = [];
+        siguienteCursor = null;
+        await cargarPaginaCatalogo();
+    }
 
-            const productosSnapshot = await db.collection('productos').get();
+    // Pide al servidor la siguiente página del catálogo (ya filtrado por activo/stock/categoría)
+    async function cargarPaginaCatalogo() {
+        if (cargandoPagina) return;
+        cargandoPagina = true;
 
-            if (productosSnapshot.empty) {
-                mostrarProductos([]);
-                return;
+        try {
+            const params = new URLSearchParams({ orden: ORDEN_API[ordenActual] || 'recientes' });
+            const categoriaFiltro = normalizarCategoria(categoriaActual);
+            if (categoriaFiltro && categoriaFiltro !== 'todos los productos') {
+                params.set('categoria', categoriaFiltro);
+            }
+            if (siguienteCursor) {
+                params.set('cursor', siguienteCursor);
             }
 
-            productos = [];
-
-            productosSnapshot.forEach((doc) => {
-                const data = doc.data();
-
-                if (data.activo !== true || (data.stock || 0) <= 0) {
-                    return;
-                }
-
-                const categoriaProducto = normalizarCategoria(data.categoria || 'otros');
-
-                if (categoriaFiltro && categoriaFiltro !== 'todos los productos') {
-                    if (categoriaProducto !== categoriaFiltro) {
-                        return;
-                    }
-                }
-
-                let imagenValida = null;
-                if (data.imagen && typeof data.imagen === 'string' && data.imagen.trim() !== '') {
-                    try {
-                        new URL(data.imagen);
-                        imagenValida = data.imagen;
-                    } catch (error) {
-                        // imagen inválida
-                    }
-                }
-
-                // Calcular precio con descuento si existe
-                const precioOriginal = data.precio || 0;
-                const descuento = data.descuento || 0;
-                const precioConDescuento = descuento > 0 && precioOriginal > 0 
-                    ? precioOriginal * (1 - descuento / 100) 
-                    : null;
-                
-                productos.push({
-                    id: doc.id,
-                    nombre: data.nombre || 'Sin nombre',
-                    precio: precioOriginal,
-                    precio_con_descuento: precioConDescuento,
-                    descuento: descuento,
-                    categoria: data.categoria || 'otros',
-                    stock: data.stock || 0,
-                    unidad: data.unidad || 'kg',
-                    imagen: imagenValida,
-                    vendedor_nombre: data.vendedor_nombre || 'N/A',
-                    descripcion: data.descripcion || '',
-                    origen: data.origen || 'Local',
-                    activo: data.activo || false
-                });
+            const response = await fetch(`/comprador/api/catalogo?${params.toString()}`, {
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' }
             });
+            const data = await response.json();
+            if (!response.ok || !data.success) {
+                throw new Error(data.error || `HTTP ${response.status}`);
+            }
 
-            productosOriginales = [...productos];
-            // Aplicar filtros iniciales
+            productosOriginales = productosOriginales.concat(data.productos || []);
+            productos = [...productosOriginales];
+            siguienteCursor = data.next_cursor || null;
             aplicarFiltros();
         } catch (error) {
             console.error('Error cargando productos:', error);
             mostrarError('Error al cargar productos. Intenta recargar la página.');
+        } finally {
+            cargandoPagina = false;
+            actualizarBotonCargarMas();
         }
     }
+
+    function actualizarBotonCargarMas() {
+        const productosGrid = document.querySelector('.productos-grid-new');
+        if (!productosGrid) return;
+
+        let boton = document.querySelector('.btn-cargar-mas');
+        if (!boton) {
+            boton = document.createElement('button');
+            boton.type = 'button';
+            boton.className = 'btn-cargar-mas';
+            boton.textContent = 'Cargar más productos';
+            boton.addEventListener('click', cargarPaginaCatalogo);
+            productosGrid.insertAdjacentElement('afterend', boton);
+        }
+        boton.disabled = cargandoPagina;
+        boton.style.display = siguienteCursor && queryBusqueda === '' ? 'block' : 'none';
+    }
         
         // Ordenar productos según el orden actual
         function ordenarProductos(productosParaOrdenar) {
@@ -373,17 +371,85 @@
         }
     }
         
+    // Sugerencias de autocompletado (tolera errores de escritura)
+    function actualizarSugerencias(texto) {
+        const lista = document.getElementById('sugerencias-busqueda');
+        if (!lista) return;
+        clearTimeout(temporizadorSugerencias);
+
+        if (texto.length < 2) {
+            lista.innerHTML = '';
+            return;
+        }
+
+        temporizadorSugerencias = setTimeout(async () => {
+            try {
+                const response = await fetch(`/comprador/api/autocompletar?q=${encodeURIComponent(texto)}`, {
+                    credentials: 'same-origin',
+                    headers: { 'Accept': 'application/json' }
+                });
+                if (!response.ok) return;
+                const data = await response.json();
+                lista.innerHTML = '';
+                (data.sugerencias || []).forEach((sugerencia) => {
+                    const opcion = document.createElement('option');
+                    opcion.value = sugerencia.texto;
+                    lista.appendChild(opcion);
+                });
+            } catch (error) {
+                console.warn('⚠️ Autocompletado no disponible:', error);
+            }
+        }, 100);
+    }
+
         // Inicializar cuando se carga la página
     function manejarBusqueda(event) {
         queryBusqueda = (event.target.value || '').trim().toLowerCase();
-        aplicarFiltros();
+        actualizarSugerencias(queryBusqueda);
+        clearTimeout(temporizadorBusqueda);
+        resultadosBusqueda = null;
+
+        if (queryBusqueda === '') {
+            aplicarFiltros();
+            actualizarBotonCargarMas();
+            return;
+        }
+
+        // La búsqueda se resuelve en el servidor (índice sobre todo el catálogo)
+        const consulta = queryBusqueda;
+        temporizadorBusqueda = setTimeout(async () => {
+            try {
+                const params = new URLSearchParams({ q: consulta, limit: '50' });
+                const categoriaFiltro = normalizarCategoria(categoriaActual);
+                if (categoriaFiltro && categoriaFiltro !== 'todos los productos') {
+                    params.set('categoria', categoriaFiltro);
+                }
+                const response = await fetch(`/comprador/buscar_productos?${params.toString()}`, {
+                    credentials: 'same-origin',
+                    headers: { 'Accept': 'application/json' }
+                });
+                const data = await response.json();
+                if (consulta !== queryBusqueda) return;
+                resultadosBusqueda = response.ok ? (data.productos || []) : null;
+            } catch (error) {
+                console.warn('⚠️ Búsqueda en el servidor no disponible, filtrando productos cargados:', error);
+            }
+            aplicarFiltros();
+            actualizarBotonCargarMas();
+        }, 250);
     }
 
     function aplicarFiltros() {
         let productosFiltrados = productosOriginales.length > 0 ? productosOriginales : productos;
 
-        // Aplicar búsqueda primero
-        if (queryBusqueda !== '') {
+        if (queryBusqueda !== '' && resultadosBusqueda !== null) {
+            // El servidor busca en todo el catálogo: se respeta la categoría de la página
+            const categoriaFiltro = normalizarCategoria(categoriaActual);
+            productosFiltrados = categoriaFiltro && categoriaFiltro !== 'todos los productos'
+                ? resultadosBusqueda.filter(producto => normalizarCategoria(producto.categoria) === categoriaFiltro)
+                : resultadosBusqueda;
+        } else if (queryBusqueda !== '') {
+            // Sin respuesta del servidor: se filtran los productos ya cargados
             productosFiltrados = productosFiltrados.filter((producto) =>
                 producto.nombre.toLowerCase().includes(queryBusqueda)
                 || producto.categoria.toLowerCase().includes(queryBusqueda)
@@ -542,8 +608,8 @@
                     // Cerrar dropdown
                     sortMenu.classList.remove('active');
                     
-                    // Aplicar ordenamiento
-                    aplicarFiltros();
+                    // El orden lo aplica el servidor: se recarga el catálogo desde la primera página
+                    cargarTodosLosProductos();
                 });
             });
         }
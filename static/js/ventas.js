@@ -24,113 +24,165 @@ async function inicializarFirebase() {
     }
 }
 
-async function cargarVentas() {
-    try {
-        const user = auth.currentUser;
-        if (!user) {
-            console.error('Usuario no autenticado');
-            return;
+// Obtiene vendedor_id/nombre/precio de varios productos en una sola petición al servidor
+// (evita leer un documento de 'productos' por cada línea de compra)
+async function obtenerProductosPorIds(ids) {
+    const unicos = [...new Set(ids.filter(Boolean))];
+    const resultado = {};
+    for (let i = 0; i < unicos.length; i += 1000) {
+        try {
+            const response = await fetch('/vendedor/api/productos/lookup', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                credentials: 'same-origin',
+                body: JSON.stringify({ ids: unicos.slice(i, i + 1000) })
+            });
+            const data = await response.json();
+            if (response.ok && data.success) {
+                Object.assign(resultado, data.productos || {});
+            } else {
+                console.error('❌ Error obteniendo productos:', data.error);
+            }
+        } catch (error) {
+            console.error('❌ Error obteniendo productos:', error);
         }
+    }
+    return resultado;
+}
 
-        const loadingEl = document.getElementById('loading-ventas');
-        const emptyEl = document.getElementById('empty-ventas');
-        const containerEl = document.getElementById('ventas-container');
+// Ventas del vendedor desde el índice del servidor, página a página (null si no está disponible)
+async function cargarVentasDelServidor() {
+    try {
+        const ventas = [];
+        let cursor = null;
+        do {
+            const params = new URLSearchParams({ estado: 'pagado,pendiente', limit: 100 });
+            if (cursor) params.set('cursor', cursor);
+            const response = await fetch(`/vendedor/api/ventas?${params}`, {
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' }
+            });
+            const data = await response.json();
+            if (!response.ok || !data.success) {
+                console.warn('⚠️ Ventas del servidor no disponibles:', data.error);
+                return null;
+            }
+            data.ventas.forEach(venta => ventas.push({
+                ...venta,
+                fecha_compra: venta.fecha ? new Date(venta.fecha) : new Date(),
+                fecha_creacion: venta.fecha || new Date().toISOString()
+            }));
+            cursor = data.next_cursor;
+        } while (cursor);
+        return ventas;
+    } catch (error) {
+        console.warn('⚠️ Ventas del servidor no disponibles:', error);
+        return null;
+    }
+}
 
-        if (loadingEl) loadingEl.style.display = 'block';
-        if (emptyEl) emptyEl.style.display = 'none';
-        if (containerEl) containerEl.style.display = 'none';
+// Respaldo: recorre todas las compras y se queda con las líneas del vendedor
+async function cargarVentasDesdeFirestore(user) {
+    const comprasSnapshot = await db.collection('compras').get();
+
+    // IDs de productos cuyas líneas no traen vendedor_id: se resuelven todos juntos
+    const idsSinVendedor = [];
+    comprasSnapshot.docs.forEach(compraDoc => {
+        (compraDoc.data().productos || []).forEach(producto => {
+            if (!producto.vendedor_id && producto.producto_id) {
+                idsSinVendedor.push(producto.producto_id);
+            }
+        });
+    });
+    const productosInfo = idsSinVendedor.length > 0 ? await obtenerProductosPorIds(idsSinVendedor) : {};
 
-        const comprasSnapshot = await db.collection('compras').get();
+    const ventas = [];
 
-        ventasData = [];
+    for (const compraDoc of comprasSnapshot.docs) {
+        const compraData = compraDoc.data();
 
-        for (const compraDoc of comprasSnapshot.docs) {
-            const compraData = compraDoc.data();
+        const estado = compraData.estado || 'pendiente';
+        if (estado !== 'pagado' && estado !== 'pendiente') {
+            continue;
+        }
 
-            const estado = compraData.estado || 'pendiente';
-            if (estado !== 'pagado' && estado !== 'pendiente') {
-                continue;
-            }
+        const productos = compraData.productos || [];
 
-            const productos = compraData.productos || [];
-
-            const productosVendedorPromesas = productos.map(async (producto) => {
-                let vendedorId = producto.vendedor_id || '';
-
-                if (!vendedorId && producto.producto_id) {
-                    try {
-                        const productoDoc = await db.collection('productos').doc(producto.producto_id).get();
-                        if (productoDoc.exists) {
-                            const productoData = productoDoc.data();
-                            vendedorId = productoData.vendedor_id || productoData.vendedorId || '';
-                            console.log('✅ vendedor_id obtenido desde producto:', {
-                                producto_id: producto.producto_id,
-                                vendedor_id: vendedorId,
-                                producto_nombre: productoData.nombre
-                            });
-                        }
-                    } catch (error) {
-                        console.error('❌ Error obteniendo vendedor_id del producto:', error);
-                    }
-                }
+        const productosVendedor = productos.map((producto) => {
+            let vendedorId = producto.vendedor_id || '';
 
-                console.log('🔍 Producto en compra:', {
-                    nombre: producto.nombre,
-                    producto_id: producto.producto_id,
-                    vendedor_id: vendedorId,
-                    vendedor_id_tipo: typeof vendedorId,
-                    user_uid: user.uid,
-                    user_uid_tipo: typeof user.uid,
-                    coincide: String(vendedorId) === String(user.uid)
-                });
+            if (!vendedorId && producto.producto_id && productosInfo[producto.producto_id]) {
+                vendedorId = productosInfo[producto.producto_id].vendedor_id || '';
+            }
 
-                const esDelVendedor = String(vendedorId || '') === String(user.uid);
+            const esDelVendedor = String(vendedorId || '') === String(user.uid);
 
-                if (esDelVendedor) {
-                    return { ...producto, vendedor_id: vendedorId };
-                }
-                return null;
-            });
+            if (esDelVendedor) {
+                return { ...producto, vendedor_id: vendedorId };
+            }
+            return null;
+        }).filter(p => p !== null);
+
+        if (productosVendedor.length > 0) {
+            const totalVenta = productosVendedor.reduce((acc, prod) =>
+                acc + (Number(prod.precio_total) || 0), 0
+            );
+
+            const estadoPedido = productosVendedor[0]?.estado_pedido ||
+                                 compraData.estado_pedido ||
+                                 'preparando';
+
+            let direccionEntrega = compraData.direccion_entrega || {};
+
+            const tieneDireccionCompleta = direccionEntrega.ciudad || direccionEntrega.telefono || direccionEntrega.formatted;
+            if (!tieneDireccionCompleta && (compraData.ciudad || compraData.telefono || compraData.formatted)) {
+                direccionEntrega = {
+                    ciudad: compraData.ciudad || direccionEntrega.ciudad || '',
+                    telefono: compraData.telefono || direccionEntrega.telefono || '',
+                    formatted: compraData.formatted || direccionEntrega.formatted || ''
+                };
+            }
 
-            const productosVendedorTemp = await Promise.all(productosVendedorPromesas);
-            const productosVendedor = productosVendedorTemp.filter(p => p !== null);
+            ventas.push({
+                compra_id: compraDoc.id,
+                fecha_compra: compraData.fecha_compra?.toDate?.() ||
+                             (compraData.fecha_creacion ? new Date(compraData.fecha_creacion) : new Date()),
+                fecha_creacion: compraData.fecha_creacion || new Date().toISOString(),
+                productos: productosVendedor,
+                total: totalVenta,
+                estado: compraData.estado || 'pendiente',
+                estado_pedido: estadoPedido,
+                metodo_pago: compraData.metodo_pago || 'N/A',
+                payment_intent_id: compraData.payment_intent_id || null,
+                comprador_nombre: compraData.usuario_nombre || 'Cliente',
+                comprador_email: compraData.usuario_email || '',
+                direccion_entrega: direccionEntrega
+            });
+        }
+    }
 
-            if (productosVendedor.length > 0) {
-                const totalVenta = productosVendedor.reduce((acc, prod) =>
-                    acc + (Number(prod.precio_total) || 0), 0
-                );
+    return ventas;
+}
 
-                const estadoPedido = productosVendedor[0]?.estado_pedido ||
-                                     compraData.estado_pedido ||
-                                     'preparando';
+async function cargarVentas() {
+    try {
+        const user = auth.currentUser;
+        if (!user) {
+            console.error('Usuario no autenticado');
+            return;
+        }
 
-                let direccionEntrega = compraData.direccion_entrega || {};
+        const loadingEl = document.getElementById('loading-ventas');
+        const emptyEl = document.getElementById('empty-ventas');
+        const containerEl = document.getElementById('ventas-container');
 
-                const tieneDireccionCompleta = direccionEntrega.ciudad || direccionEntrega.telefono || direccionEntrega.formatted;
-                if (!tieneDireccionCompleta && (compraData.ciudad || compraData.telefono || compraData.formatted)) {
-                    direccionEntrega = {
-                        ciudad: compraData.ciudad || direccionEntrega.ciudad || '',
-                        telefono: compraData.telefono || direccionEntrega.telefono || '',
-                        formatted: compraData.formatted || direccionEntrega.formatted || ''
-                    };
-                }
+        if (loadingEl) loadingEl.style.display = 'block';
+        if (emptyEl) emptyEl.style.display = 'none';
+        if (containerEl) containerEl.style.display = 'none';
 
-                ventasData.push({
-                    compra_id: compraDoc.id,
-                    fecha_compra: compraData.fecha_compra?.toDate?.() ||
-                                 (compraData.fecha_creacion ? new Date(compraData.fecha_creacion) : new Date()),
-                    fecha_creacion: compraData.fecha_creacion || new Date().toISOString(),
-                    productos: productosVendedor,
-                    total: totalVenta,
-                    estado: compraData.estado || 'pendiente',
-                    estado_pedido: estadoPedido,
-                    metodo_pago: compraData.metodo_pago || 'N/A',
-                    payment_intent_id: compraData.payment_intent_id || null,
-                    comprador_nombre: compraData.usuario_nombre || 'Cliente',
-                    comprador_email: compraData.usuario_email || '',
-                    direccion_entrega: direccionEntrega
-                });
-            }
+        ventasData = await cargarVentasDelServidor();
+        if (ventasData === null) {
+            ventasData = await cargarVentasDesdeFirestore(user);
         }
 
         ventasData.sort((a, b) => {
@@ -0,0 +1,38 @@
+import sys
+import os
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from modules.services.firestore_fake import FakeFirestoreClient
+
+
+@pytest.fixture
+def db():
+    return FakeFirestoreClient(fixtures={
+        "productos": {
+            "p1": {"nombre": "Jitomate", "precio": 20, "stock": 5, "activo": True, "vendedor_id": "v1"},
+            "p2": {"nombre": "Aguacate", "precio": 45, "stock": 0, "activo": True, "vendedorId": "v2"},
+            "p3": {"nombre": "Limón", "precio": 15, "stock": 9, "activo": False, "vendedor_id": "v1"},
+        },
+        "usuarios": {"v1": {"email": "v1@agro.mx", "stripe_status": {"charges_enabled": False}}},
+    })
+
+
+@pytest.fixture
+def comprador_client():
+    """Cliente de pruebas con el blueprint del comprador y una sesión de comprador."""
+    from modules.comprador.routes import comprador
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(comprador, url_prefix="/comprador")
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["usuario_id"] = "c1"
+        sesion["roles"] = ["comprador"]
+    return client
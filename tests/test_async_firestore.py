@@ -0,0 +1,75 @@
+import sys
+import os
+import asyncio
+import datetime as dt
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from modules.general.routes import general_bp
+from modules.services.async_firestore import AsyncRepository, run_concurrently
+from modules.services.repositories import ProductosRepository
+
+
+@pytest.fixture
+def cliente(db, monkeypatch):
+    monkeypatch.setenv("FIRESTORE_BACKEND", "memory")
+    monkeypatch.setattr("modules.services.repositories.get_firestore_client", lambda: db)
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(general_bp)
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["usuario_id"] = "c1"
+    return client
+
+
+def test_lecturas_concurrentes(db, monkeypatch):
+    monkeypatch.setenv("FIRESTORE_BACKEND", "memory")
+    productos = AsyncRepository(ProductosRepository(client=db))
+    todos = run_concurrently([
+        productos.query([("vendedor_id", "==", "v1")], order_by="precio"),
+        productos.get_many(["p2"], fields=["nombre"]),
+        productos.get("no-existe"),
+    ])
+    assert [doc_id for doc_id, _ in todos[0]] == ["p3", "p1"]
+    assert todos[1] == {"p2": {"nombre": "Aguacate"}}
+    assert todos[2] is None
+
+    async def lenta():
+        await asyncio.sleep(5)
+        return "tarde"
+
+    assert run_concurrently([lenta(), productos.get("p1", fields=["precio"])], mode="first") == {"precio": 20}
+    with pytest.raises(TimeoutError):
+        run_concurrently([lenta()], timeout=0.05)
+
+
+def test_chat_existente_solo_del_usuario(db, cliente):
+    ahora = dt.datetime.now(dt.timezone.utc)
+    chats = db.collection("chats")
+    # El chat más reciente del pedido es de otro comprador
+    chats.document("ajeno").set({"metadata": {"orderId": "o1"}, "participants": ["c2", "v1"], "updated_at": ahora})
+    chats.document("propio").set({"metadata": {"orderId": "o1"}, "participantsData": {"c1": {}, "v1": {}},
+                                  "updated_at": ahora - dt.timedelta(hours=1)})
+    chats.document("antiguo").set({"pedido_id": "o2", "comprador_id": "c1", "vendedor_id": "v1"})
+    chats.document("solo_ajeno").set({"metadata": {"orderId": "o3"}, "participants": ["c2", "v1"]})
+
+    assert cliente.get("/api/chats/existente?pedido_id=o1").json == {"success": True, "chat_id": "propio"}
+    assert cliente.get("/api/chats/existente?pedido_id=o2&vendedor_id=v1").json["chat_id"] == "antiguo"
+    assert cliente.get("/api/chats/existente?pedido_id=o3").json["chat_id"] is None
+    assert cliente.get("/api/chats/existente").status_code == 400
+
+
+def test_chat_existente_no_expone_el_error(cliente, monkeypatch):
+    def falla(*args, **kwargs):
+        raise RuntimeError("credenciales de /app/config/serviceAccountKey.json")
+
+    monkeypatch.setattr("modules.general.routes.AsyncRepository", falla)
+    response = cliente.get("/api/chats/existente?pedido_id=o1")
+    assert response.status_code == 500
+    assert "serviceAccountKey" not in response.get_data(as_text=True)
@@ -0,0 +1,34 @@
+import sys
+import os
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.autocomplete import Autocomplete
+from modules.services.productos_feed import ProductosFeed
+
+
+def test_autocompletado_tolerante_a_errores(db):
+    feed = ProductosFeed()
+    sugerencias = feed.subscribe(Autocomplete())
+    productos = db.collection("productos")
+    productos.document("j2").set({"nombre": "Jitomate saladet", "categoria": "Verduras", "stock": 3, "activo": True})
+    productos.document("j3").set({"nombre": "Jitomate Saladet", "categoria": "Verduras", "stock": 1, "activo": True})
+    productos.document("a1").set({"nombre": "Aguacate Hass", "categoria": "Frutas", "stock": 2, "activo": True})
+    feed.ensure_started(client=db, timeout=1)
+
+    def textos(query):
+        return [(s["texto"], s["errores"]) for s in sugerencias.suggest(query)]
+
+    # "Jitomate saladet" (2 productos) es más popular que "Jitomate" (p1 del fixture)
+    assert textos("jitomat")[:2] == [("Jitomate saladet", 0), ("Jitomate", 0)]
+    assert textos("aguacte") == [("Aguacate Hass", 1)]
+    assert textos("salad") == [("Jitomate saladet", 0)]
+    assert textos("verdu") == [("Verduras", 0)]
+
+    productos.document("a1").update({"stock": 0})
+    productos.document("j2").update({"nombre": "Jitomate bola"})
+    assert textos("aguacte") == []
+    assert textos("salad") == [("Jitomate Saladet", 0)]
+    assert textos("jitomate b")[0] == ("Jitomate bola", 0)
+    feed.stop()
@@ -0,0 +1,150 @@
+import sys
+import os
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from google.api_core.exceptions import ServiceUnavailable
+
+from modules.admin.routes import admin_bp
+from modules.services import bulk, productos_repo
+from modules.services.bulk import bulk_write
+from modules.services.cli import firestore_cli
+from modules.services.firestore_fake import FakeWriteBatch
+from modules.services.repositories import SolicitudesVendedoresRepository, UsuariosRepository, write_together
+
+
+@pytest.fixture
+def caida_tras_un_lote(monkeypatch):
+    """Solo el primer lote se confirma; después Firestore responde siempre con un error transitorio."""
+    commit = FakeWriteBatch.commit
+    intentos = []
+
+    def commit_inestable(self):
+        intentos.append(len(self))
+        if len(intentos) > 1:
+            raise ServiceUnavailable("Firestore no responde")
+        return commit(self)
+
+    monkeypatch.setattr(FakeWriteBatch, "commit", commit_inestable)
+    monkeypatch.setattr(bulk.time, "sleep", lambda segundos: None)
+    return intentos
+
+
+def test_escritura_masiva_aisla_documentos_fallidos(db):
+    avances = []
+    operaciones = [("productos", "update", f"p{i}", {"stock": i}) for i in range(1, 5)]
+    resultado = bulk_write(operaciones, client=db, batch_size=2, initial_rate=1000,
+                           progress=lambda result, total: avances.append((result.processed, total)), total=4)
+
+    # p4 no existe: su lote se repite documento a documento y solo falla p4
+    assert resultado.committed == 3
+    assert [(coleccion, doc_id) for coleccion, doc_id, _ in resultado.failed] == [("productos", "p4")]
+    assert avances == [(2, 4), (4, 4)]
+    assert db.collection("productos").document("p3").get().to_dict()["stock"] == 3
+
+
+def test_escritura_en_grupos_confirma_todo_o_nada(db):
+    usuarios, solicitudes = UsuariosRepository(client=db), SolicitudesVendedoresRepository(client=db)
+    solicitudes.set("s1", {"estado": "pendiente"})
+    grupos = [
+        [(usuarios, "merge", "u1", {"rol_activo": "vendedor"}), (solicitudes, "update", "s1", {"estado": "aprobada"})],
+        # La solicitud no existe: tampoco debe escribirse el usuario de su grupo
+        [(usuarios, "merge", "u2", {"rol_activo": "vendedor"}), (solicitudes, "update", "s2", {"estado": "aprobada"})],
+    ]
+    resultado = write_together(grupos, batch_size=3, initial_rate=1000)
+
+    assert resultado.committed == 2
+    assert sorted(doc_id for _, doc_id, _ in resultado.failed) == ["s2", "u2"]
+    assert db.collection("usuarios").document("u1").get().exists
+    assert not db.collection("usuarios").document("u2").get().exists
+
+
+def test_reintentos_agotados_detienen_la_escritura_sin_perder_el_resumen(db, caida_tras_un_lote):
+    avances = []
+    operaciones = [("productos", "update", f"p{i}", {"stock": 0}) for i in (1, 2, 3)]
+    resultado = bulk_write(operaciones, client=db, batch_size=1, initial_rate=1000, max_retries=2,
+                           progress=lambda result, total: avances.append(result.processed), total=3)
+
+    # p1 se confirma; p2 agota los reintentos y p3 ya no se intenta
+    assert resultado.committed == 1 and resultado.batches == 1 and resultado.retries == 2
+    assert [doc_id for _, doc_id, _ in resultado.failed] == ["p2"]
+    assert resultado.skipped == [("productos", "p3")]
+    assert resultado.committed + len(resultado.failed) + resultado.unprocessed == 3
+    assert "Firestore no responde" in resultado.error and resultado.to_dict()["error"] == resultado.error
+    assert resultado.to_dict()["unprocessed"] == 1
+    assert caida_tras_un_lote == [1, 1, 1, 1] and avances == [1, 2]
+    assert db.collection("productos").document("p3").get().get("stock") == 9
+
+
+def test_cli_de_escritura_masiva_muestra_el_resumen_si_firestore_cae(db, caida_tras_un_lote, tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk, "get_firestore_client", lambda: db)
+    archivo = tmp_path / "operaciones.jsonl"
+    archivo.write_text("\n".join(
+        f'{{"coleccion": "productos", "accion": "update", "id": "p{i}", "datos": {{"stock": 0}}}}' for i in (1, 2, 3)
+    ))
+    app = Flask(__name__)
+    app.cli.add_command(firestore_cli)
+
+    salida = app.test_cli_runner().invoke(args=["firestore", "bulk", str(archivo), "--batch-size", "1"])
+    assert salida.exit_code == 1
+    assert "1 operaciones confirmadas" in salida.output
+    assert "1 operaciones sin procesar" in salida.output and "Traceback" not in salida.output
+
+
+@pytest.fixture
+def admin_client(db, monkeypatch):
+    monkeypatch.setattr("modules.services.repositories.get_firestore_client", lambda: db)
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(admin_bp, url_prefix="/admin")
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["usuario_id"] = "admin1"
+        sesion["roles"] = ["administrador"]
+        sesion["rol_activo"] = "administrador"
+    return client
+
+
+@pytest.mark.parametrize("accion", ["eliminar", "desactivar", "quitar_rol"])
+def test_cambio_masivo_rechaza_la_propia_cuenta(db, admin_client, accion):
+    client = admin_client
+    db.collection("usuarios").document("admin1").set({"activo": True, "roles": ["administrador"]})
+
+    response = client.post("/admin/api/usuarios/bulk",
+                           json={"ids": ["v1", "admin1"], "accion": accion, "rol": "administrador"})
+    assert response.status_code == 400 and response.json["success"] is False
+    assert db.collection("usuarios").document("admin1").get().to_dict() == {"activo": True, "roles": ["administrador"]}
+    assert db.collection("usuarios").document("v1").get().exists
+
+
+def test_aprobacion_masiva_no_da_por_aprobadas_las_solicitudes_sin_escribir(db, admin_client, caida_tras_un_lote,
+                                                                           monkeypatch):
+    for numero in range(3):
+        db.collection("solicitudes_vendedores").document(f"s{numero}").set(
+            {"user_id": f"u{numero}", "email": f"u{numero}@agro.mx", "estado": "pendiente"})
+    # Un grupo (usuario y solicitud) por lote: s0 se escribe, s1 agota los reintentos y s2 nunca se envía
+    monkeypatch.setattr("modules.admin.routes.write_together",
+                        lambda grupos: write_together(grupos, batch_size=2, initial_rate=1000, max_retries=1))
+
+    response = admin_client.post("/admin/api/solicitudes/aprobar", json={"ids": ["s0", "s1", "s2"]})
+    assert response.status_code == 503 and response.json["success"] is False
+    assert [item["solicitud_id"] for item in response.json["aprobadas"]] == ["s0"]
+    fallidas = {item["solicitud_id"]: item["error"] for item in response.json["fallidas"]}
+    assert sorted(fallidas) == ["s1", "s2"] and fallidas["s2"].startswith("No procesada")
+    assert response.json["resultado"]["unprocessed"] == 2
+    assert db.collection("solicitudes_vendedores").document("s2").get().get("estado") == "pendiente"
+
+
+def test_eliminacion_masiva_informa_lo_que_no_se_proceso(db, admin_client, caida_tras_un_lote, monkeypatch):
+    write_many = productos_repo.write_many
+    monkeypatch.setattr(productos_repo, "write_many",
+                        lambda operaciones: write_many(operaciones, batch_size=1, initial_rate=1000, max_retries=1))
+    response = admin_client.post("/admin/api/productos/eliminar", json={"ids": ["p1", "p2", "p3"]})
+    resultado = response.json["resultado"]
+    assert response.status_code == 503 and response.json["success"] is False
+    assert resultado["committed"] + len(resultado["failed"]) + resultado["unprocessed"] == 3
+    assert resultado["unprocessed"] == 1 and db.collection("productos").document("p3").get().exists
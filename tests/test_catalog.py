@@ -0,0 +1,67 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.catalog import CatalogView, final_prices
+from modules.services.productos_feed import ProductosFeed
+
+
+@pytest.mark.parametrize("valor", ["nan", "inf", "-Infinity", "1e999", "barato"])
+def test_catalogo_rechaza_precios_no_finitos(comprador_client, valor):
+    response = comprador_client.get(f"/comprador/api/catalogo?precio_min={valor}")
+    assert response.status_code == 400 and response.json["error"] == "Rango de precio inválido"
+    assert comprador_client.get(f"/comprador/api/catalogo?precio_max={valor}").status_code == 400
+
+
+def test_catalogo_paginado_y_filtrado(db):
+    feed = ProductosFeed()
+    catalogo = feed.subscribe(CatalogView())
+    feed.ensure_started(client=db, timeout=1)
+    for i in range(5):
+        db.collection("productos").document(f"f{i}").set({
+            "nombre": f"Fresa {i}", "categoria": "Frutas-Rojas", "precio": 10 + i, "descuento": 50 if i == 4 else 0,
+            "stock": 1, "activo": True, "origen": "Importado" if i == 0 else None,
+        })
+
+    ids, cursor = [], None
+    while True:
+        pagina, cursor = catalogo.page(categoria="frutas rojas", orden="precio_asc", cursor=cursor, page_size=2)
+        ids += [producto["id"] for producto in pagina]
+        if cursor is None:
+            break
+    # f4 cuesta 14 con 50 % de descuento: precio final 7
+    assert ids == ["f4", "f0", "f1", "f2", "f3"]
+
+    pagina, _ = catalogo.page(orden="precio_desc", precio_max=12, origen="local")
+    assert [producto["id"] for producto in pagina] == ["f2", "f1", "f4"]
+
+    db.collection("productos").document("f2").update({"activo": False})
+    pagina, _ = catalogo.page(categoria="Frutas Rojas", orden="descuento")
+    assert [producto["id"] for producto in pagina][:1] == ["f4"] and "f2" not in [p["id"] for p in pagina]
+    feed.stop()
+
+
+def test_catalogo_columnar_copy_on_write(db):
+    assert final_prices(np.array([100.0, 80.0, 0.0]), np.array([15.0, 0.0, 50.0])).tolist() == [85.0, 80.0, 0.0]
+
+    catalogo = CatalogView()
+    catalogo.reset({
+        "a": {"precio": 10, "stock": 1, "activo": True, "vendedor_id": "v1"},
+        "b": {"precio": 20, "stock": 1, "activo": True, "vendedor_id": "v2"},
+    })
+    anterior = catalogo._snapshot
+    catalogo.apply([
+        ("a", None, {"precio": 30, "stock": 1, "activo": True, "vendedor_id": "v1"}),
+        ("b", None, None),
+        ("c", None, {"precio": 5, "stock": 2, "activo": True, "vendedor_id": "v2"}),
+    ])
+    # La instantánea que ya estaba publicada no cambia
+    assert len(anterior) == 2 and anterior.columns["precio"].tolist() == [10.0, 20.0]
+    pagina, _ = catalogo.page(orden="precio_asc")
+    assert [(p["id"], p["precio"]) for p in pagina] == [("c", 5.0), ("a", 30.0)]
+    assert [p["id"] for p in catalogo.page(vendedor_id="v2")[0]] == ["c"]
@@ -0,0 +1,71 @@
+import sys
+import os
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.productos_feed import productos_feed
+
+
+@pytest.fixture
+def feed(db):
+    productos_feed.ensure_started(client=db, timeout=1)
+    yield productos_feed
+    productos_feed.stop()
+
+
+def test_etag_y_revalidacion_en_catalogo_y_producto(db, comprador_client):
+    client = comprador_client
+    productos_feed.ensure_started(client=db, timeout=1)
+    try:
+        response = client.get("/comprador/api/catalogo")
+        etag = response.headers["ETag"]
+        assert response.status_code == 200 and response.headers["Cache-Control"] == "private, no-cache"
+        assert client.get("/comprador/api/catalogo", headers={"If-None-Match": etag}).status_code == 304
+
+        producto = client.get("/comprador/api/productos/p1")
+        etag_p1 = producto.headers["ETag"]
+        assert producto.json["producto"]["nombre"] == "Jitomate"
+
+        # Cambiar otro producto invalida el catálogo pero no el ETag de p1
+        db.collection("productos").document("p3").update({"activo": True})
+        assert client.get("/comprador/api/catalogo", headers={"If-None-Match": etag}).status_code == 200
+        assert client.get("/comprador/api/productos/p1", headers={"If-None-Match": etag_p1}).status_code == 304
+        assert client.get("/comprador/api/productos/nada").status_code == 404
+    finally:
+        productos_feed.stop()
+
+
+@pytest.mark.parametrize("ruta", ["/comprador/api/catalogo", "/comprador/api/catalogo/facetas", "/comprador/api/productos/p1"])
+@pytest.mark.parametrize("cabecera", [
+    '"otra", "{etag}"',    # varias versiones guardadas, una es la actual
+    'W/"{etag}"',          # comparación débil (p. ej. tras un proxy que comprime)
+    '*',
+])
+def test_304_con_varias_etags_debiles_o_comodin(feed, comprador_client, ruta, cabecera):
+    etag = comprador_client.get(ruta).get_etag()[0]
+    response = comprador_client.get(ruta, headers={"If-None-Match": cabecera.format(etag=etag)})
+    assert response.status_code == 304
+
+
+def test_304_sin_cuerpo_con_etag_y_cabeceras_de_revalidacion(feed, comprador_client):
+    etag = comprador_client.get("/comprador/api/catalogo").headers["ETag"]
+    response = comprador_client.get("/comprador/api/catalogo", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.data == b""
+    assert response.headers["ETag"] == etag and response.headers["Cache-Control"] == "private, no-cache"
+
+    # Una ETag que no es la actual devuelve la respuesta completa
+    viejo = comprador_client.get("/comprador/api/catalogo", headers={"If-None-Match": '"0.0", W/"x"'})
+    assert viejo.status_code == 200 and viejo.json["success"] and viejo.headers["ETag"] == etag
+
+
+def test_errores_no_llevan_etag_aunque_coincida(feed, comprador_client):
+    etag = comprador_client.get("/comprador/api/catalogo").headers["ETag"]
+    # Cursor inválido: la respuesta de error no se puede revalidar
+    response = comprador_client.get("/comprador/api/catalogo?cursor=basura")
+    assert response.status_code == 400 and "ETag" not in response.headers
+    assert comprador_client.get("/comprador/api/productos/nada", headers={"If-None-Match": "*"}).status_code == 404
+    assert comprador_client.get("/comprador/api/catalogo?precio_min=nan",
+                                headers={"If-None-Match": etag}).status_code == 400
@@ -0,0 +1,54 @@
+import sys
+import os
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.catalog import CatalogView
+from modules.services.facets import FacetCounts
+from modules.services.productos_feed import ProductosFeed, normalize_origin
+
+
+def test_facetas_incrementales(db):
+    feed = ProductosFeed()
+    facetas = feed.subscribe(FacetCounts())
+    productos = db.collection("productos")
+    productos.document("a").set({"categoria": "Frutas", "precio": 30, "stock": 2, "activo": True})
+    productos.document("b").set({"categoria": "frutas", "precio": 120, "descuento": 50, "stock": 1,
+                                 "activo": True, "origen": "Importado"})
+    productos.document("c").set({"categoria": "Verduras", "precio": 600, "stock": 0, "activo": True})
+    feed.ensure_started(client=db, timeout=1)
+
+    conteos = facetas.counts()
+    # p1 (del fixture) también es visible y sin categoría cuenta como "otros"
+    assert conteos["total"] == 3 and conteos["categorias"] == {"frutas": 2, "otros": 1}
+    assert conteos["origenes"] == {"local": 2, "importado": 1}
+    # b cuesta 120 con 50 % de descuento: cae en el rango 50-100
+    assert [rango["productos"] for rango in conteos["precios"]] == [2, 1, 0, 0, 0]
+
+    productos.document("c").update({"stock": 5})
+    productos.document("a").update({"activo": False})
+    conteos = facetas.counts()
+    assert conteos["categorias"] == {"frutas": 1, "otros": 1, "verduras": 1}
+    assert conteos["precios"][-1] == {"min": 500, "max": None, "productos": 1}
+    assert facetas.counts("verduras")["origenes"] == {"local": 1}
+    feed.stop()
+
+
+def test_origen_vacio_cuenta_como_local_en_facetas_y_catalogo():
+    assert normalize_origin(None) == normalize_origin("  ") == normalize_origin("Local ") == "local"
+    assert normalize_origin(" Valle  de Puebla") == "valle de puebla"
+
+    productos = {
+        "a": {"precio": 10, "stock": 1, "activo": True, "origen": "   "},
+        "b": {"precio": 20, "stock": 1, "activo": True, "origen": "LOCAL"},
+        "c": {"precio": 30, "stock": 1, "activo": True, "origen": "Importado"},
+    }
+    facetas, catalogo = FacetCounts(), CatalogView()
+    facetas.reset(productos)
+    catalogo.reset(productos)
+    assert facetas.counts()["origenes"] == {"local": 2, "importado": 1}
+    # Filtrar por un origen de las facetas devuelve exactamente los productos contados
+    for origen, cantidad in facetas.counts()["origenes"].items():
+        assert len(catalogo.page(origen=origen)[0]) == cantidad
+    assert [p["id"] for p in catalogo.page(origen=" local ", orden="precio_asc")[0]] == ["a", "b"]
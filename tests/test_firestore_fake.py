@@ -0,0 +1,108 @@
+import sys
+import os
+import threading
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from google.cloud.firestore_v1 import Increment, SERVER_TIMESTAMP
+
+from modules.services.firestore_client import run_transaction
+from modules.services.firestore_fake import FailedPrecondition, NotFound
+
+
+def test_consultas_where_order_by_limit(db):
+    docs = (
+        db.collection("productos")
+        .where("vendedor_id", "==", "v1")
+        .order_by("precio", direction="DESCENDING")
+        .limit(1)
+        .stream()
+    )
+    assert [d.id for d in docs] == ["p1"]
+
+
+def test_start_after_pagina_por_cursor(db):
+    query = db.collection("productos").order_by("precio")
+    primera = query.limit(2).get()
+    segunda = query.start_after(primera[-1]).limit(2).get()
+    assert [d.id for d in primera] == ["p3", "p1"]
+    assert [d.id for d in segunda] == ["p2"]
+
+
+def test_lote_atomico_y_update_inexistente(db):
+    batch = db.batch()
+    batch.set(db.collection("productos").document("p1"), {"stock": Increment(-2)}, merge=True)
+    batch.update(db.collection("productos").document("no-existe"), {"stock": 1})
+    with pytest.raises(NotFound):
+        batch.commit()
+    assert db.collection("productos").document("p1").get().to_dict()["stock"] == 5
+
+
+def test_transaccion(db):
+    def descontar(transaction, ref):
+        # Como en google-cloud-firestore, get de una referencia devuelve un generador
+        stock = next(transaction.get(ref)).get("stock")
+        transaction.update(ref, {"stock": stock - 1, "actualizado": SERVER_TIMESTAMP})
+        return stock - 1
+
+    ref = db.collection("productos").document("p1")
+    assert run_transaction(db, descontar, ref) == 4
+    assert ref.get().get("stock") == 4
+
+
+def test_escuchas_se_avisan_sin_el_lock_del_almacen(db):
+    avisos = []
+
+    def leer_desde_otro_hilo(docs, changes, read_time):
+        # Un listener que lee el fake desde otro hilo no debe quedarse bloqueado
+        hilo = threading.Thread(target=lambda: avisos.append(db.collection("productos").document("p1").get().get("stock")))
+        hilo.start()
+        hilo.join(timeout=1)
+        avisos.append(db._lock._is_owned())
+
+    escucha = db.collection("productos").on_snapshot(leer_desde_otro_hilo)
+    ref = db.collection("productos").document("p1")
+    run_transaction(db, lambda transaction: transaction.update(ref, {"stock": 7}))
+    ref.update({"stock": 8})
+    escucha.unsubscribe()
+    assert avisos == [5, False, 7, False, 8, False]
+
+
+def test_escucha_que_escribe_en_el_fake(db):
+    vistos = []
+
+    def reponer(docs, changes, read_time):
+        stock = {doc.id: doc.get("stock") for doc in docs}
+        vistos.append(stock["p1"])
+        if stock["p1"] == 0:
+            db.collection("productos").document("p1").update({"stock": 10})
+
+    escucha = db.collection("productos").on_snapshot(reponer)
+    run_transaction(db, lambda transaction: transaction.update(db.collection("productos").document("p1"), {"stock": 0}))
+    escucha.unsubscribe()
+    assert vistos == [5, 0, 10]
+
+
+def test_contadores_con_lecturas_concurrentes(db):
+    ref = db.collection("productos").document("p1")
+    antes = db.stats["reads"]
+    hilos = [threading.Thread(target=lambda: [ref.get() for _ in range(200)]) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert db.stats["reads"] - antes == 1600
+
+
+def test_precondicion_de_update_time(db):
+    ref = db.collection("productos").document("p1")
+    leido = ref.get()
+    ref.update({"stock": 4}, option=db.write_option(last_update_time=leido.update_time))
+    batch = db.batch()
+    batch.update(ref, {"stock": 3}, option=db.write_option(last_update_time=leido.update_time))
+    with pytest.raises(FailedPrecondition):
+        batch.commit()
+    assert ref.get().get("stock") == 4
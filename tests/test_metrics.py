@@ -0,0 +1,93 @@
+import sys
+import os
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from modules.admin.routes import admin_bp
+from modules.services import async_firestore, metrics
+from modules.services.async_firestore import AsyncRepository, run_concurrently
+from modules.services.repositories import ProductosRepository
+
+
+def test_contabilidad_de_operaciones(db):
+    app = Flask(__name__)
+    app.debug = True
+    metrics.init_app(app)
+    client = metrics.instrument(db)
+
+    @app.route("/productos")
+    def listar():
+        repo = ProductosRepository(client=client)
+        repo.get("p1")
+        list(repo.stream([("activo", "==", True)]))
+        list(repo.stream([("precio", ">", 1000)]))
+        repo.set("p9", {"nombre": "Nopal"})
+        repo.delete("p3")
+        return "ok"
+
+    metrics.reset()
+    response = app.test_client().get("/productos")
+    assert response.headers["X-Firestore-Reads"] == "4"
+    assert response.headers["X-Firestore-Streamed"] == "2"
+    assert response.headers["X-Firestore-Writes"] == "1"
+    assert response.headers["X-Firestore-Deletes"] == "1"
+    assert int(response.headers["X-Firestore-Bytes"]) > 0
+    assert metrics.snapshot()["endpoints"]["listar"]["requests"] == 1
+
+
+def test_lecturas_concurrentes_se_cuentan_en_la_peticion(db, monkeypatch):
+    class DocumentoAsincrono:
+        def __init__(self, ref):
+            self._ref = ref
+
+        async def get(self, **kwargs):
+            return self._ref.get(**kwargs)
+
+    class ClienteAsincrono:
+        # Lo mínimo del cliente de firestore_async para AsyncRepository.get
+        def collection(self, nombre):
+            coleccion = db.collection(nombre)
+            return type("Coleccion", (), {"document": lambda _, doc_id: DocumentoAsincrono(coleccion.document(doc_id))})()
+
+    app = Flask(__name__)
+    metrics.init_app(app)
+    sincrono = ProductosRepository(client=metrics.instrument(db))
+
+    @app.route("/leer")
+    def leer():
+        monkeypatch.setenv("FIRESTORE_BACKEND", "memory")
+        hilos = AsyncRepository(sincrono)
+        monkeypatch.setattr(async_firestore, "get_async_client", lambda: ClienteAsincrono())
+        asincrono = AsyncRepository(sincrono)
+        run_concurrently([hilos.get("p1"), hilos.get("p2"), asincrono.get("p3"), asincrono.get("nada")])
+        return "ok"
+
+    metrics.reset()
+    app.test_client().get("/leer")
+    leido = metrics.snapshot()["endpoints"]["leer"]
+    assert leido["reads"] == 4 and leido["bytes"] == 0  # sin debug no se estima el tamaño
+
+
+def test_las_metricas_solo_se_reinician_por_post():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(admin_bp, url_prefix="/admin")
+    client = app.test_client()
+    with client.session_transaction() as sesion:
+        sesion["usuario_id"] = "admin1"
+        sesion["roles"] = ["administrador"]
+        sesion["rol_activo"] = "administrador"
+
+    metrics.reset()
+    metrics.record(reads=3)
+    # Un GET (prefetch, rastreador, enlace guardado) no borra nada, aunque lleve ?reset=1
+    assert client.get("/admin/api/firestore/metricas?reset=1").json["totals"]["reads"] == 3
+    assert client.get("/admin/api/firestore/metricas").json["totals"]["reads"] == 3
+    assert client.get("/admin/api/firestore/metricas/reset").status_code == 405
+
+    response = client.post("/admin/api/firestore/metricas/reset")
+    assert response.status_code == 200 and response.json["totals"]["reads"] == 3
+    assert client.get("/admin/api/firestore/metricas").json["totals"]["reads"] == 0
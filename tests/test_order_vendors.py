@@ -0,0 +1,115 @@
+import sys
+import os
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.order_vendors import (
+    CONFLICT_RETRIES,
+    VendorBackfill,
+    load_checkpoint,
+    order_fix,
+)
+from modules.services.pagination import encode_cursor
+
+
+class CambiosDuranteElRelleno(VendorBackfill):
+    """Un vendedor reescribe `productos` de las compras `tocadas` justo después de cada lectura."""
+
+    def __init__(self, *args, tocadas=(), veces=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tocadas = dict.fromkeys(tocadas, veces)
+
+    def _tocar(self, order_ids):
+        for order_id in order_ids:
+            if self.tocadas.get(order_id):
+                self.tocadas[order_id] -= 1
+                compras = self.client.collection("compras")
+                productos = compras.document(order_id).get().to_dict()["productos"]
+                compras.document(order_id).update({"productos": [dict(item, estado_pedido="enviado")
+                                                                 for item in productos]})
+
+    def _operations(self, page, report):
+        operations = super()._operations(page, report)
+        self._tocar(order_id for order_id, _ in page.items)
+        return operations
+
+    def _reread(self, order_ids):
+        operations = super()._reread(order_ids)
+        self._tocar(order_ids)
+        return operations
+
+
+def _compras_sin_vendedor(db, cantidad):
+    for numero in range(cantidad):
+        db.collection("compras").document(f"c{numero}").set(
+            {"productos": [{"producto_id": "p1", "estado_pedido": "pendiente"}]})
+
+
+def test_relleno_de_vendedores_en_compras(db, tmp_path):
+    compras = db.collection("compras")
+    for numero in range(7):
+        compras.document(f"c{numero}").set({"productos": [
+            {"producto_id": "p1", "cantidad": 1},
+            {"producto_id": "p9", "cantidad": 1, "vendedor_id": "v2"},
+            {"producto_id": "borrado", "cantidad": 1},
+        ]})
+    compras.document("c7").set({"productos": [{"producto_id": "p9", "vendedor_id": "v2"}], "vendedores_ids": ["v2"]})
+    assert order_fix({"productos": [{"vendedorId": "v3"}]}, {})[0]["productos"] == [{"vendedorId": "v3", "vendedor_id": "v3"}]
+
+    checkpoint = str(tmp_path / "checkpoint.json")
+    prueba = VendorBackfill(client=db, page_size=3, workers=2, checkpoint=checkpoint, dry_run=True).run()
+    assert (prueba.scanned, prueba.updated, prueba.lines_fixed, prueba.unresolved) == (8, 7, 7, 7)
+    assert prueba.lookups == 1 and prueba.products_looked_up == 2  # p1 y borrado, una sola búsqueda
+    assert "vendedores_ids" not in compras.document("c0").get().to_dict()
+    assert load_checkpoint(checkpoint) is None
+
+    # Reanuda tras c2 como si un trabajo anterior se hubiera cortado ahí
+    interrumpido = VendorBackfill(client=db, page_size=3, checkpoint=checkpoint).run(cursor=encode_cursor("c2", "c2"))
+    assert interrumpido.scanned == 5 and interrumpido.committed == 4
+    assert "vendedores_ids" not in compras.document("c0").get().to_dict()
+
+    informe = VendorBackfill(client=db, page_size=3, workers=3, checkpoint=checkpoint).run()
+    assert informe.committed == 3 and not informe.failed and load_checkpoint(checkpoint) is None
+    datos = compras.document("c0").get().to_dict()
+    assert datos["vendedores_ids"] == ["v1", "v2"] and datos["productos"][0]["vendedor_id"] == "v1"
+    assert "vendedor_id" not in datos["productos"][2]
+    assert VendorBackfill(client=db, checkpoint=checkpoint).run().updated == 0
+
+
+def test_relleno_escribe_cada_pagina_en_un_lote(db):
+    _compras_sin_vendedor(db, 6)
+    antes = db.stats["writes"], db.stats["round_trips"]
+    informe = VendorBackfill(client=db, page_size=3, workers=2, checkpoint=None).run()
+    assert informe.committed == 6 and not informe.failed
+    # 3 páginas leídas (la última vacía), una búsqueda de productos y 2 lotes escritos
+    assert db.stats["writes"] - antes[0] == 6 and db.stats["round_trips"] - antes[1] == 6
+
+
+def test_relleno_de_vendedores_no_pisa_cambios_posteriores_a_la_lectura(db):
+    _compras_sin_vendedor(db, 3)
+    informe = CambiosDuranteElRelleno(client=db, checkpoint=None, tocadas=["c1"]).run()
+    assert informe.committed == 3 and not informe.failed
+    # Solo c1 se volvió a leer; su cambio de estado se conserva
+    for numero, estado in enumerate(["pendiente", "enviado", "pendiente"]):
+        assert db.collection("compras").document(f"c{numero}").get().to_dict()["productos"] == [
+            {"producto_id": "p1", "estado_pedido": estado, "vendedor_id": "v1"}
+        ]
+
+
+def test_relleno_no_avanza_el_checkpoint_tras_una_pagina_fallida(db, tmp_path):
+    _compras_sin_vendedor(db, 3)
+    checkpoint = str(tmp_path / "checkpoint.json")
+    # c1 cambia tras cada lectura: agota los reintentos por conflicto
+    informe = CambiosDuranteElRelleno(client=db, page_size=1, checkpoint=checkpoint, tocadas=["c1"],
+                                      veces=CONFLICT_RETRIES + 1).run()
+    assert [doc_id for _, doc_id, _ in informe.failed] == ["c1"] and informe.committed == 2
+    assert load_checkpoint(checkpoint) == encode_cursor("c0", "c0")
+    assert "vendedor_id" not in db.collection("compras").document("c1").get().to_dict()["productos"][0]
+
+    # Al reanudar se reintenta c1; c2 ya está corregida
+    reanudado = VendorBackfill(client=db, page_size=1, checkpoint=checkpoint).run()
+    assert reanudado.committed == 1 and not reanudado.failed and load_checkpoint(checkpoint) is None
+    assert db.collection("compras").document("c1").get().to_dict()["productos"] == [
+        {"producto_id": "p1", "estado_pedido": "enviado", "vendedor_id": "v1"}
+    ]
@@ -0,0 +1,23 @@
+import sys
+import os
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.repositories import ProductosRepository
+
+
+def test_paginacion_por_cursor_reanudable(db):
+    repo = ProductosRepository(client=db)
+    iterador = repo.paginate(order_by="precio", page_size=2, fields=["nombre"])
+    paginas = list(iterador.pages())
+    assert [[doc_id for doc_id, _ in pagina] for pagina in paginas] == [["p3", "p1"], ["p2"]]
+    assert paginas[-1].next_cursor is None
+
+    # El token de la primera página continúa el recorrido desde otro iterador
+    resto = repo.paginate(order_by="precio", page_size=2, cursor=paginas[0].next_cursor, prefetch=False)
+    assert [doc_id for doc_id, _ in resto] == ["p2"]
+    with pytest.raises(ValueError):
+        repo.paginate(cursor="no-es-un-cursor")
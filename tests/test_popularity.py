@@ -0,0 +1,75 @@
+import sys
+import os
+import datetime as dt
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services import popularity
+from modules.services.popularity import PopularityRanking, compute_scores
+from modules.services.productos_feed import ProductosFeed
+
+
+def pedido(fecha, *ids, estado="pagado"):
+    return {"estado": estado, "fecha_compra": fecha, "productos": [{"producto_id": i} for i in ids]}
+
+
+def test_popularidad_con_decaimiento(db):
+    ahora = dt.datetime.now(dt.timezone.utc)
+    hace = lambda dias: ahora - dt.timedelta(days=dias)
+    db.collection("productos").document("p4").set({"nombre": "Mango", "categoria": "Frutas", "stock": 1, "activo": True})
+
+    # Recalculo completo: una venta de hace una vida media vale 0.5
+    puntuaciones = compute_scores([
+        ("c1", pedido(hace(7), "p1", "p1")), ("c2", pedido(hace(0), "p4")),
+        ("c3", pedido(hace(1), "p4", estado="cancelado")),
+    ], now=ahora.timestamp(), half_life_days=7)
+    assert round(puntuaciones["p1"][0], 3) == 0.5 and puntuaciones["p1"][1] == 1 and "p2" not in puntuaciones
+    db.collection("popularidad_productos").document("p1").set({"puntuacion": 3.0, "calculado_en": hace(1)})
+
+    feed = ProductosFeed()
+    ranking = feed.subscribe(PopularityRanking(half_life_days=7))
+    feed.ensure_started(client=db, timeout=1)
+    ranking.ensure_started(client=db)
+    assert [p["id"] for p in ranking.top()] == ["p1"]
+
+    # Pedidos nuevos llegan por el listener de compras
+    for numero in range(4):
+        db.collection("compras").document(f"n{numero}").set(pedido(ahora, "p4", "p3"))
+    assert [p["id"] for p in ranking.top()] == ["p4", "p1"]  # p3 no es visible
+    assert [p["id"] for p in ranking.top("frutas")] == ["p4"]
+    assert round(ranking.score("p4"), 2) == 4.0
+
+    db.collection("productos").document("p4").update({"stock": 0})
+    assert [p["id"] for p in ranking.top()] == ["p1"]
+    ranking.stop()
+    feed.stop()
+
+
+def test_popularidad_reabre_el_listener_y_olvida_pedidos_antiguos(db, monkeypatch):
+    ahora = dt.datetime.now(dt.timezone.utc)
+    compras = db.collection("compras")
+    compras.document("viejo").set(pedido(ahora - dt.timedelta(hours=3), "p1"))
+    compras.document("nuevo").set(pedido(ahora - dt.timedelta(minutes=5), "p1"))
+
+    ranking = PopularityRanking(half_life_days=7)
+    ranking.reset({"p1": {"nombre": "Jitomate", "stock": 1, "activo": True}})
+    assert ranking.ensure_started(client=db)
+    antes = ranking.score("p1")
+    assert set(ranking._seen_orders) == {"viejo", "nuevo"}
+
+    # Aún no toca reabrir: el listener sigue siendo el mismo
+    escucha = ranking._watch
+    assert ranking.ensure_started(client=db) and ranking._watch is escucha
+
+    monkeypatch.setattr(popularity, "WATCH_REANCHOR_SECONDS", 0)
+    assert ranking.ensure_started(client=db) and ranking._watch is not escucha
+    # La nueva consulta empieza hace una hora: "viejo" se olvida y "nuevo" no se cuenta dos veces
+    assert set(ranking._seen_orders) == {"nuevo"}
+    assert ranking._since > (ahora - dt.timedelta(hours=2)).timestamp()
+    assert abs(ranking.score("p1") - antes) < 1e-6
+
+    # Los pedidos posteriores siguen llegando por el listener reabierto
+    compras.document("otro").set(pedido(ahora, "p1"))
+    assert ranking.score("p1") > antes
+    ranking.stop()
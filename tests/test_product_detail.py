@@ -0,0 +1,40 @@
+import sys
+import os
+import datetime as dt
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services import product_detail as detalle
+from modules.services.productos_feed import productos_feed
+
+
+def test_detalle_agregado_de_producto(db, monkeypatch):
+    monkeypatch.setattr("modules.services.repositories.get_firestore_client", lambda: db)
+    monkeypatch.setattr(detalle, "product_detail_cache", detalle.TTLCache(maxsize=8, ttl=60))
+    ahora = dt.datetime.now(dt.timezone.utc)
+    comentarios = db.collection("comentarios")
+    for numero, estrellas in enumerate([5, 4, 4]):
+        comentarios.document(f"k{numero}").set({
+            "producto_id": "p1", "activo": True, "calificacion": estrellas, "texto": f"c{numero}",
+            "fecha": ahora - dt.timedelta(minutes=numero),
+        })
+    comentarios.document("oculto").set({"producto_id": "p1", "activo": False, "calificacion": 1, "fecha": ahora})
+    db.collection("calificaciones_productos").document("p1").set(
+        {"total": 3, "suma": 13, "distribucion": {"4": 2, "5": 1}})
+    db.collection("productos").document("p5").set({"nombre": "Papaya", "precio": 40, "stock": 1,
+                                                   "activo": True, "vendedor_id": "v1"})
+
+    productos_feed.ensure_started(client=db, timeout=1)
+    try:
+        resultado = detalle.product_detail("p1")
+        assert resultado["producto"]["nombre"] == "Jitomate" and resultado["vendedor"]["email"] == "v1@agro.mx"
+        assert [c["id"] for c in resultado["comentarios"]] == ["k0", "k1", "k2"]
+        assert resultado["comentarios"][0]["fecha"] == ahora.isoformat()
+        assert resultado["calificaciones"] == {"total": 3, "promedio": 4.3,
+                                               "distribucion": {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1}}
+        assert resultado["mas_del_vendedor"]["total"] == 2
+        assert [p["id"] for p in resultado["mas_del_vendedor"]["productos"]] == ["p5"]
+        assert detalle.product_detail("nada") is None
+    finally:
+        productos_feed.stop()
@@ -0,0 +1,69 @@
+import sys
+import os
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from google.cloud.firestore_v1 import SERVER_TIMESTAMP
+
+from modules.services import ratings
+
+
+@pytest.fixture
+def cliente_global(db, monkeypatch):
+    monkeypatch.setattr("modules.services.repositories.get_firestore_client", lambda: db)
+    return db
+
+
+def test_calificaciones_agregadas_y_comentarios_paginados(cliente_global):
+    db = cliente_global
+    # Comentario anterior al agregado: se incorpora al crear el agregado
+    db.collection("comentarios").document("viejo").set({
+        "producto_id": "p1", "activo": True, "calificacion": 2, "texto": "regular", "fecha": SERVER_TIMESTAMP,
+    })
+
+    comentario_id, resumen = ratings.add_comment("p1", "c1", "Ana", "  Muy buenos ", 5)
+    assert resumen == {"total": 2, "promedio": 3.5, "distribucion": {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1}}
+    for estrellas in (4, 4, 3):
+        ratings.add_comment("p1", "c2", None, "ok", estrellas)
+    agregado = db.collection("calificaciones_productos").document("p1").get().to_dict()
+    assert agregado["total"] == 5 and agregado["suma"] == 18 and agregado["distribucion"]["4"] == 2
+    assert ratings.product_ratings("p1")["promedio"] == 3.6
+
+    assert ratings.add_comment("nada", "c1", "Ana", "hola", 5) is None
+    with pytest.raises(ValueError):
+        ratings.add_comment("p1", "c1", "Ana", "hola", 6)
+    with pytest.raises(ValueError):
+        ratings.add_comment("p1", "c1", "Ana", "   ", 3)
+
+    # Páginas por fecha descendente sin repetir ni saltar comentarios
+    vistos, cursor = [], None
+    while True:
+        pagina, cursor = ratings.comments_page("p1", cursor=cursor, limit=2)
+        vistos += pagina
+        if cursor is None:
+            break
+    assert len(vistos) == 5 and len({c["id"] for c in vistos}) == 5
+    assert vistos[-1]["id"] == "viejo" and vistos[0]["texto"] == "ok"
+    assert [c["fecha"] for c in vistos] == sorted((c["fecha"] for c in vistos), reverse=True)
+    assert any(c["id"] == comentario_id and c["texto"] == "Muy buenos" for c in vistos)
+
+
+
+def test_calificaciones_mal_formadas_no_rompen_comentarios_ni_agregados(cliente_global):
+    db = cliente_global
+    for numero, calificacion in enumerate(["5 ", "cinco", "4.0", "4.5", None, 9]):
+        db.collection("comentarios").document(f"legado{numero}").set({
+            "producto_id": "p1", "activo": True, "calificacion": calificacion, "texto": "antiguo",
+            "fecha": SERVER_TIMESTAMP,
+        })
+
+    pagina, _ = ratings.comments_page("p1", limit=10)
+    assert sorted(c["calificacion"] for c in pagina) == [0, 0, 0, 0, 4, 5]
+
+    # El agregado se inicializa con los comentarios legibles; el resto no cuenta
+    _, resumen = ratings.add_comment("p1", "c1", "Ana", "bien", 3)
+    assert resumen["total"] == 3 and resumen["distribucion"] == {"1": 0, "2": 0, "3": 1, "4": 1, "5": 1}
+    assert ratings.aggregate_comments([("x", {"producto_id": "p1", "calificacion": "cinco"})])["p1"]["total"] == 0
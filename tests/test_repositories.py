@@ -0,0 +1,92 @@
+import sys
+import os
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.firestore_fake import FakeFirestoreClient
+from modules.services.repositories import (
+    ProductosRepository,
+    SolicitudesVendedoresRepository,
+    UsuariosRepository,
+    write_together,
+)
+
+
+@pytest.fixture
+def sin_firestore(monkeypatch):
+    # El cliente global del proceso no está disponible
+    monkeypatch.setattr("modules.services.repositories.get_firestore_client", lambda: None)
+
+
+def test_lecturas_y_escrituras_del_repositorio(db):
+    repo = ProductosRepository(client=db)
+    assert repo.get("p1", fields=["nombre"]) == {"nombre": "Jitomate"}
+    assert repo.get("no-existe") is None and repo.get("") is None
+
+    assert repo.set("p4", {"nombre": "Mango", "activo": True})
+    assert repo.update("p4", {"precio": 30})
+    assert repo.find_first([("precio", "==", 30)]) == ("p4", {"nombre": "Mango", "activo": True, "precio": 30})
+    assert repo.delete("p4") and repo.get("p4") is None
+
+
+def test_repositorio_sin_firestore_no_falla(sin_firestore):
+    repo = ProductosRepository()
+    assert repo.get("p1") is None
+    assert repo.get_many(["p1"]) == {}
+    assert list(repo.stream()) == []
+    assert repo.set("p1", {"nombre": "Jitomate"}) is False
+    assert write_together([[(repo, "merge", "p1", {"stock": 1})]]) is None
+
+
+def test_escritura_en_grupos_usa_el_cliente_de_los_repositorios(db, sin_firestore):
+    usuarios, solicitudes = UsuariosRepository(client=db), SolicitudesVendedoresRepository(client=db)
+    solicitudes.set("s1", {"estado": "pendiente"})
+    resultado = write_together([[
+        (usuarios, "merge", "u1", {"rol_activo": "vendedor"}),
+        (solicitudes, "update", "s1", {"estado": "aprobada"}),
+    ]], initial_rate=1000)
+    assert resultado.committed == 2
+    assert solicitudes.get("s1") == {"estado": "aprobada"}
+
+
+def test_escritura_en_grupos_rechaza_clientes_distintos(db):
+    otro = SolicitudesVendedoresRepository(client=FakeFirestoreClient())
+    with pytest.raises(ValueError):
+        write_together([[(UsuariosRepository(client=db), "merge", "u1", {}), (otro, "merge", "s1", {})]])
+    assert not db.collection("usuarios").document("u1").get().exists
+
+
+def test_cache_de_usuarios_write_through(db):
+    repo = UsuariosRepository(client=db)
+    repo.get_cached("v1")
+    repo.set("v1", {"stripe_status": {"charges_enabled": True}}, merge=True)
+    lecturas = db.stats["reads"]
+    assert repo.get_cached("v1")["stripe_status"] == {"charges_enabled": True}
+    assert db.stats["reads"] == lecturas
+
+
+def test_lookup_masivo_usa_mascara_y_lotes(db):
+    repo = ProductosRepository(client=db)
+    antes = db.stats["round_trips"]
+    productos = repo.lookup(["p1", "p2", "p1", "p9"])
+    assert db.stats["round_trips"] - antes == 1
+    assert productos == {
+        "p1": {"vendedor_id": "v1", "nombre": "Jitomate", "precio": 20},
+        "p2": {"vendedor_id": "v2", "nombre": "Aguacate", "precio": 45},
+    }
+
+
+def test_proyeccion_en_cache_de_usuarios(db):
+    db.collection("usuarios").document("v1").set({"nombre": "Ana", "roles": ["vendedor"]}, merge=True)
+    repo = UsuariosRepository(client=db)
+    datos = repo.get_cached("v1", fields=repo.STRIPE_FIELDS)
+    assert "roles" not in datos and datos["email"] == "v1@agro.mx"
+
+    lecturas = db.stats["reads"]
+    repo.get_cached("v1", fields=("stripe_status",))
+    assert db.stats["reads"] == lecturas
+    assert repo.get_cached("v1")["roles"] == ["vendedor"]
+    assert db.stats["reads"] == lecturas + 1
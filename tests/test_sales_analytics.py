@@ -0,0 +1,128 @@
+import sys
+import os
+import datetime as dt
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.cache import TTLCache
+from modules.services.productos_feed import productos_feed
+from modules.services.sales_analytics import SalesAnalytics
+from modules.services.sales_feed import SalesFeed
+from modules.services.vendor_lines import VendorLines
+
+
+def test_series_de_ventas_vectorizadas(db):
+    inicio = dt.datetime(2026, 1, 5, 12, tzinfo=dt.timezone.utc)  # lunes
+    compras = db.collection("compras")
+    for numero, (dias, estado) in enumerate([(0, "entregado"), (1, "preparando"), (8, "preparando"), (40, "enviado")]):
+        compras.document(f"c{numero}").set({
+            "fecha_compra": inicio + dt.timedelta(days=dias),
+            "productos": [
+                {"producto_id": "p1", "nombre": "Jitomate", "cantidad": 2, "precio_total": 30, "estado_pedido": estado},
+                {"producto_id": "p2", "nombre": "Cebolla", "cantidad": 1, "precio_total": 10, "vendedor_id": "v1"},
+            ],
+        })
+
+    feed = SalesFeed()
+    indice = feed.subscribe(VendorLines())
+    analitica = SalesAnalytics(indice)
+    desde = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc).timestamp()
+    hasta = dt.datetime(2026, 3, 1, tzinfo=dt.timezone.utc).timestamp()
+    try:
+        assert feed.ensure_started(client=db, timeout=1)
+        lunes = dt.datetime(2026, 1, 5, tzinfo=dt.timezone.utc).timestamp()
+        semanas = analitica.series("v1", lunes, lunes + 14 * 86400, "semana")
+        assert semanas["ingresos"] == [80.0, 40.0] and semanas["pedidos"] == [2, 1]
+        assert semanas["etiquetas"][0].startswith("2026-01-05")
+        assert semanas["estados"] == {"entregado": [1, 0], "preparando": [1, 1]}
+
+        meses = analitica.series("v1", desde, hasta, "mes")
+        assert meses["ingresos"] == [120.0, 40.0] and meses["unidades"] == [9.0, 3.0]
+        assert meses["ticket_promedio"] == [40.0, 40.0]
+        assert meses["totales"]["pedidos"] == 4 and meses["totales"]["pedidos_por_estado"]["enviado"] == 1
+        assert [p["producto_id"] for p in meses["productos"]] == ["p1", "p2"]
+        assert analitica.series("v1", desde, hasta, "mes") is meses
+
+        # Hora local UTC-13: la venta del lunes a las 12:00 UTC cae el domingo anterior
+        local = analitica.series("v1", desde, hasta, "dia", utc_offset=-780)
+        assert local["etiquetas"][0].startswith("2025-12-31") and local["ingresos"][4] == 40.0
+
+        # Una venta nueva invalida los resultados memorizados del vendedor
+        compras.document("c9").set({
+            "fecha_compra": inicio + dt.timedelta(days=2),
+            "productos": [{"producto_id": "p2", "cantidad": 1, "precio_total": 10, "vendedor_id": "v1"}],
+        })
+        meses = analitica.series("v1", desde, hasta, "mes")
+        assert meses["ingresos"] == [130.0, 40.0] and meses["totales"]["pedidos"] == 5
+
+        assert analitica.series("nadie", desde, hasta, "semana")["totales"]["ingresos"] == 0
+        with pytest.raises(ValueError):
+            analitica.series("v1", desde, hasta, "hora")
+        with pytest.raises(ValueError):
+            analitica.series("v1", hasta, desde, "dia")
+    finally:
+        feed.stop()
+        productos_feed.stop()
+
+
+class IndiceFijo:
+    """Índice de líneas mínimo: una venta por vendedor y versión que cambia a mano."""
+
+    def __init__(self):
+        self.versiones = {}
+        self.lecturas = 0
+
+    def version(self, vendedor_id):
+        return self.versiones.get(vendedor_id, 0)
+
+    def orders(self, vendedor_id):
+        self.lecturas += 1
+        linea = {"fecha": 86400.0, "total": 10.0, "cantidad": 1.0, "producto_id": "p1", "nombre": "Jitomate",
+                 "estado_pedido": "preparando"}
+        return self.version(vendedor_id), [[linea]]
+
+
+def test_cache_de_series_acotada_y_por_version():
+    indice = IndiceFijo()
+    analitica = SalesAnalytics(indice, cache=TTLCache(maxsize=4, ttl=60, copy_values=False))
+    serie = analitica.series("v1", 0, 7 * 86400, "dia")
+    assert analitica.series("v1", 0, 7 * 86400, "dia") is serie and indice.lecturas == 1
+
+    # Otra consulta del mismo vendedor reutiliza sus arrays; una versión nueva los rehace
+    analitica.series("v1", 0, 14 * 86400, "semana")
+    assert indice.lecturas == 1
+    indice.versiones["v1"] = 1
+    assert analitica.series("v1", 0, 7 * 86400, "dia") is not serie and indice.lecturas == 2
+
+    # Muchos vendedores no hacen crecer la caché más allá de su tamaño máximo
+    for numero in range(50):
+        analitica.series(f"v{numero}", 0, 7 * 86400, "dia")
+    assert len(analitica.cache) == 4
+
+
+def test_cache_sin_copias_devuelve_el_mismo_objeto():
+    valor = {"a": [1]}
+    sin_copias, con_copias = TTLCache(copy_values=False), TTLCache()
+    sin_copias.set("k", valor)
+    con_copias.set("k", valor)
+    assert sin_copias.get("k") is valor
+    assert con_copias.get("k") == valor and con_copias.get("k") is not valor
+
+
+def test_cache_de_series_reutiliza_consultas_hasta_ahora():
+    indice = IndiceFijo()
+    analitica = SalesAnalytics(indice, cache=TTLCache(maxsize=8, ttl=60, copy_values=False))
+    # Como la ruta sin fechas: `hasta` es el instante de cada petición
+    ahora = 20 * 86400 + 3600.0
+    serie = analitica.series("v1", ahora - 30 * 86400, ahora, "dia")
+    for segundos in range(1, 50):
+        assert analitica.series("v1", ahora + segundos - 30 * 86400, ahora + segundos, "dia") is serie
+    assert len(analitica.cache) == 2  # los arrays del vendedor y un único resultado
+
+    # Si el rango deja fuera la venta (día 1), el resultado es otro
+    sin_venta = analitica.series("v1", 86400.0 + 1, ahora, "dia")
+    assert sin_venta is not serie and sin_venta["totales"]["pedidos"] == 0 and serie["totales"]["pedidos"] == 1
+
@@ -0,0 +1,75 @@
+import sys
+import os
+import csv
+import datetime as dt
+import gzip
+import io
+import json
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from modules.services.productos_feed import productos_feed
+from modules.services.sales_export import EXPORT_COLUMNS, csv_chunks
+from modules.services.sales_feed import sales_feed
+from modules.services.vendor_lines import vendor_lines
+from modules.vendedor.routes import vendedor_bp
+
+
+def test_exportacion_de_ventas_en_streaming(db):
+    inicio = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+    compras = db.collection("compras")
+    for numero in range(7):
+        compras.document(f"c{numero}").set({
+            "fecha_compra": inicio + dt.timedelta(days=numero), "estado": "pagado", "usuario_nombre": "Ana, S.A.",
+            "productos": [
+                {"producto_id": "p1", "nombre": "Jitomate", "cantidad": 1, "precio_total": 20,
+                 "estado_pedido": "entregado" if numero % 2 else "preparando"},
+                {"producto_id": "p9", "cantidad": 2, "precio_unitario": 5, "vendedor_id": "v2"},
+            ],
+        })
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.register_blueprint(vendedor_bp, url_prefix="/vendedor")
+    assert sales_feed.ensure_started(client=db, timeout=1)
+    try:
+        # Bloques pequeños: el recorrido se reanuda tras el último pedido leído
+        lineas = list(vendor_lines.iter_lines("v1", desde=(inicio + dt.timedelta(days=1)).timestamp(),
+                                              hasta=(inicio + dt.timedelta(days=6)).timestamp(), chunk_size=2))
+        assert [linea["compra_id"] for linea in lineas] == ["c1", "c2", "c3", "c4", "c5"]
+
+        client = app.test_client()
+        with client.session_transaction() as sesion:
+            sesion["usuario_id"] = "v1"
+            sesion["roles"] = ["vendedor"]
+
+        response = client.get("/vendedor/api/ventas/exportar?estado_pedido=entregado&desde=2026-01-02")
+        assert response.status_code == 200 and "Content-Encoding" not in response.headers
+        assert response.headers["Content-Disposition"].startswith("attachment")
+        filas = list(csv.DictReader(io.StringIO(response.data.decode("utf-8-sig"))))
+        assert [fila["compra_id"] for fila in filas] == ["c1", "c3", "c5"]
+        assert filas[0]["comprador_nombre"] == "Ana, S.A." and filas[0]["total"] == "20.0"
+
+        response = client.get("/vendedor/api/ventas/exportar?formato=jsonl&hasta=2026-01-03",
+                              headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        filas = [json.loads(fila) for fila in gzip.decompress(response.data).decode("utf-8").splitlines()]
+        assert [fila["compra_id"] for fila in filas] == ["c0", "c1"]
+
+        assert client.get("/vendedor/api/ventas/exportar?formato=xls").status_code == 400
+        assert client.get("/vendedor/api/ventas/exportar?desde=ayer").status_code == 400
+        assert client.get("/vendedor/api/ventas/exportar?utc_offset=99999999999999").status_code == 400
+    finally:
+        sales_feed.stop()
+        productos_feed.stop()
+
+
+def test_exportacion_csv_neutraliza_formulas():
+    fila = dict.fromkeys(EXPORT_COLUMNS, "")
+    fila.update(comprador_nombre="=HYPERLINK(\"http://x\")", comprador_email="@SUM(A1)", ciudad="-1+2", cantidad=-1)
+    leida = next(csv.DictReader(io.StringIO("".join(csv_chunks([fila])).lstrip("\ufeff"))))
+    assert leida["comprador_nombre"] == "'=HYPERLINK(\"http://x\")"
+    assert (leida["comprador_email"], leida["ciudad"], leida["cantidad"]) == ("'@SUM(A1)", "'-1+2", "-1")
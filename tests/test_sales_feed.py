@@ -0,0 +1,123 @@
+import sys
+import os
+import datetime as dt
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from modules.services import sales_feed as sales_feed_module
+from modules.services.productos_feed import productos_feed
+from modules.services.repositories import ProductosRepository
+from modules.services.sales_feed import SalesFeed, SalesListener
+from modules.services.vendor_stats import VendorStats
+
+
+class Oyente(SalesListener):
+    def __init__(self):
+        self.resets = []
+
+    def reset(self, lines):
+        self.resets.append(sorted(lines))
+
+
+def test_estadisticas_materializadas_por_vendedor(db):
+    ahora = dt.datetime.now(dt.timezone.utc)
+    linea = lambda producto, cantidad, total, **extra: dict(
+        {"producto_id": producto, "nombre": producto.upper(), "cantidad": cantidad, "precio_total": total}, **extra)
+    compras = db.collection("compras")
+    # Línea antigua sin vendedor_id: se resuelve con el producto (p1 es de v1)
+    compras.document("c1").set({"fecha_compra": ahora, "productos": [linea("p1", 2, 40)]})
+    compras.document("c2").set({"fecha_compra": ahora, "estado_pedido": "preparando", "productos": [
+        linea("p1", 1, 20, vendedor_id="v1"), linea("p9", 3, 30, vendedor_id="v2"),
+    ]})
+
+    feed = SalesFeed()
+    stats = feed.subscribe(VendorStats())
+    try:
+        assert feed.ensure_started(client=db, timeout=1)
+        resumen = stats.summary("v1")
+        assert (resumen["total_vendido"], resumen["pedidos"], resumen["productos_vendidos"]) == (60, 2, 3)
+        assert resumen["pedidos_por_estado"] == {"preparando": 2}
+        assert resumen["productos"] == [{"producto_id": "p1", "nombre": "P1", "cantidad": 3, "total": 60}]
+
+        # Cambio de estado del pedido de v1 en c2 y un pedido nuevo
+        compras.document("c2").update({"productos": [
+            linea("p1", 1, 20, vendedor_id="v1", estado_pedido="entregado"), linea("p9", 3, 30, vendedor_id="v2"),
+        ]})
+        compras.document("c3").set({"fecha_compra": ahora + dt.timedelta(hours=1),
+                                    "productos": [linea("p5", 1, 15, vendedor_id="v1")]})
+        resumen = stats.summary("v1")
+        assert resumen["pedidos_por_estado"] == {"preparando": 2, "entregado": 1}
+        assert resumen["pedidos"] == 3 and resumen["pedidos_completados"] == 1 and resumen["total_vendido"] == 75
+        assert [venta["compra_id"] for venta in stats.orders("v1")][0] == "c3"
+
+        compras.document("c1").delete()
+        assert stats.summary("v1")["total_vendido"] == 35 and stats.summary("v2")["pedidos"] == 1
+        assert stats.summary("nadie")["pedidos"] == 0
+    finally:
+        feed.stop()
+        productos_feed.stop()
+
+
+def test_feed_de_ventas_busca_vendedores_fuera_del_lock(db, monkeypatch):
+    class UltimoLote(SalesListener):
+        cambios = None
+
+        def apply(self, changes):
+            self.cambios = changes
+
+    feed = SalesFeed()
+    oyente = feed.subscribe(UltimoLote())
+    busquedas = []
+    lookup = ProductosRepository.lookup
+
+    def lookup_sin_lock(self, product_ids):
+        busquedas.append(feed._lock._is_owned())
+        return lookup(self, product_ids)
+
+    monkeypatch.setattr(ProductosRepository, "lookup", lookup_sin_lock)
+    assert feed.ensure_started(client=db, timeout=1)
+    try:
+        db.collection("compras").document("c1").set({"productos": [{"producto_id": "borrado"}, {"producto_id": "p1"}]})
+        assert busquedas == [False]
+        assert [linea["vendedor_id"] for linea in oyente.cambios[0][2]] == ["v1"]
+    finally:
+        feed.stop()
+        productos_feed.stop()
+
+
+def test_feed_de_ventas_con_ventana_de_dias(db, monkeypatch):
+    ahora = dt.datetime.now(dt.timezone.utc)
+    compras = db.collection("compras")
+    for compra_id, dias in (("reciente", 0), ("del_mes", 10), ("antigua", 60)):
+        compras.document(compra_id).set({"fecha_compra": ahora - dt.timedelta(days=dias),
+                                         "productos": [{"producto_id": "p1", "vendedor_id": "v1"}]})
+
+    app = Flask(__name__)
+    app.config["VENTAS_FEED_WINDOW_DAYS"] = 30
+    feed = SalesFeed()
+    oyente = feed.subscribe(Oyente())
+    try:
+        with app.app_context():
+            assert feed.ensure_started(client=db, timeout=1)
+            assert oyente.resets == [["del_mes", "reciente"]] and feed.lines("antigua") == []
+            anterior = feed._watch
+
+            # La ventana avanza al reabrir el listener: el suscriptor recibe un reset
+            app.config["VENTAS_FEED_WINDOW_DAYS"] = 5
+            assert feed.ensure_started(client=db, timeout=1) and feed._watch is anterior
+            monkeypatch.setattr(sales_feed_module, "FEED_REANCHOR_SECONDS", 0)
+            assert feed.ensure_started(client=db, timeout=1) and feed._watch is not anterior
+        assert oyente.resets[-1] == ["reciente"] and feed.lines("del_mes") == []
+
+        # Un aviso tardío del listener cerrado no cambia el estado
+        version = feed.version
+        feed._on_snapshot(feed._generation - 1, [], [], None)
+        assert feed.version == version
+        compras.document("nueva").set({"fecha_compra": ahora, "productos": [{"producto_id": "p1"}]})
+        assert [linea["vendedor_id"] for linea in feed.lines("nueva")] == ["v1"]
+    finally:
+        feed.stop()
+        productos_feed.stop()
@@ -0,0 +1,49 @@
+import sys
+import os
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.productos_feed import ProductosFeed
+from modules.services.search import COMPACT_RATIO, SearchIndex, tokenize
+
+
+def test_busqueda_bm25_con_feed_de_productos(db):
+    assert tokenize("Limones del Huerto") == tokenize("limón huerto")
+
+    feed = ProductosFeed()
+    index = feed.subscribe(SearchIndex())
+    assert feed.ensure_started(client=db, timeout=1)
+
+    db.collection("productos").document("p4").set({
+        "nombre": "Jitomates saladet", "descripcion": "Jitomate rojo de temporada",
+        "precio": 30, "stock": 3, "activo": True,
+    })
+    resultados = [producto["id"] for _, producto in index.search("jitomates")]
+    assert sorted(resultados) == ["p1", "p4"]
+    # p3 (Limón) está inactivo
+    assert [producto["id"] for _, producto in index.search("limon")] == []
+    assert [producto["id"] for _, producto in index.search("agua")] == []  # p2 sin stock
+
+    db.collection("productos").document("p1").update({"stock": 0})
+    assert [producto["id"] for _, producto in index.search("jito")] == ["p4"]
+    feed.stop()
+
+
+def test_indice_de_busqueda_compacta_por_proporcion_de_borrados():
+    index = SearchIndex()
+    index.reset({f"p{numero}": {"nombre": f"Producto {numero}", "activo": True, "stock": 1} for numero in range(40)})
+    for version in range(30):
+        index.apply([("p0", None, {"nombre": f"Jitomate {version}", "activo": True, "stock": 1})])
+        assert index._deleted <= COMPACT_RATIO * len(index)
+    assert [producto["id"] for _, producto in index.search("jitomate")] == ["p0"]
+
+
+def test_busqueda_filtra_por_categoria():
+    index = SearchIndex()
+    index.reset({
+        "p1": {"nombre": "Chile verde", "categoria": "Verduras", "activo": True, "stock": 1},
+        "p2": {"nombre": "Chile seco", "categoria": "semillas-y-granos", "activo": True, "stock": 1},
+    })
+    assert [producto["id"] for _, producto in index.search("chile", categoria="semillas y granos")] == ["p2"]
+    assert {producto["id"] for _, producto in index.search("chile")} == {"p1", "p2"}
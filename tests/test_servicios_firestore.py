@@ -0,0 +1,61 @@
+import sys
+import os
+import time
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.cache import TTLCache
+from modules.services.unit_of_work import merge_document
+
+
+def test_ttl_cache_expira_y_respeta_tamano():
+    cache = TTLCache(maxsize=2, ttl=0.05)
+    cache.set("a", {"x": 1})
+    cache.set("b", {"x": 2})
+    cache.set("c", {"x": 3})
+    assert cache.get("a") is None  # desalojado por LRU
+    assert cache.get("c") == {"x": 3}
+    time.sleep(0.06)
+    assert cache.get("c") is None
+
+
+def test_ttl_cache_devuelve_copias():
+    cache = TTLCache()
+    cache.set("u1", {"stripe_status": {"charges_enabled": True}})
+    copia = cache.get("u1")
+    copia["stripe_status"]["charges_enabled"] = False
+    assert cache.get("u1")["stripe_status"]["charges_enabled"] is True
+
+
+def test_merge_fusiona_mapas_anidados():
+    base = {"stripe_status": {"charges_enabled": False, "last_checked": "ayer"}, "email": "a@b.c"}
+    merge_document(base, {"stripe_status": {"charges_enabled": True}})
+    assert base == {"stripe_status": {"charges_enabled": True, "last_checked": "ayer"}, "email": "a@b.c"}
+
+
+def test_inicializacion_de_firebase_se_reintenta_tras_un_fallo(monkeypatch):
+    import firebase_admin
+
+    from modules.services import firestore_client
+
+    intentos = []
+
+    def credenciales(config):
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise OSError("red caída")
+        return "cred", "proyecto"
+
+    monkeypatch.setattr(firebase_admin, "_apps", {})
+    monkeypatch.setattr(firebase_admin, "initialize_app", lambda cred, options: "app")
+    monkeypatch.setattr(firestore_client, "_build_credentials", credenciales)
+    firestore_client.reset_firestore_client()
+    try:
+        assert firestore_client.initialize_firebase_app() is None
+        assert firestore_client.initialize_firebase_app() is None and len(intentos) == 1  # en espera
+        monkeypatch.setattr(firestore_client, "_init_retry_at", 0.0)
+        assert firestore_client.initialize_firebase_app() == "app"
+        assert firestore_client.initialize_firebase_app() == "app" and len(intentos) == 2
+    finally:
+        firestore_client.reset_firestore_client()
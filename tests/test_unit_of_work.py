@@ -0,0 +1,79 @@
+import sys
+import os
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+
+from modules.services.firestore_fake import FakeFirestoreClient
+from modules.services.repositories import ProductosRepository, UsuariosRepository
+from modules.services.unit_of_work import unit_of_work
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def test_lecturas_del_identity_map_y_merges_en_un_lote(app, db):
+    usuarios, productos = UsuariosRepository(client=db), ProductosRepository(client=db)
+
+    @unit_of_work
+    def handler():
+        usuarios.get("v1")
+        usuarios.set("v1", {"stripe_status": {"charges_enabled": True}}, merge=True)
+        usuarios.set("v1", {"stripe_account_id": "acct_1"}, merge=True)
+        productos.set("p1", {"stock": 4}, merge=True)
+        return usuarios.get("v1")
+
+    with app.app_context():
+        antes = dict(db.stats)
+        datos = handler()
+    assert datos["stripe_status"] == {"charges_enabled": True} and datos["stripe_account_id"] == "acct_1"
+    assert db.stats["reads"] - antes["reads"] == 1
+    assert db.stats["round_trips"] - antes["round_trips"] == 2  # una lectura y un lote
+    assert db.collection("productos").document("p1").get().get("stock") == 4
+
+
+def test_cada_repositorio_escribe_con_su_cliente(app, db):
+    otro = FakeFirestoreClient(fixtures={"productos": {"x": {"stock": 1}}})
+    usuarios, productos, ajenos = UsuariosRepository(client=db), ProductosRepository(client=db), ProductosRepository(client=otro)
+
+    @unit_of_work
+    def handler():
+        usuarios.set("v1", {"rol_activo": "vendedor"}, merge=True)
+        productos.set("p1", {"stock": 3}, merge=True)
+        ajenos.set("x", {"stock": 2}, merge=True)
+
+    with app.app_context():
+        handler()
+    assert db.collection("usuarios").document("v1").get().get("rol_activo") == "vendedor"
+    assert otro.collection("productos").document("x").get().get("stock") == 2
+    assert not db.collection("productos").document("x").get().exists
+    assert not otro.collection("productos").document("p1").get().exists
+
+
+def test_un_fallo_al_confirmar_no_oculta_la_excepcion_del_handler(app, db, monkeypatch):
+    usuarios = UsuariosRepository(client=db)
+
+    def falla(*args, **kwargs):
+        raise RuntimeError("Firestore caído")
+
+    @unit_of_work
+    def handler():
+        usuarios.set("v1", {"rol_activo": "vendedor"}, merge=True)
+        monkeypatch.setattr(usuarios, "_apply_set", falla)
+        raise KeyError("error del handler")
+
+    with app.app_context(), pytest.raises(KeyError):
+        handler()
+
+    @unit_of_work
+    def sin_error():
+        usuarios.set("v1", {"rol_activo": "comprador"}, merge=True)
+
+    with app.app_context(), pytest.raises(RuntimeError):
+        sin_error()
@@ -0,0 +1,50 @@
+import sys
+import os
+import datetime as dt
+
+import pytest
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.productos_feed import productos_feed
+from modules.services.sales_feed import SalesFeed
+from modules.services.vendor_lines import VendorLines
+
+
+def test_ventas_por_vendedor_paginadas(db):
+    inicio = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+    compras = db.collection("compras")
+    for numero in range(5):
+        compras.document(f"c{numero}").set({
+            "fecha_compra": inicio + dt.timedelta(days=numero), "estado": "cancelado" if numero == 1 else "pagado",
+            "usuario_nombre": "Ana", "ciudad": "Puebla",
+            "productos": [
+                {"producto_id": "p1", "nombre": "Jitomate", "cantidad": 1, "precio_total": 20,
+                 "estado_pedido": "entregado" if numero == 0 else "preparando"},
+                {"producto_id": "p9", "cantidad": 2, "precio_unitario": 5, "vendedor_id": "v2"},
+            ],
+        })
+
+    feed = SalesFeed()
+    indice = feed.subscribe(VendorLines())
+    try:
+        assert feed.ensure_started(client=db, timeout=1)
+        ventas, cursor = indice.page("v1", page_size=2)
+        assert [v["compra_id"] for v in ventas] == ["c4", "c3"] and cursor
+        assert ventas[0]["productos"][0]["vendedor_id"] == "v1" and len(ventas[0]["productos"]) == 1
+        assert ventas[0]["direccion_entrega"]["ciudad"] == "Puebla" and ventas[0]["fecha"].startswith("2026-01-05")
+        resto, fin = indice.page("v1", cursor=cursor, page_size=2)
+        assert [v["compra_id"] for v in resto] == ["c2", "c1"] and fin
+
+        pagados, _ = indice.page("v1", estados=["pagado"], estados_pedido=["preparando"], page_size=10)
+        assert [v["compra_id"] for v in pagados] == ["c4", "c3", "c2"]
+        assert indice.page("v2", page_size=1)[0][0]["total"] == 10
+
+        compras.document("c3").delete()
+        assert indice.count("v1") == 4 and indice.page("nadie") == ([], None)
+        with pytest.raises(ValueError):
+            indice.page("v1", cursor="basura")
+    finally:
+        feed.stop()
+        productos_feed.stop()
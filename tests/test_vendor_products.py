@@ -0,0 +1,29 @@
+import sys
+import os
+
+# Asegura que Python encuentre los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.services.productos_feed import ProductosFeed
+from modules.services.vendor_products import VendorProducts
+
+
+def test_productos_por_vendedor(db):
+    feed = ProductosFeed()
+    indice = feed.subscribe(VendorProducts())
+    feed.ensure_started(client=db, timeout=1)
+    productos = db.collection("productos")
+    productos.document("p4").set({"nombre": "Mango", "precio": 30, "descuento": 50, "stock": 1,
+                                  "activo": True, "vendedor_id": "v1"})
+    productos.document("p5").set({"nombre": "Papaya", "precio": 40, "stock": 1, "activo": True, "vendedor_id": "v1"})
+
+    total, tarjetas = indice.top("v1", orden="precio_asc")
+    # p3 está inactivo; p4 cuesta 15 con descuento
+    assert total == 3 and [t["id"] for t in tarjetas] == ["p4", "p1", "p5"]
+    assert set(tarjetas[0]) == {"id", "nombre", "precio", "precio_con_descuento", "descuento",
+                                "categoria", "unidad", "imagen", "stock"}
+    assert [t["id"] for t in indice.top("v1", orden="precio_desc", limit=2, exclude="p5")[1]] == ["p1", "p4"]
+
+    productos.document("p1").update({"stock": 0})
+    assert indice.count("v1") == 2 and indice.top("v2") == (0, [])
+    feed.stop()